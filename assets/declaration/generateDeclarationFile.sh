@@ -13,9 +13,10 @@ else
 	ABS_RUNTIME_INFO="$(pwd)/$RUNTIME_INFO"
 fi
 
-CONTAINER_NAME=$(LC_ALL=C tr -dc A-Za-z0-9 </dev/urandom | head -c 20 ; echo)
+# Named by the caller if given, such that the container can be monitored
+CONTAINER_NAME=${JSTYPELOG_CONTAINER_NAME:-$(LC_ALL=C tr -dc A-Za-z0-9 </dev/urandom | head -c 20 ; echo)}
 
-docker rm $CONTAINER_NAME > /dev/null 2>&1
+docker rm -f $CONTAINER_NAME > /dev/null 2>&1
 docker run \
 	--name $CONTAINER_NAME \
 	-v $ABS_RUNTIME_INFO:/tmp/output.json \
@@ -23,4 +24,4 @@ docker run \
 	--module-name $MODULE_NAME -i /tmp/output.json
 
 docker cp $CONTAINER_NAME:/usr/local/app/output/. $RESULTS
-docker rm $CONTAINER_NAME > /dev/null 2>&1
\ No newline at end of file
+docker rm -f $CONTAINER_NAME > /dev/null 2>&1
\ No newline at end of file
@@ -17,25 +17,36 @@ fi
 
 FILE_IN_CONTAINER="/tmp/runtimeAnalysis"
 
-CONTAINER_NAME=$(LC_ALL=C tr -dc A-Za-z0-9 </dev/urandom | head -c 20 ; echo)
-
-docker rm $CONTAINER_NAME > /dev/null 2>&1
-timeout -k $TIMEOUT_SECONDS $TIMEOUT_SECONDS docker run \
+# Named by the caller if given, such that the container can be monitored
+CONTAINER_NAME=${JSTYPELOG_CONTAINER_NAME:-$(LC_ALL=C tr -dc A-Za-z0-9 </dev/urandom | head -c 20 ; echo)}
+# Unique per run, such that multiple analyses can run concurrently
+RUNTIME_OUTPUT=$(mktemp)
+
+docker rm -f $CONTAINER_NAME > /dev/null 2>&1
+# Killed shortly after the timeout (node as PID 1 ignores SIGTERM), such that the container is removed before the caller kills this script
+timeout -k 5 $TIMEOUT_SECONDS docker run \
 	--name $CONTAINER_NAME \
 	-v $ABS_ROOT_PROJECT_PATH:$FILE_IN_CONTAINER  \
 	-v $SCRIPT_PATH/blacklistedModules.json:/tmp/blacklistedModules.json \
 	master-mind-wp3 \
 	$FILE_IN_CONTAINER/$JS_FILE_NAME \
 	/tmp/blacklistedModules.json \
-	1> /tmp/runtimeinfo
+	1> $RUNTIME_OUTPUT
+# The exit status of the timeout (124, or 137 if it had to be killed), such that the caller can tell a timeout from a failure
+STATUS=$?
 
-LINE_NUMBER="$(grep /tmp/runtimeinfo -ne "^{$" | cut -f1 -d:)"
+LINE_NUMBER="$(grep $RUNTIME_OUTPUT -ne "^{$" | cut -f1 -d:)"
 LINE_NUMBER="$(($LINE_NUMBER-1))"
 
 if [ "$LINE_NUMBER" -gt "1" ]; then
-	sed -e "1,${LINE_NUMBER}d" /tmp/runtimeinfo > $RUNTIME_INFO
+	sed -e "1,${LINE_NUMBER}d" $RUNTIME_OUTPUT > $RUNTIME_INFO
 else
-	cp /tmp/runtimeinfo $RUNTIME_INFO
+	cp $RUNTIME_OUTPUT $RUNTIME_INFO
 fi
 
-docker rm $CONTAINER_NAME > /dev/null 2>&1
\ No newline at end of file
+# Killing the docker client does not stop the container
+docker rm -f $CONTAINER_NAME > /dev/null 2>&1
+rm -f $RUNTIME_OUTPUT
+if [ "$STATUS" -eq 124 ] || [ "$STATUS" -eq 137 ]; then
+	exit $STATUS
+fi
\ No newline at end of file
@@ -0,0 +1,20 @@
+// Checks the syntax of many snippets in one process, without executing them.
+// Snippets are compiled like CommonJS modules, i.e. with the same wrapper parameters as Node uses.
+const fs = require('fs');
+const vm = require('vm');
+
+const argv = process.argv.slice(2);
+if (argv.length < 2) {
+  console.error('Usage: node check_syntax.js snippetsFile.json resultsFile.json');
+  process.exit(1);
+}
+const snippets = JSON.parse(fs.readFileSync(argv[0], 'utf8'));
+const results = snippets.map((snippet) => {
+  try {
+    vm.compileFunction(snippet, ['exports', 'require', 'module', '__filename', '__dirname']);
+    return null;
+  } catch (error) {
+    return `${error.name}: ${error.message}`;
+  }
+});
+fs.writeFileSync(argv[1], JSON.stringify(results));
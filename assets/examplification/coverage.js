@@ -0,0 +1,78 @@
+// API coverage of an example: the exports of the package are wrapped in proxies that record which exports the example touches.
+// Usage: node coverage.js packageName outputPath example.js
+// The touched export paths (e.g. "parse", "parse()", "Parser.prototype", "new Parser()", "()") are written as a JSON array at exit.
+const fs = require('fs');
+const path = require('path');
+const Module = require('module');
+
+const argv = process.argv.slice(2);
+if (argv.length < 3) {
+  console.error('Usage: node coverage.js packageName outputPath example.js');
+  process.exit(1);
+}
+const [packageName, outputPath, examplePath] = argv;
+// Deeper paths rarely separate examples, but every level adds proxies that can change the behavior of the package
+const MAX_DEPTH = 2;
+const covered = new Set();
+const proxies = new WeakMap();
+
+function join(prefix, name) {
+  return prefix ? `${prefix}.${name}` : name;
+}
+
+function wrap(value, prefix, depth) {
+  if ((typeof value !== 'object' && typeof value !== 'function') || value === null || depth > MAX_DEPTH) {
+    return value;
+  }
+  let byPrefix = proxies.get(value);
+  if (byPrefix === undefined) {
+    byPrefix = new Map();
+    proxies.set(value, byPrefix);
+  }
+  if (byPrefix.has(prefix)) {
+    return byPrefix.get(prefix);
+  }
+  const proxy = new Proxy(value, {
+    get(target, property, receiver) {
+      const result = Reflect.get(target, property, receiver === proxy ? target : receiver);
+      if (typeof property !== 'string' || property === 'then' || property === 'constructor') {
+        return result;
+      }
+      covered.add(join(prefix, property));
+      // Non-configurable and read-only properties must return their actual value (proxy invariant)
+      const descriptor = Reflect.getOwnPropertyDescriptor(target, property);
+      if (descriptor && !descriptor.configurable && !descriptor.writable && 'value' in descriptor) {
+        return result;
+      }
+      return wrap(result, join(prefix, property), depth + 1);
+    },
+    apply(target, thisArg, args) {
+      covered.add(`${prefix}()`);
+      return Reflect.apply(target, thisArg === proxy ? target : thisArg, args);
+    },
+    construct(target, args, newTarget) {
+      covered.add(`new ${prefix}()`);
+      return Reflect.construct(target, args, newTarget === proxy ? target : newTarget);
+    },
+  });
+  byPrefix.set(prefix, proxy);
+  return proxy;
+}
+
+const originalLoad = Module._load;
+Module._load = function (request, parent, isMain) {
+  const result = originalLoad.apply(this, arguments);
+  // Only the requires of the example itself, the package may require itself internally
+  if (request === packageName && parent && !parent.filename.includes(`${path.sep}node_modules${path.sep}`)) {
+    return wrap(result, '', 0);
+  }
+  return result;
+};
+
+process.on('exit', () => {
+  // An empty prefix is the export itself, e.g. "()" for a package that exports a function
+  fs.writeFileSync(outputPath, JSON.stringify([...covered].sort()));
+});
+
+process.argv = [process.argv[0], path.resolve(examplePath), ...argv.slice(3)];
+Module.runMain();
@@ -0,0 +1,271 @@
+// Warm execution harness: runs examples one after another in this process, which saves the start-up of a Node process per example.
+// Protocol: jobs are read as JSON lines from stdin, results are written as JSON lines to the file descriptor given as argument.
+// Like separate "node index.js" runs, every example loads the package anew: the module cache, the globals, patched built-ins,
+// process listeners, the environment and the working directory are restored after every example.
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+const util = require('util');
+const vm = require('vm');
+const { createRequire } = require('module');
+
+const argv = process.argv.slice(2);
+if (argv.length < 2) {
+  console.error('Usage: node harness.js packageName resultFd');
+  process.exit(1);
+}
+const packageName = argv[0];
+const resultFd = Number(argv[1]);
+const filename = path.join(process.cwd(), 'index.js');
+const exampleRequire = createRequire(filename);
+
+function send(message) {
+  fs.writeSync(resultFd, JSON.stringify(message) + '\n');
+}
+
+class ExitSignal {
+  constructor(code) {
+    this.code = code;
+  }
+}
+
+// Objects that examples commonly patch, their own properties are restored after every example
+const builtinNames = ['fs', 'path', 'util', 'events', 'os', 'child_process', 'http', 'https', 'stream'];
+const patchableObjects = [
+  globalThis, process, console,
+  Object, Object.prototype, Function.prototype, Array, Array.prototype, String, String.prototype,
+  Number, Number.prototype, Boolean.prototype, Symbol, Symbol.prototype, Date, Date.prototype, RegExp, RegExp.prototype,
+  Error, Error.prototype, Promise, Promise.prototype, Map.prototype, Set.prototype, WeakMap.prototype, WeakSet.prototype,
+  JSON, Math, Reflect,
+  ...builtinNames.map((name) => require(name)),
+];
+
+function snapshotState() {
+  return {
+    cache: new Set(Object.keys(require.cache)),
+    objects: patchableObjects.map((object) => [object, Object.getOwnPropertyDescriptors(object)]),
+    listeners: new Map(process.eventNames().map((name) => [name, process.listeners(name)])),
+    env: { ...process.env },
+    cwd: process.cwd(),
+  };
+}
+
+function restoreObject(object, descriptors) {
+  for (const key of Reflect.ownKeys(object)) {
+    if (!Object.prototype.hasOwnProperty.call(descriptors, key)) {
+      try {
+        delete object[key];
+      } catch {
+        // E.g. frozen by the example
+      }
+    }
+  }
+  for (const key of Reflect.ownKeys(descriptors)) {
+    const current = Object.getOwnPropertyDescriptor(object, key);
+    const original = descriptors[key];
+    if (current === undefined || current.value !== original.value || current.get !== original.get || current.set !== original.set) {
+      try {
+        Object.defineProperty(object, key, original);
+      } catch {
+        // Non-configurable properties can not be restored
+      }
+    }
+  }
+}
+
+function restoreState(snapshot) {
+  // The package and everything the example required are loaded anew by the next example
+  for (const key of Object.keys(require.cache)) {
+    if (!snapshot.cache.has(key)) {
+      delete require.cache[key];
+    }
+  }
+  for (const name of process.eventNames()) {
+    const original = snapshot.listeners.get(name) || [];
+    for (const listener of process.listeners(name)) {
+      if (!original.includes(listener)) {
+        process.removeListener(name, listener);
+      }
+    }
+  }
+  for (const [object, descriptors] of snapshot.objects) {
+    restoreObject(object, descriptors);
+  }
+  for (const key of Object.keys(process.env)) {
+    if (!(key in snapshot.env)) {
+      delete process.env[key];
+    }
+  }
+  Object.assign(process.env, snapshot.env);
+  if (process.cwd() !== snapshot.cwd) {
+    process.chdir(snapshot.cwd);
+  }
+}
+
+const originalExit = process.exit;
+const originalStdoutWrite = process.stdout.write;
+const originalStderrWrite = process.stderr.write;
+const originalTimers = {
+  setTimeout: globalThis.setTimeout,
+  setInterval: globalThis.setInterval,
+  setImmediate: globalThis.setImmediate,
+};
+let currentJob = null;
+
+// Exiting is turned into an exception, such that the harness survives the example
+process.exit = (code) => {
+  throw new ExitSignal(code === undefined ? process.exitCode || 0 : code);
+};
+
+function trackTimers(job) {
+  // Timers of an example are cleared when it finishes, such that they can not leak into later examples
+  for (const [name, create] of Object.entries(originalTimers)) {
+    globalThis[name] = (...args) => {
+      const timer = create(...args);
+      job.timers.push(timer);
+      return timer;
+    };
+  }
+}
+
+function untrackTimers(job) {
+  Object.assign(globalThis, originalTimers);
+  for (const timer of job.timers) {
+    clearTimeout(timer);
+    clearInterval(timer);
+    clearImmediate(timer);
+  }
+}
+
+function finishJob(code, timeout) {
+  const job = currentJob;
+  if (job === null) {
+    return;
+  }
+  currentJob = null;
+  clearTimeout(job.timeoutTimer);
+  clearTimeout(job.pollTimer);
+  untrackTimers(job);
+  process.stdout.write = originalStdoutWrite;
+  process.stderr.write = originalStderrWrite;
+  restoreState(initialState);
+  process.exitCode = undefined;
+  const tail = job.tail.join('').slice(-job.tailLimit);
+  send({ id: job.id, code, head: job.head.join(''), tail, length: job.length, timeout });
+  originalTimers.setImmediate(nextJob);
+}
+
+function failJob(error) {
+  if (currentJob === null) {
+    return;
+  }
+  if (error instanceof ExitSignal) {
+    finishJob(error.code, false);
+    return;
+  }
+  appendOutput(currentJob, `Uncaught ${error instanceof Error && error.stack ? error.stack : util.inspect(error)}\n`);
+  finishJob(1, false);
+}
+
+process.on('uncaughtException', failJob);
+process.on('unhandledRejection', failJob);
+// Taken once the harness is set up, such that its own patches (e.g. process.exit) are part of the state
+let initialState = null;
+
+function countResources() {
+  // Timers are counted per job, see trackTimers
+  return process.getActiveResourcesInfo().filter((type) => type !== 'Timeout' && type !== 'Immediate').length;
+}
+
+function pollJob() {
+  // The job is done when none of its timers and no resources besides the ones of the harness are active (like Node exiting)
+  if (currentJob === null) {
+    return;
+  }
+  const activeTimers = currentJob.timers.filter((timer) => !timer._destroyed && timer.hasRef());
+  if (activeTimers.length === 0 && countResources() <= currentJob.baseline) {
+    finishJob(process.exitCode || 0, false);
+    return;
+  }
+  currentJob.pollTimer = originalTimers.setTimeout(pollJob, 5).unref();
+}
+
+function appendOutput(job, text) {
+  // Only the head and the tail of the output are kept, such that examples stuck in output loops can not exhaust the memory
+  job.length += text.length;
+  if (job.headLength < job.headLimit) {
+    const part = text.slice(0, job.headLimit - job.headLength);
+    job.head.push(part);
+    job.headLength += part.length;
+    text = text.slice(part.length);
+  }
+  if (!text) {
+    return;
+  }
+  job.tail.push(text);
+  job.tailLength += text.length;
+  while (job.tailLength - job.tail[0].length >= job.tailLimit) {
+    job.tailLength -= job.tail.shift().length;
+  }
+}
+
+function runJob(job) {
+  currentJob = job;
+  job.head = [];
+  job.headLength = 0;
+  job.tail = [];
+  job.tailLength = 0;
+  job.length = 0;
+  job.baseline = countResources();
+  const capture = (chunk, encoding, callback) => {
+    appendOutput(job, String(chunk));
+    if (typeof encoding === 'function') {
+      encoding();
+    } else if (typeof callback === 'function') {
+      callback();
+    }
+    return true;
+  };
+  process.stdout.write = capture;
+  process.stderr.write = capture;
+  job.timeoutTimer = setTimeout(() => finishJob(124, true), job.timeout * 1000).unref();
+  job.timers = [];
+  trackTimers(job);
+  const module = { exports: {}, filename, id: '.', loaded: false, children: [], paths: [] };
+  globalThis.__harnessJob = { module, require: exampleRequire, filename, dirname: path.dirname(filename) };
+  // Keep the wrapper on the first line, such that line numbers in stack traces match the example
+  const wrapped = '(function (exports, require, module, __filename, __dirname) {' + job.example + '\n}).call('
+    + '__harnessJob.module.exports, __harnessJob.module.exports, __harnessJob.require, __harnessJob.module, __harnessJob.filename, __harnessJob.dirname);';
+  try {
+    vm.runInThisContext(wrapped, { filename, timeout: job.timeout * 1000 });
+  } catch (error) {
+    if (error && error.code === 'ERR_SCRIPT_EXECUTION_TIMEOUT') {
+      finishJob(124, true);
+      return;
+    }
+    failJob(error);
+    return;
+  }
+  delete globalThis.__harnessJob;
+  // Poll after the current tick, such that unhandled rejections are reported first
+  job.pollTimer = originalTimers.setTimeout(pollJob, 0).unref();
+}
+
+const queue = [];
+
+function nextJob() {
+  if (currentJob === null && queue.length > 0) {
+    runJob(queue.shift());
+  }
+}
+
+readline.createInterface({ input: process.stdin }).on('line', (line) => {
+  if (!line.trim()) {
+    return;
+  }
+  queue.push(JSON.parse(line));
+  nextJob();
+}).on('close', () => originalExit(0));
+
+initialState = snapshotState();
+send({ ready: true });
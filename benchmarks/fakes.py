@@ -0,0 +1,227 @@
+from dataclasses import dataclass, field
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+import random
+import re
+import time
+from typing import Any, Optional
+import zlib
+
+from jstypelog.utils import *
+
+# Latencies (in seconds) of the real tools, scaled down by the benchmark
+DEFAULT_LATENCIES = {
+    "npm view": 1.0,
+    "npm install": 8.0,
+    "npm ci": 20.0,
+    "git clone": 2.0,
+    "node": 0.3,
+    "npx tsx": 3.0,
+    "npx esbuild": 0.5,
+    "getRunTimeInformation.sh": 6.0,
+    "getRunTimeInformation.linux.sh": 6.0,
+    "generateDeclarationFile.sh": 4.0,
+    "llm": 5.0
+}
+# Probabilities of failures, e.g. packages without repository or examples that throw
+DEFAULT_FAILURE_RATES = {
+    "npm view": 0.1,
+    "npm install": 0.05,
+    "git clone": 0.05,
+    "node": 0.2,
+    "getRunTimeInformation.sh": 0.1,
+    "getRunTimeInformation.linux.sh": 0.1,
+    "generateDeclarationFile.sh": 0.05,
+    "npx tsx": 0.05,
+    "llm_reject": 0.1,
+    "llm": 0.2
+}
+FAKE_COMMIT = "0" * 40
+
+@dataclass
+class FakeConfig:
+    latency_scale: float = 0.001
+    failure_scale: float = 1.0
+    seed: int = 0
+    latencies: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_LATENCIES))
+    failure_rates: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_FAILURE_RATES))
+
+    def wait(self, name: str) -> None:
+        latency = self.latencies.get(name, 0) * self.latency_scale
+        if latency > 0:
+            time.sleep(latency)
+
+    def fails(self, name: str, key: str) -> bool:
+        # Deterministic per command, such that runs are comparable
+        rate = self.failure_rates.get(name, 0) * self.failure_scale
+        return random.Random(zlib.crc32(f"{self.seed}:{name}:{key}".encode())).random() < rate
+
+def get_fake_readme(package_name: str) -> str:
+    return (
+        f"# {package_name}\n\n"
+        f"```js\nconst {package_name.replace("-", "_")} = require(\"{package_name}\");\nconsole.log({package_name.replace("-", "_")});\n```\n\n"
+        f"```js\nconst api = require(\"{package_name}\");\napi();\n```\n"
+    )
+
+class FakeShell:
+    # Deterministic local replacements of npm, git, docker, node and the declaration scripts
+    def __init__(self, config: FakeConfig):
+        self._config = config
+
+    def __call__(self, command: str, cwd: Optional[str | Path], env: Optional[dict[str, str]], timeout: Optional[float]) -> ShellOutput:
+        tokens = command.split()
+        base_path = Path(cwd) if cwd is not None else Path.cwd()
+        name = get_command_name(command)
+        if name == "node" and len(tokens) > 1:
+            script_name = os.path.basename(tokens[1])
+            if script_name == "check_syntax.js":
+                snippets = json.loads(Path(tokens[2]).read_text())
+                Path(tokens[3]).write_text(json.dumps([None] * len(snippets)))
+                return ShellOutput("", 0, False)
+            if script_name == "transpile.js":
+                return ShellOutput("", 0, False)
+            if script_name == "coverage.js":
+                # Examples touch one of a few exports, depending on their content
+                content = (base_path / tokens[4]).read_text()
+                (base_path / tokens[3]).write_text(json.dumps([f"export{zlib.crc32(content.encode()) % 3}"]))
+                return ShellOutput("", 0, False)
+        if "--version" in tokens:
+            return ShellOutput("v0.0.0\n", 0, False)
+        self._config.wait(name)
+        key = f"{command}@{base_path}"
+        if name == "node" and (base_path / "index.js").is_file():
+            key += (base_path / "index.js").read_text()
+        if self._config.fails(name, key):
+            return ShellOutput(f"Fake {name} failure\n", 1, False)
+        match name:
+            case "npm view":
+                return ShellOutput(json.dumps(dict(type="git", url=f"git+https://github.com/fake/{tokens[2]}.git")), 0, False)
+            case "git clone":
+                output_path = base_path / tokens[-1]
+                package_name = tokens[-2].rsplit("/", 1)[-1]
+                create_dir(output_path / "test")
+                (output_path / "package.json").write_text(json.dumps(dict(name=package_name, main="index.js")))
+                (output_path / "README.md").write_text(get_fake_readme(package_name))
+                (output_path / "index.js").write_text("module.exports = function () { return 42; };\n")
+                (output_path / "test" / "index.test.js").write_text(f"const api = require(\"{package_name}\");\napi();\n")
+                return ShellOutput("", 0, False)
+            case "git rev-parse":
+                return ShellOutput(FAKE_COMMIT + "\n", 0, False)
+            case "npm install":
+                package_names = [token for token in tokens[2:] if not token.startswith("-")]
+                packages: dict[str, Any] = {"": dict(dependencies={name: "1.0.0" for name in package_names})}
+                for package_name in package_names:
+                    packages[f"node_modules/{package_name}"] = dict(
+                        version="1.0.0",
+                        resolved=f"https://registry.npmjs.org/{package_name}/-/{package_name.rsplit("/", 1)[-1]}-1.0.0.tgz",
+                        integrity=f"sha512-{package_name}",
+                        **(dict(bin={package_name: "index.js"}) if package_name == "tsx" else {})
+                    )
+                    # Like npm, packages that are already installed (e.g. linked from the package store) are kept
+                    package_path = base_path / "node_modules" / package_name
+                    if "--package-lock-only" not in tokens and not (package_path / "package.json").is_file():
+                        create_dir(package_path)
+                        (package_path / "package.json").write_text(json.dumps(dict(name=package_name, version="1.0.0")))
+                        (package_path / "index.js").write_text("module.exports = function () { return 42; };\n")
+                        (package_path / "LICENSE").write_text("MIT\n" * 20)
+                (base_path / "package.json").write_text(json.dumps(packages[""]))
+                (base_path / "package-lock.json").write_text(json.dumps(dict(lockfileVersion=3, requires=True, packages=packages)))
+                return ShellOutput(f"added {len(package_names)} packages\n", 0, False)
+            case "getRunTimeInformation.sh" | "getRunTimeInformation.linux.sh":
+                (base_path / tokens[2]).write_text("{}")
+                return ShellOutput("", 0, False)
+            case "generateDeclarationFile.sh":
+                declaration_path = base_path / tokens[3] / tokens[2] / "index.d.ts"
+                create_dir(declaration_path.parent)
+                declaration_path.write_text("declare function api(): number;\nexport = api;\n")
+                return ShellOutput("", 0, False)
+            case "npx tsx":
+                (base_path / "comparison.json").write_text(json.dumps(dict(
+                    soundness=1.0, completeness=1.0, equivalence=1.0, isSound=True, isComplete=True, isEquivalent=True
+                )))
+                return ShellOutput("", 0, False)
+            case _:
+                return ShellOutput("", 0, False)
+
+class FakePrompter:
+    # Replaces the easy_prompting Prompter, answers depend on the tag of the agent (evaluation or generation)
+    def __init__(self, config: FakeConfig, messages: Optional[list[str]] = None, tag: str = ""):
+        self._config = config
+        self._messages = [] if messages is None else messages
+        self._tag = tag
+
+    def get_copy(self) -> "FakePrompter":
+        return FakePrompter(self._config, list(self._messages), self._tag)
+
+    def set_tag(self, tag: str) -> None:
+        self._tag = tag
+
+    def set_logger(self, logger: Any) -> None:
+        pass
+
+    def set_debugger(self, debugger: Any) -> None:
+        pass
+
+    def set_cache(self, path: Path) -> None:
+        pass
+
+    def add_message(self, message: str, role: str = "user") -> None:
+        self._messages.append(message)
+
+    def get_data(self, data_format: Any) -> list:
+        self._config.wait("llm")
+        package_name = next((match.group(1) for message in self._messages for match in [re.search(r"npm package \"([^\"]+)\"", message)] if match), "package")
+        if self._tag == "evaluation":
+            if self._config.fails("llm_reject", package_name):
+                return [None, ("satisfied", ["Fake rejection"])]
+            return [None, ("unsatisfied", [None])]
+        key = f"{package_name}:{len(self._messages)}"
+        if self._config.fails("llm", key):
+            return [None, "console.log(\"missing import\");"]
+        return [None, f"const api = require(\"{package_name}\");\nconsole.log(api());\n"]
+
+class FakeLogger:
+    # Replaces the easy_prompting loggers and debuggers, the benchmark does not look at the conversations
+    def __init__(self, *args: Any, **kwargs: Any):
+        pass
+
+    def __enter__(self) -> "FakeLogger":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        pass
+
+    def set_verbose(self, verbose: bool = True) -> None:
+        pass
+
+    def set_crop(self, crop: Optional[int] = None) -> None:
+        pass
+
+class FakeFormat:
+    # Replaces the easy_prompting instructions, the FakePrompter answers without looking at them
+    def __init__(self, *args: Any, **kwargs: Any):
+        self.args = args
+
+def fake_list_text(*lines: str, add_scope: bool = False) -> str:
+    return "\n".join(f"- {line}" for line in lines)
+
+def fake_delimit_code(code: str, language: str = "") -> str:
+    return f"```{language}\n{code}\n```"
+
+# Replaces the easy_prompting.prebuilt module, such that the benchmark runs without the LLM stack
+FAKE_PROMPTING_TOOLKIT = SimpleNamespace(
+    ListLogger=FakeLogger,
+    FileLogger=FakeLogger,
+    FuncLogger=FakeLogger,
+    ReadableLogger=FakeLogger,
+    PrintDebugger=FakeLogger,
+    ListI=FakeFormat,
+    TextI=FakeFormat,
+    CodeI=FakeFormat,
+    ChoiceI=FakeFormat,
+    Item=FakeFormat,
+    delimit_code=fake_delimit_code,
+    list_text=fake_list_text
+)
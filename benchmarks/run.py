@@ -0,0 +1,134 @@
+from collections import Counter
+from contextlib import redirect_stdout
+import argparse
+import json
+import os
+from pathlib import Path
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from jstypelog import evaluate
+from jstypelog.examplification import prompter_factory, prompting_toolkit
+from jstypelog.utils import *
+from benchmarks.fakes import FAKE_PROMPTING_TOOLKIT, FakeConfig, FakePrompter, FakeShell
+
+FS_EVENTS = {
+    "os.mkdir": "mkdir",
+    "os.remove": "remove",
+    "os.rmdir": "rmdir",
+    "os.rename": "rename",
+    "os.listdir": "listdir",
+    "os.scandir": "scandir",
+    "shutil.copyfile": "copyfile",
+    "shutil.copytree": "copytree",
+    "shutil.rmtree": "rmtree"
+}
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT
+
+class FileSystemCounter:
+    # Counts file system operations with an audit hook (hooks can not be removed, so counting is switched on and off)
+    def __init__(self):
+        self.counts: Counter[str] = Counter()
+        self.active = False
+        sys.addaudithook(self._hook)
+
+    def _hook(self, event: str, args: tuple) -> None:
+        if not self.active:
+            return None
+        if event == "open":
+            path, mode, flags = args
+            writing = ("w" in mode or "a" in mode or "x" in mode or "+" in mode) if isinstance(mode, str) else bool(flags & WRITE_FLAGS)
+            self.counts["open_write" if writing else "open_read"] += 1
+            if writing and str(path).endswith(DATA_JSON_PATH.name):
+                self.counts["data_json_write"] += 1
+        elif event in FS_EVENTS:
+            self.counts[FS_EVENTS[event]] += 1
+
+def create_build(build_path: Path, num_packages: int) -> None:
+    # Synthetic DefinitelyTyped repository and prebuilt tools, such that no build step touches the network
+    for index in range(num_packages):
+        package_path = build_path / DEFINITELY_TYPED_PATH / "types" / f"fake-package-{index}"
+        create_dir(package_path)
+        (package_path / "index.d.ts").write_text("declare function api(): number;\nexport = api;\n")
+    for tool_path in [RUN_TIME_ANALYZER_PATH, DECLARATION_GENERATOR_PATH]:
+        create_dir(build_path / tool_path)
+        (build_path / tool_path / "README.md").write_text("fake")
+    create_dir(build_path / NPM_TOOLS_PATH)
+    (build_path / TRANSPILE_PATH).write_text("")
+
+def run_benchmark(num_packages: int, config: FakeConfig, counter: FileSystemCounter, measure_memory: bool) -> dict:
+    work_path = Path(tempfile.mkdtemp(prefix="jstypelog_benchmark_"))
+    try:
+        create_build(work_path / "builds", num_packages)
+        evaluation_path = work_path / "evaluation"
+        if measure_memory:
+            tracemalloc.start()
+        counter.counts.clear()
+        counter.active = True
+        start_time = time.perf_counter()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            with with_shell_backend(FakeShell(config)):
+                token = prompter_factory.set(lambda llm_model_name, llm_temperature: FakePrompter(config))
+                toolkit_token = prompting_toolkit.set(lambda: FAKE_PROMPTING_TOOLKIT)
+                try:
+                    evaluate(
+                        evaluation_path=evaluation_path,
+                        build_path=work_path / "builds",
+                        start=0,
+                        length=num_packages,
+                        random_seed=None,
+                        verbose=False,
+                        verbose_setup=False,
+                        verbose_exceptions=False,
+                        verbose_statistics=False,
+                        llm_verbose=False
+                    )
+                finally:
+                    prompting_toolkit.reset(toolkit_token)
+                    prompter_factory.reset(token)
+        duration = time.perf_counter() - start_time
+        counter.active = False
+        peak_memory = None
+        if measure_memory:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        metrics = json.loads((evaluation_path / "metrics" / "absolute_metrics.json").read_text())
+        return dict(
+            packages = num_packages,
+            seconds = round(duration, 3),
+            packages_per_second = round(num_packages / duration, 3),
+            usable = metrics["usable"],
+            unexpected_exception = metrics["unexpected_exception"],
+            peak_python_memory = peak_memory,
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+            file_system = dict(sorted(counter.counts.items())),
+            file_system_per_package = {name: round(count / num_packages, 1) for name, count in sorted(counter.counts.items())}
+        )
+    finally:
+        shutil.rmtree(work_path, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.run",
+        description="Measure the orchestration overhead of the evaluation with fake npm, git, Docker, Node and LLM backends."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100], help="Numbers of synthetic packages (default: 100).")
+    parser.add_argument("--latency-scale", type=float, default=0.001, help="Factor for the latencies of the real tools (default: 0.001).")
+    parser.add_argument("--failure-scale", type=float, default=1.0, help="Factor for the failure rates (default: 1.0).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the fake failures (default: 0).")
+    parser.add_argument("--memory", action="store_true", help="Trace the peak Python memory (slows down the run).")
+    parser.add_argument("--output", type=Path, default=None, metavar="PATH", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+    config = FakeConfig(latency_scale=args.latency_scale, failure_scale=args.failure_scale, seed=args.seed)
+    counter = FileSystemCounter()
+    results = []
+    for size in args.sizes:
+        result = run_benchmark(size, config, counter, args.memory)
+        print(json.dumps(result, indent=2))
+        results.append(result)
+    if args.output is not None:
+        create_file(args.output, content=json.dumps(results, indent=2))
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+from pathlib import Path
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from jstypelog.utils import *
+
+# Snippets that are run in fresh interpreters, the last one is what a worker of the evaluation imports
+DEFAULT_TARGETS = {
+    "interpreter": "pass",
+    "package": "import jstypelog",
+    "utils": "import jstypelog.utils",
+    "generation": "import jstypelog.generation",
+    "evaluation": "import jstypelog.evaluation",
+    "cli_help": None
+}
+HEAVY_MODULES = ["easy_prompting", "openai"]
+
+def get_command(snippet: str | None) -> list[str]:
+    if snippet is None:
+        return [sys.executable, "-m", "jstypelog", "--help"]
+    return [sys.executable, "-c", snippet]
+
+def measure_wall_times(command: list[str], repetitions: int) -> list[float]:
+    times = []
+    for _ in range(repetitions):
+        start_time = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start_time)
+    return times
+
+def measure_import_times(snippet: str, num_modules: int) -> list[dict]:
+    # Cumulative import times (in microseconds) of -X importtime, the slowest top-level modules first
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", snippet], capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        match = re.fullmatch(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)", line)
+        if match is not None and len(match.group(3)) == 1:
+            modules.append(dict(module=match.group(4), cumulative=int(match.group(2))))
+    return sorted(modules, key=lambda module: -module["cumulative"])[:num_modules]
+
+def get_loaded_heavy_modules(snippet: str) -> list[str]:
+    check = f"{snippet}\nimport sys\nprint(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True)
+    return [name for name in result.stdout.strip().split(",") if name]
+
+def run_benchmark(repetitions: int, num_modules: int) -> dict:
+    results = {}
+    for target, snippet in DEFAULT_TARGETS.items():
+        times = sorted(measure_wall_times(get_command(snippet), repetitions))
+        result = dict(
+            min = round(min(times), 4),
+            median = round(statistics.median(times), 4),
+            max = round(max(times), 4)
+        )
+        if snippet is not None and target != "interpreter":
+            result["heavy_modules"] = get_loaded_heavy_modules(snippet)
+            result["slowest_imports"] = measure_import_times(snippet, num_modules)
+        results[target] = result
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.startup",
+        description="Measure the start-up time of the CLI and of the imports that workers of the evaluation need."
+    )
+    parser.add_argument("--repetitions", type=int, default=10, help="Number of fresh interpreters per target (default: 10).")
+    parser.add_argument("--modules", type=int, default=5, help="Number of slowest imports to report per target (default: 5).")
+    parser.add_argument("--output", type=Path, default=None, metavar="PATH", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+    # Children import the working tree like the benchmark itself
+    os.environ["PYTHONPATH"] = os.pathsep.join([str(Path(__file__).parent.parent), *filter(None, [os.environ.get("PYTHONPATH")])])
+    results = run_benchmark(args.repetitions, args.modules)
+    print(json.dumps(results, indent=2))
+    if args.output is not None:
+        create_file(args.output, content=json.dumps(results, indent=2))
@@ -1,5 +1,35 @@
-from jstypelog.examplification import generate_examples, CommonJSUnsupportedError, PackageDataMissingError
-from jstypelog.declaration import generate_declarations
-from jstypelog.comparison import generate_comparisons
-from jstypelog.generation import generate
-from jstypelog.evaluation import evaluate
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING, Any
+
+# Stage modules are imported on first use (PEP 562), such that e.g. short commands and worker processes start fast
+_LAZY_ATTRIBUTES = {
+    "generate_examples": "jstypelog.examplification",
+    "CommonJSUnsupportedError": "jstypelog.utils.shared",
+    "PackageDataMissingError": "jstypelog.utils.shared",
+    "generate_declarations": "jstypelog.declaration",
+    "generate_comparisons": "jstypelog.comparison",
+    "generate": "jstypelog.generation",
+    "evaluate": "jstypelog.evaluation",
+    "serve": "jstypelog.service"
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from jstypelog.examplification import generate_examples
+    from jstypelog.utils.shared import CommonJSUnsupportedError, PackageDataMissingError
+    from jstypelog.declaration import generate_declarations
+    from jstypelog.comparison import generate_comparisons
+    from jstypelog.generation import generate
+    from jstypelog.evaluation import evaluate
+    from jstypelog.service import serve
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + __all__)
\ No newline at end of file
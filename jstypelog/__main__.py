@@ -1,7 +1,7 @@
 from pathlib import Path
 import argparse
 
-from jstypelog import generate, evaluate
+from jstypelog.utils.shared import MAX_NUM_CONCURRENT_EXECUTIONS
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -12,7 +12,7 @@ if __name__ == "__main__":
         "--mode",
         metavar="MODE",
         default="generation",
-        help="Which mode to run: (default='generation', 'evaluation')."
+        help="Which mode to run: (default='generation', 'evaluation', 'service', 'gc', 'inspect')."
     )
     parser.add_argument(
         "--package",
@@ -36,6 +36,86 @@ if __name__ == "__main__":
         action="store_true",
         help="Do not use an LLM to generate use-case examples for a package."
     )
+    parser.add_argument(
+        "--llm-candidates",
+        type=int,
+        default=1,
+        metavar="K",
+        help="Number of example candidates the LLM generates concurrently per attempt (default: 1)."
+    )
+    parser.add_argument(
+        "--prefilter",
+        default="shadow",
+        metavar="MODE",
+        help="How to use the metadata pre-filter: (default='shadow', 'enforce', 'off')."
+    )
+    parser.add_argument(
+        "--warm-execution",
+        action="store_true",
+        help="Run examples in a warm Node process that has the package already required."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=MAX_NUM_CONCURRENT_EXECUTIONS,
+        metavar="N",
+        help=f"Maximum number of examples of a package that are executed or analyzed concurrently (default: {MAX_NUM_CONCURRENT_EXECUTIONS})."
+    )
+    parser.add_argument(
+        "--dedup-identifiers",
+        action="store_true",
+        help="Treat examples that only differ in local identifier names as duplicates."
+    )
+    parser.add_argument(
+        "--minimize-examples",
+        action="store_true",
+        help="Only combine a subset of the examples that covers every package export the examples touch."
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep earlier outputs and only rebuild the artifacts whose inputs changed."
+    )
+    parser.add_argument(
+        "--fixed-timeouts",
+        action="store_true",
+        help="Use the fixed timeouts instead of timeouts learned from earlier durations."
+    )
+    parser.add_argument(
+        "--no-package-store",
+        action="store_true",
+        help="Install every package into its own node_modules instead of linking from the shared package store."
+    )
+    parser.add_argument(
+        "--no-triage",
+        action="store_true",
+        help="Do not check installability, CommonJS and ES5 support of all packages before the evaluation."
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="Seal every evaluated package into one compressed archive instead of keeping its directory."
+    )
+    parser.add_argument(
+        "--file",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="File of the package to print for inspect mode, all files are listed otherwise."
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8421,
+        help="Port of the local HTTP API for service mode (default: 8421)."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of packages that are generated concurrently (default: 1 for evaluation mode, 2 for service mode)."
+    )
     parser.add_argument(
         "--start",
         type=int,
@@ -51,6 +131,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
     match args.mode:
         case "evaluation":
+            from jstypelog import evaluate
             evaluate(
                 evaluation_path=Path("output/evaluation"),
                 build_path=Path("output/builds"),
@@ -71,9 +152,23 @@ if __name__ == "__main__":
                 llm_temperature=0,
                 llm_verbose=True,
                 llm_interactive=False,
+                llm_num_candidates=args.llm_candidates,
+                prefilter_mode=args.prefilter,
+                warm_execution=args.warm_execution,
+                execution_concurrency=args.concurrency,
+                deduplicate_identifiers=args.dedup_identifiers,
+                minimize_examples=args.minimize_examples,
+                declaration_concurrency=args.concurrency,
+                incremental=args.incremental,
+                adaptive_timeouts=not args.fixed_timeouts,
+                use_package_store=not args.no_package_store,
+                triage=not args.no_triage,
+                archive_packages=args.archive,
+                num_workers=args.workers or 1,
                 overwrite=False
             )
         case "generation":
+            from jstypelog import generate
             generate(
                 package_name=args.package,
                 generation_path=Path(f"output/generation/{args.package}"),
@@ -93,10 +188,53 @@ if __name__ == "__main__":
                 llm_temperature=0,
                 llm_verbose=True,
                 llm_interactive=False,
+                llm_num_candidates=args.llm_candidates,
+                prefilter_mode=args.prefilter,
+                warm_execution=args.warm_execution,
+                execution_concurrency=args.concurrency,
+                deduplicate_identifiers=args.dedup_identifiers,
+                minimize_examples=args.minimize_examples,
+                declaration_concurrency=args.concurrency,
+                incremental=args.incremental,
+                adaptive_timeouts=not args.fixed_timeouts,
+                use_package_store=not args.no_package_store,
                 overwrite=True,
                 combine_examples=True,
                 combined_only=True
             )
+        case "service":
+            from jstypelog import serve
+            serve(
+                service_path=Path("output/service"),
+                build_path=Path("output/builds"),
+                port=args.port,
+                num_workers=args.workers or 2,
+                generate_with_llm=not args.exclude_llm,
+                generate_comparisons=args.compare,
+                llm_model_name="gpt-4o-mini-2024-07-18",
+                llm_temperature=0,
+                verbose_setup=True
+            )
+        case "gc":
+            from jstypelog.utils import PACKAGE_STORE_PATH, collect_package_store
+            summary = collect_package_store(Path("output/builds") / PACKAGE_STORE_PATH)
+            print(f"Removed {summary["removed_files"]} file(s) ({summary["removed_bytes"] / 1024 ** 2:.1f} MiB) and {summary["removed_packages"]} package(s) from the package store, kept {summary["kept_files"]} file(s)")
+        case "inspect":
+            from jstypelog.utils import ArchiveReader, PACKAGES_PATH, escape_package_name, open_package
+            generation_path = Path("output/evaluation") / PACKAGES_PATH / escape_package_name(args.package)
+            with open_package(generation_path) as package:
+                if args.file is not None:
+                    content = package.read_bytes(args.file)
+                    if content is None:
+                        print(f"File {args.file!r} not found in {package}")
+                        exit(1)
+                    print(content.decode(errors="replace"), end="")
+                else:
+                    for file_path in package.list_files():
+                        print(file_path)
+                    if isinstance(package, ArchiveReader):
+                        size, compressed_size = package.get_sizes()
+                        print(f"{package}: {size / 1024:.1f} KiB in {compressed_size / 1024:.1f} KiB")
         case _:
             print(f"Unknown mode given {args.mode!r}")
             exit(1)
\ No newline at end of file
@@ -1,5 +1,7 @@
 import json
 from pathlib import Path
+import time
+from typing import Optional
 
 from jstypelog.utils import *
 
@@ -10,9 +12,10 @@ def generate_comparisons(
     verbose_setup: bool,
     verbose_execution: bool,
     verbose_files: bool,
-    combined_only: bool
+    combined_only: bool,
+    mode_paths: Optional[list[Path]] = None
 ) -> None:
-    with printer(f"Generating comparisons:"):
+    with logger.context(stage="comparisons"), printer(f"Generating comparisons:"):
         declarations_path = generation_path / DECLARATIONS_PATH
         comparisons_path = generation_path / COMPARISONS_PATH
         template_path = generation_path / TEMPLATE_PATH
@@ -24,6 +27,8 @@ def generate_comparisons(
             with printer(f"DefinitelyTyped declaration content:"):
                 printer(dt_declaration_path.read_text().strip())
         for sub_path in (COMBINED_MODE_PATHS if combined_only else ALL_MODE_PATHS):
+            if mode_paths is not None and sub_path not in mode_paths:
+                continue
             declarations_sub_path = declarations_path / sub_path
             children = get_children(declarations_sub_path)
             printer(f"Found {len(children)} declarations(s) for {sub_path}")
@@ -43,13 +48,15 @@ def generate_comparisons(
                     create_file(playground_path / "predicted.d.ts", declaration_path)
                     create_file(playground_path / "expected.d.ts", dt_declaration_path)
                     with printer(f"Comparing generated declaration to DefinitelyTyped declaration:"):
+                        start_time = time.perf_counter()
                         shell_output = shell(
                             f"npx tsx compare.ts",
                             cwd=playground_path,
                             check=False,
-                            timeout=EXECUTION_TIMEOUT,
+                            timeout=timeout_controller.get_timeout("comparison"),
                             verbose=verbose_execution
                         )
+                        timeout_controller.record("comparison", time.perf_counter() - start_time, shell_output.timeout)
                         comparison_path = playground_path / "comparison.json"
                         if shell_output.code or not comparison_path.is_file() or not comparison_path.read_text():
                             printer(f"Fail")
@@ -1,8 +1,17 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import math
 import platform
 from pathlib import Path
+import shutil
+import time
+from typing import Optional
 
 from jstypelog.utils import *
 
+# The analysis script stops its container after the timeout, the grace covers its kill-after (5 s) and the removal of the container.
+# The shell only kills the script if that does not work.
+CONTAINER_TIMEOUT_GRACE = 15
+
 def generate_declarations(
     package_name: str,
     generation_path: Path,
@@ -10,9 +19,13 @@ def generate_declarations(
     verbose_setup: bool,
     verbose_execution: bool,
     verbose_files: bool,
-    combined_only: bool
+    combined_only: bool,
+    deduplicate_examples: bool = True,
+    deduplicate_identifiers: bool = False,
+    declaration_concurrency: int = MAX_NUM_CONCURRENT_DECLARATIONS,
+    mode_paths: Optional[list[Path]] = None
 ) -> None:
-    with printer(f"Generating declarations:"):
+    with logger.context(stage="declarations"), printer(f"Generating declarations:"):
         examples_path = generation_path / EXAMPLES_PATH
         declarations_path = generation_path / DECLARATIONS_PATH
         template_path = generation_path / TEMPLATE_PATH
@@ -22,76 +35,146 @@ def generate_declarations(
         build_ts_declaration_file_generator(build_path, verbose_setup)
         build_npm_tools(build_path, verbose_setup)
         build_template_project(package_name, generation_path, verbose_setup)
-        for sub_path in (COMBINED_MODE_PATHS if combined_only else ALL_MODE_PATHS):
-            examples_sub_path = examples_path / sub_path
-            children = get_children(examples_sub_path)
-            printer(f"Found {len(children)} example(s) for {sub_path}")
-            if len(children) == 0:
-                continue
-            declarations_sub_path = declarations_path / sub_path
-            create_dir(declarations_sub_path)
-            for example_path in children:
-                with printer(f"Generating declarations for {example_path.name}:"):
-                    if verbose_files:
-                        with printer(f"Example content:"):
-                            printer(example_path.read_text())
-                    create_dir(playground_path, template_path, overwrite=True)
-                    main_path = playground_path / "index.js"
-                    create_file(main_path, example_path)
-                    # Transpile the example into JavaScript 5 (does not polyfill missing API such as e.g. promises)
-                    with printer(f"Transpiling example into ES5:"):
-                        shell_output = shell(
-                            f"node {transpile_path.resolve()} {main_path.relative_to(playground_path)}",
-                            cwd=playground_path,
-                            check=False,
-                            timeout=EXECUTION_TIMEOUT,
-                            verbose=verbose_execution
-                        )
-                        if shell_output.code:
-                            printer(f"Fail")
-                            continue
-                        printer(f"Success")
-                    if verbose_files:
-                        with printer(f"Transpiled example content:"):
-                            printer(main_path.read_text())
-                    # Apply run time information analysis using Jalangi 2
-                    with printer(f"Running {RUN_TIME_ANALYZER_PATH.name}:"):
-                        if platform.system() == "Linux":
-                            script_path = DECLARATION_SCRIPTS_PATH / "getRunTimeInformation.linux.sh"
+        example_cache = ExampleCache(generation_path / DEDUPLICATION_PATH, deduplicate_identifiers) if deduplicate_examples else None
+        size_bucket = get_size_bucket(get_package_size(template_path / "node_modules" / package_name))
+
+        # Reusable helper function for generating the declaration of a single example
+        def generate_declaration(example_path: Path, playground_path: Path, timings: dict[str, float]) -> Optional[str]:
+            create_dir(playground_path, template_path, overwrite=True)
+            main_path = playground_path / "index.js"
+            create_file(main_path, example_path)
+            # Transpile the example into JavaScript 5 (does not polyfill missing API such as e.g. promises)
+            with printer(f"Transpiling example into ES5:"), measure_time(timings, "transpilation"):
+                start_time = time.perf_counter()
+                shell_output = shell(
+                    f"node {transpile_path.resolve()} {main_path.relative_to(playground_path)}",
+                    cwd=playground_path,
+                    check=False,
+                    timeout=timeout_controller.get_timeout("transpilation", size_bucket),
+                    verbose=verbose_execution
+                )
+                timeout_controller.record("transpilation", time.perf_counter() - start_time, shell_output.timeout, size_bucket)
+                if shell_output.code:
+                    printer(f"Fail")
+                    return None
+                printer(f"Success")
+            if verbose_files:
+                with printer(f"Transpiled example content:"):
+                    printer(main_path.read_text())
+            # Apply run time information analysis using Jalangi 2
+            with printer(f"Running {RUN_TIME_ANALYZER_PATH.name}:"), measure_time(timings, "run_time_analysis"):
+                if platform.system() == "Linux":
+                    script_path = DECLARATION_SCRIPTS_PATH / "getRunTimeInformation.linux.sh"
+                else:
+                    script_path = DECLARATION_SCRIPTS_PATH / "getRunTimeInformation.sh"
+                run_time_path = playground_path / RUN_TIME_ANALYZER_PATH.name / "run_time_info.json"
+                create_dir(run_time_path.parent, overwrite=True)
+                timeout = math.ceil(timeout_controller.get_timeout("run_time_analysis", size_bucket))
+                start_time = time.perf_counter()
+                shell_output = shell(
+                    f"{script_path} {main_path.relative_to(playground_path)} {run_time_path.relative_to(playground_path)} {timeout}",
+                    cwd=playground_path,
+                    check=False,
+                    timeout=timeout + CONTAINER_TIMEOUT_GRACE,
+                    verbose=verbose_execution,
+                    container_name=get_container_name()
+                )
+                # The script exits with the status of its timeout (killed if the container did not stop in time)
+                duration = time.perf_counter() - start_time
+                timed_out = shell_output.timeout or shell_output.code in (TIMEOUT_EXIT_CODE, TIMEOUT_KILLED_EXIT_CODE) or duration >= timeout
+                timeout_controller.record("run_time_analysis", duration, timed_out, size_bucket)
+                if shell_output.code or not run_time_path.is_file() or not run_time_path.read_text():
+                    printer(f"Fail")
+                    return None
+                printer(f"Success")
+            # Generate .d.ts file using dts-generate
+            with printer(f"Running {DECLARATION_GENERATOR_PATH.name}:"), measure_time(timings, "declaration_generation"):
+                script_path = DECLARATION_SCRIPTS_PATH / "generateDeclarationFile.sh"
+                declaration_path = playground_path / DECLARATION_GENERATOR_PATH.name
+                create_dir(declaration_path, overwrite=True)
+                start_time = time.perf_counter()
+                shell_output = shell(
+                    f"{script_path} {run_time_path.relative_to(playground_path)} {package_name} {declaration_path.relative_to(playground_path)}",
+                    cwd=playground_path,
+                    check=False,
+                    timeout=timeout_controller.get_timeout("declaration_generation", size_bucket),
+                    verbose=verbose_execution,
+                    container_name=get_container_name()
+                )
+                timeout_controller.record("declaration_generation", time.perf_counter() - start_time, shell_output.timeout, size_bucket)
+                declaration_path = declaration_path / package_name / "index.d.ts"
+                if shell_output.code or not declaration_path.is_file() or not declaration_path.read_text():
+                    printer(f"Fail")
+                    return None
+                declaration = declaration_path.read_text().strip()
+                if verbose_files:
+                    with printer(f"Declaration content:"):
+                        printer(declaration)
+                printer(f"Success")
+                return declaration
+
+        # Runs in a worker thread, every example gets an isolated playground such that examples and modes can be processed concurrently
+        def process_example(sub_path: Path, example_path: Path, cache_key: Optional[str]) -> tuple[Optional[str], dict[str, float], str]:
+            timings: dict[str, float] = {}
+            with printer.with_buffer() as buffer, measure_time(timings, "total"):
+                if verbose_files:
+                    with printer(f"Example content:"):
+                        printer(example_path.read_text())
+                cached = example_cache.get("declaration", cache_key) if example_cache is not None and cache_key is not None else None
+                if cached is not None:
+                    printer(f"Reusing declaration of a duplicate example: {"Success" if cached["declaration"] else "Fail"}")
+                    declaration = cached["declaration"]
+                else:
+                    playground_sub_path = get_isolated_path(playground_path, f"{sub_path.name}_{example_path.stem}")
+                    declaration = generate_declaration(example_path, playground_sub_path, timings)
+                    shutil.rmtree(playground_sub_path, ignore_errors=True)
+                    if example_cache is not None and cache_key is not None:
+                        example_cache.set("declaration", cache_key, dict(declaration=declaration))
+            return declaration, timings, buffer.get_text()
+
+        modes = [(sub_path, get_children(examples_path / sub_path)) for sub_path in (COMBINED_MODE_PATHS if combined_only else ALL_MODE_PATHS) if mode_paths is None or sub_path in mode_paths]
+        with ThreadPoolExecutor(max_workers=max(declaration_concurrency, 1)) as executor:
+            futures: dict[tuple[Path, Path], Future] = {}
+            owners: dict[Future, tuple[Path, Path]] = {}
+            submitted: dict[str, Future] = {}
+            for sub_path, children in modes:
+                for example_path in children:
+                    # Duplicates within this run wait for the first occurrence instead of being analyzed in parallel
+                    cache_key = example_cache.get_key(example_path.read_text()) if example_cache is not None else None
+                    if cache_key is not None and cache_key in submitted:
+                        futures[(sub_path, example_path)] = submitted[cache_key]
+                        continue
+                    future = submit_in_context(executor, process_example, sub_path, example_path, cache_key)
+                    futures[(sub_path, example_path)] = future
+                    owners[future] = (sub_path, example_path)
+                    if cache_key is not None:
+                        submitted[cache_key] = future
+            # Print and save in a fixed order, such that the logs and outputs are deterministic
+            all_timings = {}
+            for sub_path, children in modes:
+                printer(f"Found {len(children)} example(s) for {sub_path}")
+                if len(children) == 0:
+                    continue
+                declarations_sub_path = declarations_path / sub_path
+                create_dir(declarations_sub_path)
+                for example_path in children:
+                    with printer(f"Generating declarations for {example_path.name}:"):
+                        future = futures[(sub_path, example_path)]
+                        declaration, timings, text = future.result()
+                        if owners[future] == (sub_path, example_path):
+                            printer.replay(text)
+                            printer(f"Timings: {", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())}")
+                            all_timings[f"{sub_path}/{example_path.name}"] = timings
                         else:
-                            script_path = DECLARATION_SCRIPTS_PATH / "getRunTimeInformation.sh"
-                        run_time_path = playground_path / RUN_TIME_ANALYZER_PATH.name / "run_time_info.json"
-                        create_dir(run_time_path.parent, overwrite=True)           
-                        shell_output = shell(
-                            f"{script_path} {main_path.relative_to(playground_path)} {run_time_path.relative_to(playground_path)} {EXECUTION_TIMEOUT * 2}",
-                            cwd=playground_path,
-                            check=False,
-                            timeout=EXECUTION_TIMEOUT,
-                            verbose=verbose_execution
-                        )
-                        if shell_output.code or not run_time_path.is_file() or not run_time_path.read_text():
-                            printer(f"Fail")
-                            continue
-                        printer(f"Success")
-                    # Generate .d.ts file using dts-generate
-                    with printer(f"Running {DECLARATION_GENERATOR_PATH.name}:"):
-                        script_path = DECLARATION_SCRIPTS_PATH / "generateDeclarationFile.sh"
-                        declaration_path = playground_path / DECLARATION_GENERATOR_PATH.name
-                        create_dir(declaration_path, overwrite=True)
-                        shell_output = shell(
-                            f"{script_path} {run_time_path.relative_to(playground_path)} {package_name} {declaration_path.relative_to(playground_path)}",
-                            cwd=playground_path,
-                            check=False,
-                            timeout=EXECUTION_TIMEOUT,
-                            verbose=verbose_execution
-                        )
-                        declaration_path = declaration_path / package_name / "index.d.ts"
-                        if shell_output.code or not declaration_path.is_file() or not declaration_path.read_text():
-                            printer(f"Fail")
-                            continue
-                        declaration = declaration_path.read_text().strip()
-                        if verbose_files:
-                            with printer(f"Declaration content:"):
-                                printer(declaration)
-                        create_file(declarations_sub_path / example_path.name.replace(".js", ".d.ts"), content=declaration)
-                        printer(f"Success")
\ No newline at end of file
+                            printer(f"Reusing declaration of a duplicate example: {"Success" if declaration else "Fail"}")
+                        if declaration is not None:
+                            create_file(declarations_sub_path / example_path.name.replace(".js", ".d.ts"), content=declaration)
+            save_data(generation_path / DATA_JSON_PATH, "declaration_timings", all_timings)
+            # What the minimization saves: the run-time analysis of the minimized combined example, and for the combination
+            # of all examples an estimate that scales the measured duration with the size (it is not analyzed)
+            minimization = load_data(generation_path / DATA_JSON_PATH, "example_minimization", raise_missing=False)
+            run_time_analysis = all_timings.get(f"{COMBINED_ALL_PATH}/0.js", {}).get("run_time_analysis")
+            if minimization and run_time_analysis is not None:
+                minimization["analysis_seconds"] = round(run_time_analysis, 3)
+                minimization["estimated_full_analysis_seconds"] = round(run_time_analysis * minimization["size"] / max(minimization["kept_size"], 1), 3)
+                save_data(generation_path / DATA_JSON_PATH, "example_minimization", minimization)
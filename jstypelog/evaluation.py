@@ -1,14 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 import json
 from pathlib import Path
 import random
 import sys
+import time
 import traceback
 from typing import Optional
 
 from jstypelog.utils import *
 from jstypelog.comparison import build_definitely_typed
 from jstypelog.generation import generate
+from jstypelog.triage import TRIAGE_VERDICTS, triage_packages
 
 def evaluate(
     evaluation_path: Path,
@@ -30,27 +33,41 @@ def evaluate(
     llm_model_name: str = "gpt-4o-mini",
     llm_temperature: int = 0,
     llm_verbose: bool = True,
-    llm_interactive: bool = False
+    llm_interactive: bool = False,
+    llm_num_candidates: int = 1,
+    prefilter_mode: str = "shadow",
+    warm_execution: bool = False,
+    execution_concurrency: int = MAX_NUM_CONCURRENT_EXECUTIONS,
+    deduplicate_examples: bool = True,
+    deduplicate_identifiers: bool = False,
+    minimize_examples: bool = False,
+    declaration_concurrency: int = MAX_NUM_CONCURRENT_DECLARATIONS,
+    incremental: bool = False,
+    adaptive_timeouts: bool = True,
+    use_package_store: bool = True,
+    triage: bool = True,
+    archive_packages: bool = False,
+    num_workers: int = 1
 ) -> None:
     logs_path = evaluation_path / "logs"
     create_dir(logs_path)
-    with open(make_path_name_unique(logs_path / "shell.txt"), "w") as log_file:
-        with printer.with_file(log_file):
+    with logger.with_sink(FileSink(make_path_name_unique(logs_path / "log.jsonl"), format_json)), tracer.with_trace(make_path_name_unique(logs_path / "trace.json")) as trace:
+        with printer.with_file(make_path_name_unique(logs_path / "shell.txt")):
             with printer("Starting evaluation:"):
                 with printer.with_verbose(verbose):
                     build_definitely_typed(build_path, verbose_setup)
+                    # Built once up front, such that their commits are part of the versions and concurrent packages do not build them at the same time
+                    build_npm_tools(build_path, verbose_setup)
+                    build_run_time_information_gathering(build_path, verbose_setup)
+                    build_ts_declaration_file_generator(build_path, verbose_setup)
                     # Save version data for reproducability
                     versions: dict = dict(
                         date = str(datetime.date.today()),
                         python = ".".join(map(str, sys.version_info[:3])),
-                        node = shell("node --version").value.strip(),
-                        npm = shell("npm --version").value.strip(),
-                        git = shell("git --version").value.strip(),
-                        docker = shell("docker --version").value.strip(),
+                        **get_tool_versions(build_path),
                         llm_model_name = llm_model_name,
                         llm_temperature = llm_temperature,
-                        random_seed = random_seed,
-                        definitely_typed = shell("git rev-parse HEAD", cwd=build_path / DEFINITELY_TYPED_PATH).value.strip()
+                        random_seed = random_seed
                     )
                     versions_json = json.dumps(versions, indent=2, ensure_ascii=False)
                     create_file(evaluation_path / "reproduction" / "info.json", content=versions_json)
@@ -73,9 +90,43 @@ def evaluate(
                     length = len(package_names) if length is None else length
                     package_names_subset = package_names[start:start+length]
                 printer(f"Evaluating {len(package_names_subset)} of {len(package_names)} packages ({start}-{start+length})")
-                for i, package_name in enumerate(package_names_subset):
+                # Cheap checks of all packages first, such that failing packages never clone their repository or prompt the LLM
+                triage_verdicts = {}
+                if triage:
+                    with printer.with_verbose(verbose), timeout_controller.with_store(build_path / TIMEOUTS_JSON_PATH if adaptive_timeouts else None), with_package_store(build_path / PACKAGE_STORE_PATH if use_package_store else None):
+                        triage_verdicts = triage_packages(
+                            package_names=package_names_subset,
+                            evaluation_path=evaluation_path,
+                            build_path=build_path,
+                            check_es5=check_es5,
+                            verbose_setup=verbose_setup,
+                            verbose_execution=verbose_execution,
+                            concurrency=execution_concurrency,
+                            incremental=incremental,
+                            versions=versions
+                        )
+                # Expensive packages are dispatched first, such that a few large packages at the end do not stretch the run.
+                # The metrics are computed over the seeded subset as before, only the order of the generation changes.
+                duration_store = DurationStore(build_path / DURATIONS_JSON_PATH)
+                schedule = list(enumerate(package_names_subset))
+                if num_workers > 1:
+                    durations = duration_store.load()
+                    features = {
+                        package_name: get_package_features(package_name, evaluation_path / PACKAGES_PATH / escape_package_name(package_name), build_path, durations)
+                        for package_name in package_names_subset
+                    }
+                    costs = estimate_costs(features)
+                    indices = {package_name: i for i, package_name in schedule}
+                    schedule = [(indices[package_name], package_name) for package_name in schedule_longest_first(package_names_subset, costs)]
+                    printer(f"Packages are scheduled longest first on {num_workers} workers (estimated: {sum(costs.values()) / num_workers:.0f} s per worker)")
+
+                def evaluate_package(i: int, package_name: str) -> None:
                     with printer(f"Evaluating package \"{package_name}\" (index: {i+start}):"):
                         generation_path = evaluation_path / PACKAGES_PATH / escape_package_name(package_name)
+                        # Skipped packages would record no cost, incremental runs only rebuild parts of a package
+                        generated = incremental or overwrite or not package_generated(generation_path)
+                        record_duration = not incremental and generated
+                        start_time = time.perf_counter()
                         try:
                             generate(
                                 package_name=package_name,
@@ -97,22 +148,58 @@ def evaluate(
                                 llm_verbose=llm_verbose,
                                 llm_interactive=llm_interactive,
                                 llm_use_cache=False,
+                                llm_num_candidates=llm_num_candidates,
+                                prefilter_mode=prefilter_mode,
+                                warm_execution=warm_execution,
+                                execution_concurrency=execution_concurrency,
+                                deduplicate_examples=deduplicate_examples,
+                                deduplicate_identifiers=deduplicate_identifiers,
+                                minimize_examples=minimize_examples,
+                                declaration_concurrency=declaration_concurrency,
+                                incremental=incremental,
+                                adaptive_timeouts=adaptive_timeouts,
+                                use_package_store=use_package_store,
+                                triage_verdict=triage_verdicts.get(package_name),
+                                versions=versions,
                                 combine_examples=True,
                                 combined_only=True,
                                 overwrite=overwrite
                             )
-                        except (CommonJSUnsupportedError, ES5UnsupportedError, PackageDataMissingError, PackageInstallationError, LLMRejectedError) as e:
+                        except (CommonJSUnsupportedError, ES5UnsupportedError, PackageDataMissingError, PackageInstallationError, LLMRejectedError, PrefilterRejectedError) as e:
                             printer(f"Catched generation exception of type: {type(e).__name__}")
                         except Exception as e:
                             if verbose_exceptions:
                                 with printer(f"Catched an unexpected exception:"):
                                     printer(traceback.format_exc(), end="")
-                                try:
-                                    printer("Waiting for user input: ", end="")
-                                    input()
-                                except (KeyboardInterrupt, EOFError):
-                                    printer(" User aborted")
-                                    exit(0)
+                                # Concurrent packages can not wait for the user
+                                if num_workers <= 1:
+                                    try:
+                                        printer("Waiting for user input: ", end="")
+                                        input()
+                                    except (KeyboardInterrupt, EOFError):
+                                        printer(" User aborted")
+                                        exit(0)
+                        if record_duration:
+                            duration_store.add(package_name, time.perf_counter() - start_time)
+                        # One compressed file per finished package instead of many small files, packages that were skipped are sealed already
+                        if archive_packages and generated:
+                            seal_package(generation_path)
+
+                def evaluate_package_helper(i: int, package_name: str) -> str:
+                    with printer.with_buffer() as buffer:
+                        evaluate_package(i, package_name)
+                    return buffer.get_text()
+
+                if num_workers > 1:
+                    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                        futures = [submit_in_context(executor, evaluate_package_helper, i, package_name) for i, package_name in schedule]
+                        # Printed in dispatch order, such that the output of a package is not interleaved with others
+                        for future in futures:
+                            printer.replay(future.result())
+                else:
+                    for i, package_name in schedule:
+                        evaluate_package(i, package_name)
+                duration_store.save()
                 with printer("Computing metrics:"):
                     sub_metrics: dict = dict(
                         sound = 0,
@@ -131,42 +218,60 @@ def evaluate(
                         es5_unsupported = 0,
                         unexpected_exception = 0,
                         llm_rejected = 0,
+                        prefilter_rejected = 0,
+                        triage = {verdict: 0 for verdict in TRIAGE_VERDICTS},
                         has_repository = 0,
                         has_package_json = 0,
                         has_readme = 0,
                         has_main = 0,
                         has_tests = 0,
+                        extraction_triage = dict(total=0, language_skipped=0, duplicate_skipped=0, syntax_skipped=0, require_skipped=0, executed=0),
+                        example_minimization = dict(total=0, kept=0, unknown=0, exports=0, size=0, kept_size=0, seconds=0, analysis_seconds=0, estimated_full_analysis_seconds=0),
                         combined_extraction = sub_metrics.copy(),
                         combined_generation = sub_metrics.copy(),
                         combined_all = sub_metrics.copy()
                     )
+                    prefilter_verdicts = []
                     for package_name in package_names_subset:
                         generation_path = evaluation_path / PACKAGES_PATH / escape_package_name(package_name)
-                        data_json_path = generation_path / DATA_JSON_PATH
-                        metrics["usable"] += load_data(data_json_path, "usable")
-                        metrics["package_data_missing"] += load_data(data_json_path, "package_data_missing")
-                        metrics["package_installation_failed"] +=  load_data(data_json_path, "package_installation_failed")
-                        metrics["commonjs_unsupported"] += load_data(data_json_path, "commonjs_unsupported")
-                        metrics["es5_unsupported"] += load_data(data_json_path, "es5_unsupported")
-                        metrics["unexpected_exception"] += load_data(data_json_path, "unexpected_exception")
-                        metrics["llm_rejected"] += load_data(data_json_path, "llm_rejected")
-                        metrics["has_repository"] += load_data(data_json_path, "has_repository")
-                        metrics["has_package_json"] += load_data(data_json_path, "has_package_json")
-                        metrics["has_readme"] += load_data(data_json_path, "has_readme")
-                        metrics["has_main"] += load_data(data_json_path, "has_main")
-                        metrics["has_tests"] += load_data(data_json_path, "has_tests")
-                        for mode in COMBINED_MODE_PATHS:
-                            sub_metrics = metrics[mode.name]
-                            sub_metrics["examples_generated"] += not dir_empty(generation_path / EXAMPLES_PATH / mode)
-                            sub_metrics["declarations_generated"] += not dir_empty(generation_path / DECLARATIONS_PATH / mode)
-                            sub_metrics["comparisons_generated"] += not dir_empty(generation_path / COMPARISONS_PATH / mode)
-                            children = get_children(generation_path / COMPARISONS_PATH / mode)
-                            assert len(children) <= 1, "Expected not more than one comparison file for combined examples"
-                            for comparison_path in children:
-                                comparison_json = json.loads(comparison_path.read_text())
-                                sub_metrics["sound"] += comparison_json["isSound"]
-                                sub_metrics["complete"] += comparison_json["isComplete"]
-                                sub_metrics["equivalent"] += comparison_json["isEquivalent"]
+                        # Sealed packages are read from their archive without unpacking
+                        with open_package(generation_path) as package:
+                            metrics["usable"] += package.load_data("usable")
+                            metrics["package_data_missing"] += package.load_data("package_data_missing")
+                            metrics["package_installation_failed"] +=  package.load_data("package_installation_failed")
+                            metrics["commonjs_unsupported"] += package.load_data("commonjs_unsupported")
+                            metrics["es5_unsupported"] += package.load_data("es5_unsupported")
+                            metrics["unexpected_exception"] += package.load_data("unexpected_exception")
+                            metrics["llm_rejected"] += package.load_data("llm_rejected")
+                            metrics["prefilter_rejected"] += package.load_data("prefilter_rejected", raise_missing=False, default=False)
+                            prefilter_verdict = package.load_data("prefilter_verdict", raise_missing=False)
+                            if prefilter_verdict is not None:
+                                prefilter_verdicts.append((prefilter_verdict, package.load_data("llm_verdict", raise_missing=False)))
+                            triage_verdict = package.load_data("triage_verdict", raise_missing=False)
+                            if triage_verdict is not None:
+                                metrics["triage"][triage_verdict] += 1
+                            # Packages that failed the triage never looked at their repository
+                            metrics["has_repository"] += package.load_data("has_repository", raise_missing=False, default=False)
+                            metrics["has_package_json"] += package.load_data("has_package_json", raise_missing=False, default=False)
+                            metrics["has_readme"] += package.load_data("has_readme", raise_missing=False, default=False)
+                            metrics["has_main"] += package.load_data("has_main", raise_missing=False, default=False)
+                            metrics["has_tests"] += package.load_data("has_tests", raise_missing=False, default=False)
+                            for counter, value in package.load_data("extraction_triage", raise_missing=False, default={}).items():
+                                metrics["extraction_triage"][counter] += value
+                            for counter, value in (package.load_data("example_minimization", raise_missing=False) or {}).items():
+                                metrics["example_minimization"][counter] = round(metrics["example_minimization"][counter] + value, 3)
+                            for mode in COMBINED_MODE_PATHS:
+                                sub_metrics = metrics[mode.name]
+                                sub_metrics["examples_generated"] += not package.dir_empty(EXAMPLES_PATH / mode)
+                                sub_metrics["declarations_generated"] += not package.dir_empty(DECLARATIONS_PATH / mode)
+                                sub_metrics["comparisons_generated"] += not package.dir_empty(COMPARISONS_PATH / mode)
+                                children = package.get_children(COMPARISONS_PATH / mode)
+                                assert len(children) <= 1, "Expected not more than one comparison file for combined examples"
+                                for comparison_path in children:
+                                    comparison_json = json.loads(package.read_text(comparison_path) or "{}")
+                                    sub_metrics["sound"] += comparison_json["isSound"]
+                                    sub_metrics["complete"] += comparison_json["isComplete"]
+                                    sub_metrics["equivalent"] += comparison_json["isEquivalent"]
                     metrics_path = evaluation_path / "metrics"
                     create_dir(metrics_path)
                     metrics_json = json.dumps(metrics, indent=2, ensure_ascii=False)
@@ -174,6 +279,18 @@ def evaluate(
                     if verbose_statistics:
                         with printer(f"Absolute metrics:"):
                             printer(metrics_json)
+                    # Durations per stage of the packages that were generated in this run
+                    stage_metrics_json = json.dumps(trace.get_statistics(), indent=2, ensure_ascii=False)
+                    create_file(metrics_path / "stage_metrics.json", content=stage_metrics_json)
+                    if verbose_statistics:
+                        with printer(f"Stage metrics (seconds):"):
+                            printer(stage_metrics_json)
+                    # Agreement of the metadata pre-filter with the LLM usability verdicts
+                    prefilter_metrics_json = json.dumps(compute_prefilter_agreement(prefilter_verdicts), indent=2, ensure_ascii=False)
+                    create_file(metrics_path / "prefilter_metrics.json", content=prefilter_metrics_json)
+                    if verbose_statistics:
+                        with printer(f"Pre-filter metrics:"):
+                            printer(prefilter_metrics_json)
                     # # Compared to usable
                     relative_metrics: dict = dict(
                         combined_extraction = sub_metrics.copy(),
@@ -1,17 +1,37 @@
-
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from contextvars import ContextVar
 from functools import partial
+from operator import attrgetter
 from pathlib import Path
+from queue import Queue
 import re
-from typing import Optional
+import threading
+import time
+from typing import Any, Callable, Optional
 
-from easy_prompting.prebuilt import GPT, ListLogger, FileLogger, FuncLogger, ReadableLogger, Prompter, ListI, TextI, CodeI, ChoiceI, Item, delimit_code, list_text, PrintDebugger, pad_text
 from jstypelog.utils import *
 
 MAX_LENGTH_FILE_PRINTS = 1
 MAX_LENGTH_FILE_PROMPTS = 10000
+MAX_NUM_CONTEXT_TOKENS = 12000
 MAX_NUM_TEST_FILES = 3
 MAX_NUM_GENERATION_ATTEMPTS = 3
 
+def create_prompter(llm_model_name: str, llm_temperature: int) -> Any:
+    # The LLM stack (easy_prompting and the OpenAI client) is only imported when examples are generated with an LLM
+    from easy_prompting.prebuilt import GPT, Prompter
+    return Prompter(GPT(llm_model_name, llm_temperature))
+
+def load_prompting_toolkit() -> Any:
+    import easy_prompting.prebuilt
+    return easy_prompting.prebuilt
+
+# Creates the agent of the LLM helper, can be replaced e.g. with a deterministic fake for benchmarks
+prompter_factory: ContextVar[Callable[[str, int], Any]] = ContextVar("prompter_factory", default=create_prompter)
+# Loads the loggers and prompt formats of the LLM helper, replaced together with the prompter factory
+prompting_toolkit: ContextVar[Callable[[], Any]] = ContextVar("prompting_toolkit", default=load_prompting_toolkit)
+
 def generate_examples(
     package_name: str,
     generation_path: Path,
@@ -28,9 +48,20 @@ def generate_examples(
     llm_verbose: bool,
     llm_interactive: bool,
     llm_use_cache: bool, # Makes llm_temperature > 0 obsolete
+    llm_num_candidates: int = 1,
+    prefilter_mode: str = "shadow",
+    warm_execution: bool = False,
+    execution_concurrency: int = MAX_NUM_CONCURRENT_EXECUTIONS,
+    deduplicate_examples: bool = True,
+    deduplicate_identifiers: bool = False,
+    minimize_examples: bool = False,
+    triage_passed: bool = False
 ) -> None:
     llm_verbose = llm_verbose or llm_interactive
-    with printer(f"Generating examples:"):
+    assert prefilter_mode in PREFILTER_MODES, f"Unknown pre-filter mode {prefilter_mode!r}"
+    # The harness is started lazily, i.e. after the template project is built
+    harness = NodeHarness(package_name, generation_path / TEMPLATE_PATH, get_isolated_path(generation_path / PLAYGROUND_PATH, "harness"), verbose_execution) if warm_execution else None
+    with logger.context(stage="examples"), printer(f"Generating examples:"), (harness or nullcontext()):
         data_json_path = generation_path / DATA_JSON_PATH
         save_data(data_json_path, "has_repository", False)
         save_data(data_json_path, "has_package_json", False)
@@ -38,27 +69,40 @@ def generate_examples(
         save_data(data_json_path, "has_main", False)      
         save_data(data_json_path, "has_tests", False)
         save_data(data_json_path, "llm_rejected", False)
+        save_data(data_json_path, "llm_verdict", None)
+        save_data(data_json_path, "prefilter_verdict", None)
+        save_data(data_json_path, "prefilter_reason", None)
+        save_data(data_json_path, "example_minimization", None)
         logs_path = generation_path / LOGS_PATH
         examples_path = generation_path / EXAMPLES_PATH
         template_path = generation_path / TEMPLATE_PATH
         playground_path = generation_path / PLAYGROUND_PATH
         clone_repository(package_name, generation_path, verbose_setup)
-        package_json = get_package_json(generation_path, verbose_setup)
-        readme = get_readme(generation_path, verbose_setup)
-        main = get_main(generation_path, verbose_setup)
-        tests = get_tests(generation_path, verbose_setup)
+        package_json, readme, main, tests = get_package_data(generation_path, verbose_setup, MAX_NUM_TEST_FILES)
         save_data(data_json_path, "has_repository", not dir_empty(generation_path / REPOSITORY_PATH), raise_missing=True)
-        save_data(data_json_path, "has_package_json", file_exists(generation_path / PACKAGE_JSON_PATH), raise_missing=True)
-        save_data(data_json_path, "has_readme", file_exists(generation_path / README_PATH), raise_missing=True)
-        save_data(data_json_path, "has_main", file_exists(generation_path / MAIN_PATH), raise_missing=True)
+        # The template project (e.g. of the triage) saves its own package.json to the data directory as well
+        save_data(data_json_path, "has_package_json", package_json is not None, raise_missing=True)
+        save_data(data_json_path, "has_readme", readme is not None, raise_missing=True)
+        save_data(data_json_path, "has_main", main is not None, raise_missing=True)
         save_data(data_json_path, "has_tests", not dir_empty(generation_path / TESTS_PATH), raise_missing=True)
         if not readme and not package_json and not main and not tests:
             raise PackageDataMissingError("Not enough package information found")
+        prefilter_verdict, prefilter_reason = "undecided", None
+        if prefilter_mode != "off":
+            with printer(f"Pre-filtering package metadata:"):
+                prefilter_verdict, prefilter_reason = prefilter_package(package_json, main)
+                save_data(data_json_path, "prefilter_verdict", prefilter_verdict, raise_missing=True)
+                save_data(data_json_path, "prefilter_reason", prefilter_reason, raise_missing=True)
+                printer(f"Verdict: {prefilter_verdict} ({prefilter_reason})")
         build_template_project(package_name, generation_path, verbose_setup)
         build_npm_tools(build_path, verbose_setup)
+        # Execution timeouts are learned per size of the installed package
+        size_bucket = get_size_bucket(get_package_size(template_path / "node_modules" / package_name))
+
+        example_cache = ExampleCache(generation_path / DEDUPLICATION_PATH, deduplicate_identifiers) if deduplicate_examples else None
 
         # Reusable helper function for example testing
-        def run_example(example: Optional[str], example_path: Path) -> dict:
+        def run_example(example: Optional[str], example_path: Path, playground_path: Path = playground_path, save: bool = True) -> dict:
             if example is None:
                 return dict(no_example=True)
             with printer(f"Testing example {example_path.name}"):
@@ -71,42 +115,104 @@ def generate_examples(
                         printer(f"Fail")
                         return dict(no_require=True)
                     printer(f"Success")
-                create_dir(playground_path, template_path, overwrite=True)
-                create_file(playground_path / "index.js", content=example)
+                cache_key = None
+                if example_cache is not None:
+                    cache_key = example_cache.get_key(example)
+                    cached = example_cache.get("execution", cache_key)
+                    if cached is not None:
+                        with printer(f"Reusing execution result of a duplicate example:"):
+                            output = dict(cached["output"], duplicate=True)
+                            if output["shell_code"]:
+                                printer(f"Fail")
+                                return output
+                            printer(f"Success")
+                            # Only save the example again if it is new for the mode, e.g. for combined examples
+                            saved_paths = [generation_path / saved_path for saved_path in cached["example_paths"]]
+                            if save and all(saved_path.parent != example_path.parent for saved_path in saved_paths):
+                                create_file(example_path, content=example)
+                                cached["example_paths"].append(str(example_path.relative_to(generation_path)))
+                                example_cache.set("execution", cache_key, cached)
+                            return output
                 with printer(f"Running example with Node:"):
-                    shell_output = shell(f"node index.js", cwd=playground_path, check=False, timeout=EXECUTION_TIMEOUT, verbose=verbose_execution)
+                    shell_output = None
+                    timeout = timeout_controller.get_timeout("execution", size_bucket)
+                    start_time = time.perf_counter()
+                    if harness is not None:
+                        shell_output = harness.run(example, timeout)
+                        if shell_output is not None and verbose_execution:
+                            printer(shell_output.value, end="")
+                    if shell_output is None:
+                        create_dir(playground_path, template_path, overwrite=True)
+                        create_file(playground_path / "index.js", content=example)
+                        start_time = time.perf_counter()
+                        shell_output = shell(f"node index.js", cwd=playground_path, check=False, timeout=timeout, verbose=verbose_execution)
+                    timeout_controller.record("execution", time.perf_counter() - start_time, shell_output.timeout, size_bucket)
                     if shell_output.code:
                         printer(f"Fail")
                     else:
                         printer(f"Success")
-                        create_file(example_path, content=example)
-                    return dict(shell_code=shell_output.code, shell_output=shell_output.value, shell_timeout=shell_output.timeout)
+                        if save:
+                            create_file(example_path, content=example)
+                    output = dict(shell_code=shell_output.code, shell_output=shell_output.get_view(MAX_LENGTH_FILE_PROMPTS), shell_timeout=shell_output.timeout, shell_timeout_limit=timeout)
+                    if example_cache is not None and cache_key is not None:
+                        example_paths = [str(example_path.relative_to(generation_path))] if save and not shell_output.code else []
+                        example_cache.set("execution", cache_key, dict(output=output, example_paths=example_paths))
+                    return output
 
-        # Checking if package is usable
-        with printer(f"Checking CommonJS support:"):
-            output = run_example(f"const package = require(\"{package_name}\");", playground_path / "entry.js")
-            if output.get("shell_code", 0):
-                raise CommonJSUnsupportedError(f"Require statement fails on package with error:\n{pad_text(output["shell_output"])}")
+        # Reusable helper function for testing many examples concurrently in isolated playgrounds
+        def run_examples(examples: list[tuple[str, Path]], name: str) -> list[dict]:
+            slots: Queue[Path] = Queue()
+            for slot_index in range(max(execution_concurrency, 1)):
+                slots.put(get_isolated_path(playground_path, f"{name}_{slot_index}"))
 
-        # Checking if package supports ES5 syntax
-        if check_es5:
-            with printer(f"Checking ES5 support:"):
-                create_dir(playground_path, template_path, overwrite=True)
-                entry_path = playground_path / "entry.js"
-                bundle_path = playground_path / "bundle.js"
-                output = create_file(entry_path, content=f"var package = require(\"{package_name}\");")
-                shell_output = shell(
-                    f"npx esbuild {entry_path.resolve()} --outfile={bundle_path.resolve()} --bundle --target=es5 --platform=node --log-level=error",
-                    cwd=playground_path,
-                    check=False,
-                    timeout=INSTALLATION_TIMEOUT,
-                    verbose=verbose_execution
-                )
-                if shell_output.code:
-                    printer(f"Fail")
-                    raise ES5UnsupportedError(f"The package or one of its dependencies does not support ES5 syntax")
-                else:
-                    printer(f"Success")
+            def run_example_in_slot(example: str, example_path: Path) -> tuple[dict, str]:
+                playground_sub_path = slots.get()
+                try:
+                    with printer.with_buffer() as buffer:
+                        output = run_example(example, example_path, playground_sub_path)
+                    return output, buffer.get_text()
+                finally:
+                    slots.put(playground_sub_path)
+
+            with ThreadPoolExecutor(max_workers=max(execution_concurrency, 1)) as executor:
+                futures = [submit_in_context(executor, run_example_in_slot, example, example_path) for example, example_path in examples]
+                outputs = []
+                # Print in submission order, such that the logs are deterministic
+                for future in futures:
+                    output, text = future.result()
+                    printer.replay(text)
+                    outputs.append(output)
+            return outputs
+
+        # The triage already ran the same checks on the same template project
+        if triage_passed:
+            printer(f"Skipping CommonJS and ES5 checks (passed the triage)")
+        else:
+            # Checking if package is usable
+            with printer(f"Checking CommonJS support:"):
+                output = run_example(f"const package = require(\"{package_name}\");", playground_path / "entry.js")
+                if output.get("shell_code", 0):
+                    raise CommonJSUnsupportedError(f"Require statement fails on package with error:\n{pad_text(output["shell_output"])}")
+
+            # Checking if package supports ES5 syntax
+            if check_es5:
+                with printer(f"Checking ES5 support:"):
+                    create_dir(playground_path, template_path, overwrite=True)
+                    entry_path = playground_path / "entry.js"
+                    bundle_path = playground_path / "bundle.js"
+                    output = create_file(entry_path, content=f"var package = require(\"{package_name}\");")
+                    shell_output = shell(
+                        f"npx esbuild {entry_path.resolve()} --outfile={bundle_path.resolve()} --bundle --target=es5 --platform=node --log-level=error",
+                        cwd=playground_path,
+                        check=False,
+                        timeout=INSTALLATION_TIMEOUT,
+                        verbose=verbose_execution
+                    )
+                    if shell_output.code:
+                        printer(f"Fail")
+                        raise ES5UnsupportedError(f"The package or one of its dependencies does not support ES5 syntax")
+                    else:
+                        printer(f"Success")
 
         # Reusable helper function for combining examples
         def combine_files_helper(file_paths: list[Path]) -> Optional[str]:
@@ -132,11 +238,34 @@ def generate_examples(
                     return None
                 examples_sub_path = examples_path / EXTRACTION_PATH
                 create_dir(examples_sub_path)
-                examples = re.findall( r"```.*?\n(.*?)```", readme, flags=re.DOTALL)
-                examples = [example.strip() for example in examples]
+                blocks = re.findall(r"```([^\n`]*)\n(.*?)```", readme, flags=re.DOTALL)
+                examples = [(example_index, get_language_tag(info_string), example.strip()) for example_index, (info_string, example) in enumerate(blocks)]
                 printer(f"Found {len(examples)} example(s)")
-                for example_index, example in enumerate(examples):
-                    run_example(example, examples_sub_path / f"{example_index}.js")
+                # Discard snippets that can not run before spending any playground copies or Node processes on them
+                with printer(f"Triaging examples:"):
+                    triage = dict(total=len(examples), language_skipped=0, duplicate_skipped=0, syntax_skipped=0, require_skipped=0, executed=0)
+                    candidates = [(example_index, example) for example_index, language_tag, example in examples if is_javascript_tag(language_tag)]
+                    triage["language_skipped"] = len(examples) - len(candidates)
+                    if example_cache is not None:
+                        keys = [example_cache.get_key(example) for _, example in candidates]
+                        candidates = [candidate for index, (candidate, key) in enumerate(zip(candidates, keys)) if key not in keys[:index]]
+                        triage["duplicate_skipped"] = len(keys) - len(candidates)
+                    syntax_errors = check_javascript_syntax(
+                        [example for _, example in candidates],
+                        get_isolated_path(playground_path, "syntax"),
+                        verbose_execution
+                    )
+                    if syntax_errors is None:
+                        printer(f"Syntax check failed (skipping it)")
+                    else:
+                        triage["syntax_skipped"] = sum(error is not None for error in syntax_errors)
+                        candidates = [candidate for candidate, error in zip(candidates, syntax_errors) if error is None]
+                    printer(f"Skipped {triage["language_skipped"]} non-JavaScript, {triage["duplicate_skipped"]} duplicate and {triage["syntax_skipped"]} invalid example(s)")
+                outputs = run_examples([(example, examples_sub_path / f"{example_index}.js") for example_index, example in candidates], "extraction")
+                triage["require_skipped"] = sum(output.get("no_require", False) for output in outputs)
+                triage["executed"] = sum("shell_code" in output and not output.get("duplicate", False) for output in outputs)
+                printer(f"Avoided {triage["total"] - triage["executed"]} of {triage["total"]} execution(s)")
+                save_data(data_json_path, "extraction_triage", triage)
             if combine_examples:
                 with printer("Combining extracted examples:"):
                     combined_examples_sub_path = examples_path / COMBINED_EXTRACTION_PATH
@@ -145,23 +274,63 @@ def generate_examples(
                     run_example(combined_example, combined_examples_sub_path / "0.js")
 
         def generate_with_llm_helper() -> None:
+            ListLogger, FileLogger, FuncLogger, ReadableLogger, ListI, TextI, CodeI, ChoiceI, Item, delimit_code, list_text, PrintDebugger = attrgetter(
+                "ListLogger", "FileLogger", "FuncLogger", "ReadableLogger", "ListI", "TextI", "CodeI", "ChoiceI", "Item", "delimit_code", "list_text", "PrintDebugger"
+            )(prompting_toolkit.get()())
             with printer(f"Generating examples with LLM:"):
                 examples_sub_path = examples_path / GENERATION_PATH
                 create_dir(examples_sub_path)
-                lm = GPT(llm_model_name, llm_temperature)
-                agent = Prompter(lm)
+                if prefilter_mode == "enforce" and prefilter_verdict == "rejected":
+                    raise PrefilterRejectedError(f"The pre-filter determined that this package is currently not supported: {prefilter_reason}")
+                agent = prompter_factory.get()(llm_model_name, llm_temperature)
                 if llm_interactive:
                     agent.set_debugger(PrintDebugger(partial(printer, end="", flush=True)))
                 if llm_use_cache:
                     agent.set_cache(generation_path / CACHE_PATH / "prompter" / llm_model_name)
                 readable_logger = ReadableLogger(FuncLogger(partial(printer, end="\n\n")))
                 readable_logger.set_verbose(llm_verbose)
-                # Evaluate usability of package
-                with ListLogger(readable_logger, FileLogger(logs_path / f"evaluation.txt")) as logger:
-                    evaluation_agent = agent.get_copy()
-                    evaluation_agent.set_logger(logger)
-                    evaluation_agent.set_tag("evaluation")
-                    evaluation_agent.add_message(
+                # Build the repository context once, such that both agents share the same prompt prefix (enables provider-side prompt caching)
+                test_sources = [
+                    ContextSource(f"test:{path}", content, priority=1)
+                    for path, content in tests[:MAX_NUM_TEST_FILES]
+                ]
+                context = build_context(
+                    [
+                        ContextSource("readme", readme or "", priority=4),
+                        ContextSource("package_json", package_json or "", priority=1),
+                        ContextSource("main", main or "", priority=3),
+                        *test_sources
+                    ],
+                    MAX_NUM_CONTEXT_TOKENS
+                )
+                context_messages = []
+                if "readme" in context:
+                    context_messages.append(
+                        f"Here is the readme file of the package's GitHub repository:"
+                        f"\n{delimit_code(context["readme"], "markdown")}"
+                    )
+                if "package_json" in context:
+                    context_messages.append(
+                        f"Here is the package.json file of the package's GitHub repository:"
+                        f"\n{delimit_code(context["package_json"], "json")}"
+                    )
+                if "main" in context:
+                    context_messages.append(
+                        f"Here is the main file of the package's GitHub repository:"
+                        f"\n{delimit_code(context["main"], "javascript")}"
+                    )
+                test_contexts = [(source.name.split(":", 1)[1], context[source.name]) for source in test_sources if source.name in context]
+                if test_contexts:
+                    context_messages.append(
+                        f"Here are some test files of the package's GitHub repository:"
+                        f"\n{
+                            "\n".join(f"{path}:\n{delimit_code(content, "javascript")}"
+                            for path, content in test_contexts)
+                        }"
+                    )
+
+                def add_shared_prefix(agent: Any) -> None:
+                    agent.add_message(
                         list_text(
                             f"You are an autonomous agent and JavaScript/Node/npm expert",
                             f"The user is a program that can only interact with you in predetermined ways",
@@ -170,85 +339,67 @@ def generate_examples(
                         ),
                         role="developer"
                     )
-                    evaluation_agent.add_message(
-                        f"Check if the npm package \"{package_name}\" satisfied at least one of the following conditions" + list_text(
-                            f"It can only be used in the browser",
-                            f"It can only be used with a framework",
-                            f"It can not directly be used in Node",
-                            f"Running \"npm install {package_name}\" is not enough to properly use",
-                            add_scope=True
-                        )
-                    )
                     # Crop long messages for print readability
                     readable_logger.set_crop(MAX_LENGTH_FILE_PRINTS)
-                    if readme:
-                        evaluation_agent.add_message(
-                            f"Here is the readme file of the package's GitHub repository:"
-                            f"\n{delimit_code(readme[:MAX_LENGTH_FILE_PROMPTS], "markdown")}"
-                        )
-                    if package_json:
-                        evaluation_agent.add_message(
-                            f"Here is the package.json file of the package's GitHub repository:"
-                            f"\n{delimit_code(package_json[:MAX_LENGTH_FILE_PROMPTS], "json")}"
-                        )
-                    if main:
-                        evaluation_agent.add_message(
-                            f"Here is the main file of the package's GitHub repository:"
-                            f"\n{delimit_code(main[:MAX_LENGTH_FILE_PROMPTS], "javascript")}"
-                        )
-                    if tests:
+                    for message in context_messages:
+                        agent.add_message(message)
+                    readable_logger.set_crop()
+
+                # Evaluate usability of package
+                if prefilter_mode == "enforce" and prefilter_verdict == "accepted":
+                    printer(f"Skipping LLM usability evaluation (accepted by pre-filter)")
+                else:
+                    with ListLogger(readable_logger, FileLogger(logs_path / f"evaluation.txt")) as llm_logger:
+                        evaluation_agent = agent.get_copy()
+                        evaluation_agent.set_logger(llm_logger)
+                        evaluation_agent.set_tag("evaluation")
+                        add_shared_prefix(evaluation_agent)
                         evaluation_agent.add_message(
-                            f"Here are some test files of the package's GitHub repository:"
-                            f"\n{
-                                "\n".join(f"{path}:\n{delimit_code(content[:MAX_LENGTH_FILE_PROMPTS], "javascript")}"
-                                for path, content in tests[:MAX_NUM_TEST_FILES])
-                            }"
+                            f"Check if the npm package \"{package_name}\" satisfied at least one of the following conditions" + list_text(
+                                f"It can only be used in the browser",
+                                f"It can only be used with a framework",
+                                f"It can not directly be used in Node",
+                                f"Running \"npm install {package_name}\" is not enough to properly use",
+                                add_scope=True
+                            )
                         )
-                    readable_logger.set_crop()
-                    (choice, data) = evaluation_agent.get_data(
-                        ListI(
-                            "Do the following",
-                            Item(
-                                "think",
-                                TextI(f"Go through each condition step by step and check if it satisfied")
-                            ),
-                            Item(
-                                "choose",
-                                ChoiceI(
-                                    f"Choose one of the following options",
-                                    ListI(
-                                        f"If at least one of the conditions is satisfied",
-                                        Item(
-                                            "satisfied",
-                                            TextI(f"Explain which conditions are satisfied")
+                        (choice, data) = evaluation_agent.get_data(
+                            ListI(
+                                "Do the following",
+                                Item(
+                                    "think",
+                                    TextI(f"Go through each condition step by step and check if it satisfied")
+                                ),
+                                Item(
+                                    "choose",
+                                    ChoiceI(
+                                        f"Choose one of the following options",
+                                        ListI(
+                                            f"If at least one of the conditions is satisfied",
+                                            Item(
+                                                "satisfied",
+                                                TextI(f"Explain which conditions are satisfied")
+                                            )
+                                        ),
+                                        ListI(
+                                            f"Otherwise",
+                                            Item("unsatisfied")
                                         )
-                                    ),
-                                    ListI(
-                                        f"Otherwise",
-                                        Item("unsatisfied")
                                     )
-                                )
-                            ),
-                            add_stop=True
-                        )
-                    )[1]
-                    match choice, data[0]:
-                        case "satisfied", _:
-                            raise LLMRejectedError(f"The LLM determined that this package is currently not supported")
+                                ),
+                                add_stop=True
+                            )
+                        )[1]
+                        save_data(data_json_path, "llm_verdict", "rejected" if choice == "satisfied" else "accepted", raise_missing=True)
+                        match choice, data[0]:
+                            case "satisfied", _:
+                                raise LLMRejectedError(f"The LLM determined that this package is currently not supported")
                 # Generate package examples
-                with ListLogger(readable_logger, FileLogger(logs_path / f"generation.txt")) as logger:
+                with ListLogger(readable_logger, FileLogger(logs_path / f"generation.txt")) as llm_logger:
                     generation_agent = agent.get_copy()
-                    generation_agent.set_logger(logger)
+                    generation_agent.set_logger(llm_logger)
                     generation_agent.set_tag("generation")
-                    generation_agent.add_message(
-                        list_text(
-                            f"You are an autonomous agent and JavaScript/Node/npm expert",
-                            f"The user is a program that can only interact with you in predetermined ways",
-                            f"The user will give you a task and instructions on how to complete the task",
-                            f"You should try to achieve the task by following the instructions of the user"
-                        ),
-                        role="developer"
-                    )
+                    add_shared_prefix(generation_agent)
                     generation_agent.add_message(
                         list_text(
                             f"Your task is to create an example for the npm package \"{package_name}\" with the following requirements " + list_text(
@@ -261,78 +412,128 @@ def generate_examples(
                             )
                         )
                     )
-                    # Crop long messages for print readability
-                    readable_logger.set_crop(MAX_LENGTH_FILE_PRINTS)
-                    if readme:
-                        generation_agent.add_message(
-                            f"Here is the readme file of the package's GitHub repository:"
-                            f"\n{delimit_code(readme[:MAX_LENGTH_FILE_PROMPTS], "markdown")}"
-                        )
-                    if package_json:
-                        generation_agent.add_message(
-                            f"Here is the package.json file of the package's GitHub repository:"
-                            f"\n{delimit_code(package_json[:MAX_LENGTH_FILE_PROMPTS], "json")}"
-                        )
-                    if main:
-                        generation_agent.add_message(
-                            f"Here is the main file of the package's GitHub repository:"
-                            f"\n{delimit_code(main[:MAX_LENGTH_FILE_PROMPTS], "javascript")}"
-                        )
-                    if tests:
-                        generation_agent.add_message(
-                            f"Here are some test files of the package's GitHub repository:"
-                            f"\n{
-                                "\n".join(f"{path}:\n{delimit_code(content[:MAX_LENGTH_FILE_PROMPTS], "javascript")}"
-                                for path, content in tests[:MAX_NUM_TEST_FILES])
-                            }"
-                        )
-                    readable_logger.set_crop()
+                    example_format = ListI(
+                        "Do the following",
+                        Item(
+                            "think",
+                            TextI(f"Go through each requirement step by step and think about how you are going to satisfy it")
+                        ),
+                        Item(
+                            "example",
+                            CodeI(f"Provide the content of the example", "javascript")
+                        ),
+                        add_stop=True
+                    )
+
+                    def add_feedback(agent: Any, output: dict) -> bool:
+                        if output.get("no_require", False):
+                            agent.add_message(
+                                f"Your example does not contain an import statement for the package e.g. \"require('{package_name}')\"."
+                                f"\nAdd an import statement for the package with the exact package name i.e. \"{package_name}\"."
+                            )
+                            return False
+                        if output.get("shell_code", 0):
+                            if output.get("shell_timeout", False):
+                                agent.add_message(
+                                    f"Running your example with Node did not finish after {output.get("shell_timeout_limit", EXECUTION_TIMEOUT):g} seconds:"
+                                    f"\n{delimit_code(output["shell_output"], "shell")}"
+                                    f"\nMake the example complete in under {output.get("shell_timeout_limit", EXECUTION_TIMEOUT):g} seconds and wait for user inputs."
+                                )
+                                return False
+                            agent.add_message(
+                                f"Running your example with Node failed with code {output["shell_code"]}:"
+                                f"\n{delimit_code(output["shell_output"], "shell")}"
+                                f"\nFix the error."
+                            )
+                            return False
+                        return True
+
+                    def generate_candidate(agent: Any, example_index: int, candidate_index: int, stop: threading.Event) -> tuple[Any, Optional[str], dict, str]:
+                        # Runs in a worker thread, so the output is buffered and printed by the caller.
+                        # Every candidate logs to its own file, the loggers of the agent copies are not thread-safe.
+                        example, output = None, dict(no_example=True)
+                        with printer.with_buffer() as buffer, ListLogger(readable_logger, FileLogger(logs_path / f"generation_{example_index}_{candidate_index}.txt")) as candidate_logger:
+                            agent = agent.get_copy()
+                            agent.set_logger(candidate_logger)
+                            agent.add_message(
+                                f"Provide variant {candidate_index + 1} of {llm_num_candidates} of the example."
+                                f"\nEach variant should take a different approach to using the package."
+                            )
+                            # The round stops as soon as another candidate is valid
+                            if not stop.is_set():
+                                with printer(f"Generating candidate {candidate_index}:"):
+                                    example = agent.get_data(example_format)[1]
+                                    printer(f"Success")
+                            if not stop.is_set():
+                                with printer(f"Checking candidate {candidate_index}:"):
+                                    playground_sub_path = get_isolated_path(playground_path, f"candidate_{candidate_index}")
+                                    output = run_example(example, examples_sub_path / f"{example_index}.js", playground_sub_path, save=False)
+                        return agent, example, output, buffer.get_text()
+
+                    def rank_candidate(output: dict) -> int:
+                        # Lower is better, used to continue the conversation with the most promising failure
+                        if output.get("no_example", False):
+                            return 3
+                        if output.get("no_require", False):
+                            return 2
+                        if output.get("shell_timeout", False):
+                            return 1
+                        return 0
+
                     # Reprompt LLM for an example until the example is valid
                     example_index = 0
                     while True:
+                        if llm_num_candidates > 1:
+                            # Speculatively generate multiple candidates at once and keep the first valid one
+                            with printer(f"Generating {llm_num_candidates} candidates for example {example_index}:"):
+                                if example_index >= MAX_NUM_GENERATION_ATTEMPTS:
+                                    printer(f"Failed (too many attempts)")
+                                    return None
+                                executor = ThreadPoolExecutor(max_workers=llm_num_candidates)
+                                stop = threading.Event()
+                                futures = [
+                                    submit_in_context(executor, generate_candidate, generation_agent, example_index, candidate_index, stop)
+                                    for candidate_index in range(llm_num_candidates)
+                                ]
+                                candidates = []
+                                valid = False
+                                try:
+                                    for future in as_completed(futures):
+                                        agent, example, output, text = future.result()
+                                        candidate_index = futures.index(future)
+                                        printer.replay(text)
+                                        if example is not None and output.get("shell_code", None) == 0:
+                                            create_file(examples_sub_path / f"{example_index}.js", content=example)
+                                            printer(f"Success (candidate {candidate_index})")
+                                            valid = True
+                                            break
+                                        candidates.append((rank_candidate(output), candidate_index, agent, output))
+                                    else:
+                                        printer(f"Fail (no valid candidate)")
+                                finally:
+                                    # The remaining candidates of a successful round stop after their current step, they are waited for
+                                    # such that none of them still runs examples or logs after the playground and the loggers are gone
+                                    stop.set()
+                                    executor.shutdown(wait=True, cancel_futures=True)
+                                example_index += 1
+                                if valid:
+                                    break
+                                # Only continue the repair conversation with the best failing candidate
+                                _, _, generation_agent, output = min(candidates, key=lambda candidate: candidate[:2])
+                                generation_agent.set_logger(llm_logger)
+                                add_feedback(generation_agent, output)
+                                continue
                         with printer(f"Generating example {example_index}:"):
                             if example_index >= MAX_NUM_GENERATION_ATTEMPTS:
                                 printer(f"Failed (too many attempts)")
                                 return None
-                            example = generation_agent.get_data(
-                                    ListI(
-                                        "Do the following",
-                                        Item(
-                                            "think",
-                                            TextI(f"Go through each requirement step by step and think about how you are going to satisfy it")
-                                        ),
-                                        Item(
-                                            "example",
-                                            CodeI(f"Provide the content of the example", "javascript")
-                                        ),
-                                        add_stop=True
-                                    )
-                                )[1]
+                            example = generation_agent.get_data(example_format)[1]
                             printer(f"Success")
                         with printer(f"Checking example {example_index}:"):
                             output = run_example(example, examples_sub_path / f"{example_index}.js")
                             example_index += 1
-                            if output.get("require_missing", False):
-                                generation_agent.add_message(
-                                    f"Your example does not contain an import statement for the package e.g. \"require('{package_name}')\"."
-                                    f"\nAdd an import statement for the package with the exact package name i.e. \"{package_name}\"."
-                                )
-                                continue
-                            if output.get("shell_code", 0):
-                                if output.get("shell_timeout", False):
-                                    generation_agent.add_message(
-                                        f"Running your example with Node did not finish after {EXECUTION_TIMEOUT} seconds:"
-                                        f"\n{delimit_code(output["shell_output"][:MAX_LENGTH_FILE_PROMPTS], "shell")}"
-                                        f"\nMake the example complete in under {EXECUTION_TIMEOUT} seconds and wait for user inputs."
-                                    )
-                                    continue
-                                generation_agent.add_message(
-                                    f"Running your example with Node failed with code {output["shell_code"]}:"
-                                    f"\n{delimit_code(output["shell_output"][:MAX_LENGTH_FILE_PROMPTS], "shell")}"
-                                    f"\nFix the error."
-                                )
-                                continue
-                            break
+                            if add_feedback(generation_agent, output):
+                                break
             if combine_examples:
                 with printer("Combining generated examples:"):
                     combined_examples_sub_path = examples_path / COMBINED_GENERATION_PATH
@@ -340,6 +541,34 @@ def generate_examples(
                     combined_example = combine_files_helper(get_children(examples_sub_path))
                     run_example(combined_example, combined_examples_sub_path / "0.js")
 
+        # Many examples exercise the same exports, the run-time analysis of the combined example only needs a subset that covers them all
+        def minimize_examples_helper(paths: list[Path]) -> list[Path]:
+            with printer(f"Minimizing examples by API coverage:"):
+                start_time = time.perf_counter()
+                coverages = record_api_coverage(
+                    package_name,
+                    paths,
+                    template_path,
+                    playground_path,
+                    timeout_controller.get_timeout("execution", size_bucket),
+                    execution_concurrency,
+                    verbose_execution
+                )
+                sizes = [path.stat().st_size for path in paths]
+                selected = select_covering_examples(coverages, sizes)
+                minimization = dict(
+                    total=len(paths),
+                    kept=len(selected),
+                    unknown=sum(coverage is None for coverage in coverages),
+                    exports=len(set().union(*(coverage for coverage in coverages if coverage is not None))),
+                    size=sum(sizes),
+                    kept_size=sum(sizes[index] for index in selected),
+                    seconds=round(time.perf_counter() - start_time, 3)
+                )
+                save_data(data_json_path, "example_minimization", minimization)
+                printer(f"Kept {minimization["kept"]} of {minimization["total"]} example(s) ({minimization["kept_size"]} of {minimization["size"]} bytes) covering {minimization["exports"]} export(s)")
+                return [paths[index] for index in selected]
+
         # doing generation first, can be faster because of llm rejection
         if generate_with_llm:
             generate_with_llm_helper()
@@ -350,5 +579,7 @@ def generate_examples(
                 combined_examples_sub_path = examples_path / COMBINED_ALL_PATH
                 create_dir(combined_examples_sub_path)
                 paths = get_children(examples_path / EXTRACTION_PATH) + get_children(examples_path / GENERATION_PATH)
+                if minimize_examples and len(paths) > 1:
+                    paths = minimize_examples_helper(paths)
                 combined_example = combine_files_helper(paths)
                 run_example(combined_example, combined_examples_sub_path / "0.js")
\ No newline at end of file
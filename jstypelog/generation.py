@@ -1,10 +1,12 @@
 from pathlib import Path
 import shutil
+from typing import Optional
 
 from jstypelog.utils import *
 from jstypelog.examplification import generate_examples as generate_examples_helper
 from jstypelog.declaration import generate_declarations as generate_declarations_helper
 from jstypelog.comparison import generate_comparisons as generate_comparisons_helper
+from jstypelog.triage import TRIAGE_ERRORS, get_triage_inputs
 
 def generate(
     package_name: str,
@@ -28,12 +30,83 @@ def generate(
     llm_temperature: int = 0,
     llm_verbose: bool = True,
     llm_interactive: bool = False,
-    llm_use_cache: bool = False
+    llm_use_cache: bool = False,
+    llm_num_candidates: int = 1,
+    prefilter_mode: str = "shadow",
+    warm_execution: bool = False,
+    execution_concurrency: int = MAX_NUM_CONCURRENT_EXECUTIONS,
+    deduplicate_examples: bool = True,
+    deduplicate_identifiers: bool = False,
+    minimize_examples: bool = False,
+    declaration_concurrency: int = MAX_NUM_CONCURRENT_DECLARATIONS,
+    incremental: bool = False,
+    adaptive_timeouts: bool = True,
+    use_package_store: bool = True,
+    triage_verdict: Optional[str] = None,
+    versions: Optional[dict] = None
 ) -> None:
-    create_dir(generation_path, overwrite=overwrite)
-    if not dir_empty(generation_path / DATA_PATH):
+    # Sealed packages are unpacked again, such that incremental runs can rebuild their stale artifacts
+    if incremental and unseal_package(generation_path):
+        printer(f"Unsealed archive of \"{package_name}\"")
+    elif overwrite and not incremental:
+        get_archive_path(generation_path).unlink(missing_ok=True)
+    # Checked before the directory is created, such that a sealed package is not shadowed by an empty directory
+    if not incremental and not overwrite and package_generated(generation_path):
         printer(f"Skipping generation for \"{package_name}\" (already generated)")
         return None
+    # The data directory can already hold the template project files of the triage
+    create_dir(generation_path, overwrite=overwrite and not incremental)
+    # Every artifact node is recorded with the hash of its inputs, such that incremental runs only rebuild stale nodes
+    if versions is None:
+        if generate_declarations:
+            # The commits of the tools are only known once they are cloned
+            build_run_time_information_gathering(build_path, verbose_setup)
+            build_ts_declaration_file_generator(build_path, verbose_setup)
+        versions = get_tool_versions(build_path)
+    graph = ArtifactGraph(generation_path / ARTIFACTS_JSON_PATH)
+    mode_paths = COMBINED_MODE_PATHS if combined_only else ALL_MODE_PATHS
+    example_tools_inputs = hash_values(
+        versions["node"],
+        versions["npm"],
+        hash_paths(EXAMPLIFICATION_SCRIPTS_PATH)
+    )
+    declaration_tools_inputs = hash_values(
+        versions["node"],
+        versions["npm"],
+        versions["run_time_analyzer"],
+        versions["declaration_generator"],
+        hash_paths(DECLARATION_SCRIPTS_PATH)
+    )
+    examples_inputs = hash_values(
+        package_name,
+        example_tools_inputs,
+        extract_from_readme,
+        generate_with_llm,
+        combine_examples,
+        check_es5,
+        llm_model_name,
+        llm_temperature,
+        llm_num_candidates,
+        prefilter_mode,
+        deduplicate_identifiers,
+        minimize_examples
+    )
+    comparison_tools_inputs = hash_values(
+        versions["node"],
+        versions["definitely_typed"],
+        hash_paths(COMPARISON_SCRIPTS_PATH, build_path / DEFINITELY_TYPED_PATH / "types" / escape_package_name(package_name) / "index.d.ts")
+    )
+    if triage_verdict is not None:
+        # Incremental runs reuse the verdict instead of triaging the package again
+        graph.record("triage", get_triage_inputs(package_name, check_es5, versions), error=None if triage_verdict == "passed" else triage_verdict)
+    if incremental and generate_examples and graph.is_fresh("examples", examples_inputs) and graph.get_error("examples"):
+        printer(f"Skipping generation for \"{package_name}\" (failed with {graph.get_error("examples")} for the same inputs)")
+        return None
+    # Cached execution results and declarations depend on the versions of their tools
+    for kind, node, inputs in [("execution", "tools/examples", example_tools_inputs), ("declaration", "tools/declarations", declaration_tools_inputs)]:
+        if not graph.is_fresh(node, inputs):
+            ExampleCache(generation_path / DEDUPLICATION_PATH).discard(kind)
+            graph.record(node, inputs)
     create_dir(generation_path / DATA_PATH)
     create_dir(generation_path / LOGS_PATH)
     create_dir(generation_path / EXAMPLES_PATH)
@@ -46,51 +119,101 @@ def generate(
     save_data(data_json_path, "es5_unsupported", False)
     save_data(data_json_path, "commonjs_unsupported", False)
     save_data(data_json_path, "unexpected_exception", False)
-    save_data(data_json_path, "llm_rejected_error", False)
-    with open(generation_path / LOGS_PATH / "shell.txt", "w") as log_file:
-        with printer.with_file(log_file):
+    save_data(data_json_path, "llm_rejected", False)
+    save_data(data_json_path, "prefilter_rejected", False)
+    save_data(data_json_path, "triage_verdict", triage_verdict)
+    with logger.context(package=package_name), logger.with_sink(FileSink(generation_path / LOGS_PATH / "log.jsonl", format_json)), tracer.with_trace(generation_path / LOGS_PATH / "trace.json"):
+        # Durations are shared by all packages of a build, such that timeouts are learned across runs
+        timeouts_path = build_path / TIMEOUTS_JSON_PATH if adaptive_timeouts else None
+        package_store_path = build_path / PACKAGE_STORE_PATH if use_package_store else None
+        with printer.with_file(generation_path / LOGS_PATH / "shell.txt"), resource_recorder.with_recording() as resource_records, timeout_controller.with_store(timeouts_path), with_package_store(package_store_path):
             with printer(f"Starting generation for \"{package_name}\":"):
                 try:
                     with printer.with_verbose(verbose):
-                        if generate_examples:
-                            generate_examples_helper(
-                                package_name=package_name,
-                                generation_path=generation_path,
-                                build_path=build_path,
-                                verbose_setup=verbose_setup,
-                                verbose_execution=verbose_execution,
-                                verbose_files=verbose_files,
-                                extract_from_readme=extract_from_readme,
-                                generate_with_llm=generate_with_llm,
-                                combine_examples=combine_examples,
-                                check_es5=check_es5,
-                                llm_model_name=llm_model_name,
-                                llm_temperature=llm_temperature,
-                                llm_verbose=llm_verbose,
-                                llm_interactive=llm_interactive,
-                                llm_use_cache=llm_use_cache
-                            )
+                        if triage_verdict in TRIAGE_ERRORS:
+                            raise TRIAGE_ERRORS[triage_verdict](f"The triage determined that this package is not supported ({triage_verdict})")
+                        if generate_examples and incremental and graph.is_fresh("examples", examples_inputs):
+                            printer(f"Skipping examples (up to date)")
+                        elif generate_examples:
+                            graph.invalidate("examples")
+                            create_dir(generation_path / EXAMPLES_PATH, overwrite=True)
+                            try:
+                                generate_examples_helper(
+                                    package_name=package_name,
+                                    generation_path=generation_path,
+                                    build_path=build_path,
+                                    verbose_setup=verbose_setup,
+                                    verbose_execution=verbose_execution,
+                                    verbose_files=verbose_files,
+                                    extract_from_readme=extract_from_readme,
+                                    generate_with_llm=generate_with_llm,
+                                    combine_examples=combine_examples,
+                                    check_es5=check_es5,
+                                    llm_model_name=llm_model_name,
+                                    llm_temperature=llm_temperature,
+                                    llm_verbose=llm_verbose,
+                                    llm_interactive=llm_interactive,
+                                    llm_use_cache=llm_use_cache,
+                                    llm_num_candidates=llm_num_candidates,
+                                    prefilter_mode=prefilter_mode,
+                                    warm_execution=warm_execution,
+                                    execution_concurrency=execution_concurrency,
+                                    deduplicate_examples=deduplicate_examples,
+                                    deduplicate_identifiers=deduplicate_identifiers,
+                                    minimize_examples=minimize_examples,
+                                    triage_passed=triage_verdict == "passed"
+                                )
+                            except (PackageDataMissingError, PackageInstallationError, CommonJSUnsupportedError, ES5UnsupportedError, LLMRejectedError, PrefilterRejectedError) as e:
+                                # Expected failures are artifacts too, such that they are not retried for the same inputs
+                                graph.record("examples", examples_inputs, error=type(e).__name__)
+                                raise
+                            graph.record("examples", examples_inputs)
                         if generate_declarations:
                             assert package_name == escape_package_name(package_name), "ts-declaration-file-generator does not support qualilfied package names"
-                            generate_declarations_helper(
-                                package_name=package_name,
-                                generation_path=generation_path,
-                                build_path=build_path,
-                                verbose_setup=verbose_setup,
-                                verbose_execution=verbose_execution,
-                                verbose_files=verbose_files,
-                                combined_only=combined_only
-                            )
+                            declarations_inputs = {sub_path: hash_values(declaration_tools_inputs, hash_paths(generation_path / EXAMPLES_PATH / sub_path)) for sub_path in mode_paths}
+                            stale_paths = [sub_path for sub_path in mode_paths if not (incremental and graph.is_fresh(f"declarations/{sub_path}", declarations_inputs[sub_path]))]
+                            if stale_paths:
+                                for sub_path in stale_paths:
+                                    graph.invalidate(f"declarations/{sub_path}")
+                                    shutil.rmtree(generation_path / DECLARATIONS_PATH / sub_path, ignore_errors=True)
+                                generate_declarations_helper(
+                                    package_name=package_name,
+                                    generation_path=generation_path,
+                                    build_path=build_path,
+                                    verbose_setup=verbose_setup,
+                                    verbose_execution=verbose_execution,
+                                    verbose_files=verbose_files,
+                                    combined_only=combined_only,
+                                    deduplicate_examples=deduplicate_examples,
+                                    deduplicate_identifiers=deduplicate_identifiers,
+                                    declaration_concurrency=declaration_concurrency,
+                                    mode_paths=stale_paths
+                                )
+                                for sub_path in stale_paths:
+                                    graph.record(f"declarations/{sub_path}", declarations_inputs[sub_path])
+                            else:
+                                printer(f"Skipping declarations (up to date)")
                         if generate_comparisons:
-                            generate_comparisons_helper(
-                                package_name=package_name,
-                                generation_path=generation_path,
-                                build_path=build_path,
-                                verbose_setup=verbose_setup,
-                                verbose_execution=verbose_execution,
-                                verbose_files=verbose_files,
-                                combined_only=combined_only,
-                            )
+                            comparisons_inputs = {sub_path: hash_values(comparison_tools_inputs, hash_paths(generation_path / DECLARATIONS_PATH / sub_path)) for sub_path in mode_paths}
+                            stale_paths = [sub_path for sub_path in mode_paths if not (incremental and graph.is_fresh(f"comparisons/{sub_path}", comparisons_inputs[sub_path]))]
+                            if stale_paths:
+                                for sub_path in stale_paths:
+                                    graph.invalidate(f"comparisons/{sub_path}")
+                                    shutil.rmtree(generation_path / COMPARISONS_PATH / sub_path, ignore_errors=True)
+                                generate_comparisons_helper(
+                                    package_name=package_name,
+                                    generation_path=generation_path,
+                                    build_path=build_path,
+                                    verbose_setup=verbose_setup,
+                                    verbose_execution=verbose_execution,
+                                    verbose_files=verbose_files,
+                                    combined_only=combined_only,
+                                    mode_paths=stale_paths
+                                )
+                                for sub_path in stale_paths:
+                                    graph.record(f"comparisons/{sub_path}", comparisons_inputs[sub_path])
+                            else:
+                                printer(f"Skipping comparisons (up to date)")
                     save_data(data_json_path, "usable", True, raise_missing=True)
                 except PackageDataMissingError:
                     save_data(data_json_path, "package_data_missing", True, raise_missing=True)
@@ -107,10 +230,18 @@ def generate(
                 except LLMRejectedError:
                     save_data(data_json_path, "llm_rejected", True, raise_missing=True)
                     raise
+                except PrefilterRejectedError:
+                    save_data(data_json_path, "prefilter_rejected", True, raise_missing=True)
+                    raise
                 except Exception:
                     save_data(data_json_path, "unexpected_exception", True, raise_missing=True)
                     raise
                 finally:
+                    # Usage of all external processes, such that expensive packages and stages can be found
+                    save_data(data_json_path, "resources", dict(
+                        stages=summarize_resources(resource_records, "stage"),
+                        commands=summarize_resources(resource_records, "name")
+                    ))
                     printer(f"Finished generation for \"{package_name}\"")
                     if remove_cache:
                         shutil.rmtree(generation_path / "cache", ignore_errors=True)
\ No newline at end of file
@@ -0,0 +1,347 @@
+from contextvars import copy_context
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+import re
+import sqlite3
+import threading
+import time
+import traceback
+from typing import Any, Callable, Optional
+from urllib.parse import unquote
+
+from jstypelog.utils import *
+from jstypelog.comparison import build_definitely_typed
+from jstypelog.examplification import prompter_factory
+from jstypelog.generation import generate
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8421
+JOBS_PATH = Path("jobs.sqlite")
+JOB_STATUSES = ["queued", "running", "done", "failed"]
+# Flags of data.json that classify why a package is not usable, in the order they are reported
+JOB_ERRORS = ["package_data_missing", "package_installation_failed", "commonjs_unsupported", "es5_unsupported", "llm_rejected", "prefilter_rejected", "unexpected_exception"]
+# Unqualified npm package names, which also rules out paths outside of the packages directory
+PACKAGE_NAME_PATTERN = re.compile(r"[a-z0-9][a-z0-9._-]*")
+MAX_REQUEST_SIZE = 64 * 1024
+
+class JobQueue:
+    # Persistent priority queue of generation jobs, jobs with a higher priority are taken first and equal priorities in submission order
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._condition = threading.Condition()
+        with self._condition:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    package_name TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    submitted REAL NOT NULL,
+                    started REAL,
+                    finished REAL
+                )
+            """)
+            self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_order ON jobs (status, priority DESC, id)")
+            # Jobs that were running when the service stopped are started again
+            self._connection.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'")
+
+    def _get(self, job_id: int) -> Optional[dict]:
+        row = self._connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else dict(row)
+
+    def submit(self, package_name: str, priority: int = 0) -> dict:
+        # A package that is already queued or running is not queued twice, a higher priority is taken over
+        with self._condition:
+            row = self._connection.execute("SELECT * FROM jobs WHERE package_name = ? AND status IN ('queued', 'running')", (package_name,)).fetchone()
+            if row is not None:
+                if row["status"] == "queued" and priority > row["priority"]:
+                    self._connection.execute("UPDATE jobs SET priority = ? WHERE id = ?", (priority, row["id"]))
+                return self._get(row["id"]) or dict(row)
+            cursor = self._connection.execute(
+                "INSERT INTO jobs (package_name, priority, status, submitted) VALUES (?, ?, 'queued', ?)",
+                (package_name, priority, time.time())
+            )
+            self._condition.notify()
+            return self._get(cursor.lastrowid or 0) or {}
+
+    def get(self, job_id: int) -> Optional[dict]:
+        with self._condition:
+            return self._get(job_id)
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> list[dict]:
+        with self._condition:
+            if status is None:
+                rows = self._connection.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+            else:
+                rows = self._connection.execute("SELECT * FROM jobs WHERE status = ? ORDER BY priority DESC, id LIMIT ?", (status, limit))
+            return [dict(row) for row in rows]
+
+    def count(self) -> dict[str, int]:
+        with self._condition:
+            counts = dict(self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+    def take(self, timeout: float) -> Optional[dict]:
+        # Blocks until a job is queued or the timeout passed
+        with self._condition:
+            while True:
+                row = self._connection.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1").fetchone()
+                if row is not None:
+                    self._connection.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), row["id"]))
+                    return self._get(row["id"])
+                if not self._condition.wait(timeout):
+                    return None
+
+    def finish(self, job_id: int, error: Optional[str]) -> None:
+        with self._condition:
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                ("failed" if error else "done", error, time.time(), job_id)
+            )
+
+    def close(self) -> None:
+        with self._condition:
+            self._connection.close()
+
+def create_warm_prompter_factory() -> Callable[[str, int], Any]:
+    # The model clients (and their connection pools) are shared by all jobs, every job still gets its own prompter
+    from easy_prompting.prebuilt import GPT, Prompter
+    models: dict[tuple[str, int], Any] = {}
+    lock = threading.Lock()
+
+    def create_prompter(llm_model_name: str, llm_temperature: int) -> Any:
+        with lock:
+            if (llm_model_name, llm_temperature) not in models:
+                models[(llm_model_name, llm_temperature)] = GPT(llm_model_name, llm_temperature)
+            model = models[(llm_model_name, llm_temperature)]
+        return Prompter(model)
+
+    return create_prompter
+
+class Service:
+    # Long-running generation service, the tools are built and checked once and the workers reuse the warm toolchain for every job
+    def __init__(
+        self,
+        service_path: Path,
+        build_path: Path,
+        num_workers: int = 2,
+        generate_with_llm: bool = True,
+        generate_comparisons: bool = False,
+        llm_model_name: str = "gpt-4o-mini",
+        llm_temperature: int = 0,
+        verbose_setup: bool = True
+    ):
+        self.service_path = service_path
+        self.build_path = build_path
+        self.queue = JobQueue(service_path / JOBS_PATH)
+        self._num_workers = num_workers
+        self._generate_with_llm = generate_with_llm
+        self._generate_comparisons = generate_comparisons
+        self._llm_model_name = llm_model_name
+        self._llm_temperature = llm_temperature
+        self._verbose_setup = verbose_setup
+        self._stopped = threading.Event()
+        self._workers: list[threading.Thread] = []
+        self.versions: dict = {}
+
+    def get_generation_path(self, package_name: str) -> Path:
+        return self.service_path / PACKAGES_PATH / escape_package_name(package_name)
+
+    def warm_up(self) -> None:
+        with printer(f"Warming up the toolchain:"):
+            build_npm_tools(self.build_path, self._verbose_setup)
+            build_run_time_information_gathering(self.build_path, self._verbose_setup)
+            build_ts_declaration_file_generator(self.build_path, self._verbose_setup)
+            if self._generate_comparisons:
+                build_definitely_typed(self.build_path, self._verbose_setup)
+            # The versions are only checked once, jobs of the same service share them
+            self.versions = get_tool_versions(self.build_path)
+            if self._generate_with_llm:
+                factory = create_warm_prompter_factory()
+                factory(self._llm_model_name, self._llm_temperature)
+                prompter_factory.set(factory)
+            printer(f"Success")
+
+    def run_job(self, job: dict) -> Optional[str]:
+        package_name = job["package_name"]
+        generation_path = self.get_generation_path(package_name)
+        try:
+            # The output is kept in the logs of the package, such that the output of concurrent jobs does not interleave
+            with printer.with_buffer(), logger.context(job=job["id"]):
+                generate(
+                    package_name=package_name,
+                    generation_path=generation_path,
+                    build_path=self.build_path,
+                    verbose=True,
+                    verbose_setup=False,
+                    verbose_execution=False,
+                    verbose_files=False,
+                    remove_cache=False,
+                    generate_examples=True,
+                    generate_declarations=True,
+                    generate_comparisons=self._generate_comparisons,
+                    generate_with_llm=self._generate_with_llm,
+                    llm_model_name=self._llm_model_name,
+                    llm_temperature=self._llm_temperature,
+                    llm_verbose=False,
+                    warm_execution=True,
+                    # Resubmitted packages only rebuild their stale artifacts
+                    incremental=True,
+                    overwrite=False,
+                    versions=self.versions,
+                    combine_examples=True,
+                    combined_only=True
+                )
+        except Exception as e:
+            if not isinstance(e, (CommonJSUnsupportedError, ES5UnsupportedError, PackageDataMissingError, PackageInstallationError, LLMRejectedError, PrefilterRejectedError)):
+                logger.error("Job %s failed: %s", job["id"], traceback.format_exc())
+            return type(e).__name__
+        # Skipped packages (e.g. failed before for the same inputs) are classified by their data
+        with open_package(generation_path) as package:
+            if package.load_data("usable", raise_missing=False, default=False):
+                return None
+            return next((error for error in JOB_ERRORS if package.load_data(error, raise_missing=False, default=False)), "unusable")
+
+    def _work(self) -> None:
+        while not self._stopped.is_set():
+            job = self.queue.take(timeout=1)
+            if job is None:
+                continue
+            start_time = time.perf_counter()
+            error = self.run_job(job)
+            self.queue.finish(job["id"], error)
+            printer(f"Job {job["id"]} \"{job["package_name"]}\": {error or "done"} ({time.perf_counter() - start_time:.1f} s)")
+
+    def start(self) -> None:
+        for index in range(self._num_workers):
+            # Every worker starts with the context of the service (e.g. the warm prompter factory)
+            worker = threading.Thread(target=copy_context().run, args=(self._work,), name=f"jstypelog-worker-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for worker in self._workers:
+            worker.join()
+        self.queue.close()
+
+    def get_job(self, job_id: int) -> Optional[dict]:
+        job = self.queue.get(job_id)
+        if job is not None and job["status"] in ("done", "failed"):
+            with open_package(self.get_generation_path(job["package_name"])) as package:
+                job["declarations"] = [path for path in package.list_files(DECLARATIONS_PATH) if path.endswith(".d.ts")]
+        return job
+
+    def read_file(self, job_id: int, relative_path: str) -> Optional[bytes]:
+        job = self.queue.get(job_id)
+        if job is None:
+            return None
+        with open_package(self.get_generation_path(job["package_name"])) as package:
+            # Only files listed by the package can be read, such that paths can not escape the package
+            if relative_path not in package.list_files():
+                return None
+            return package.read_bytes(relative_path)
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    # JSON API of the service:
+    #   POST /jobs {"package": "abs", "priority": 0}  submits a package
+    #   GET  /jobs[?status=queued]                    lists jobs
+    #   GET  /jobs/<id>                               status and declaration files of a job
+    #   GET  /jobs/<id>/files/<path>                  a file of the package of a job
+    #   GET  /health                                  tool versions and queue counts
+    server: "ServiceServer"
+
+    def _send(self, status: HTTPStatus, content: Any, content_type: str = "application/json") -> None:
+        body = content if isinstance(content, bytes) else json.dumps(content, indent=2, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        self._send(status, dict(error=message))
+
+    def do_GET(self) -> None:
+        service = self.server.service
+        path, _, query = self.path.partition("?")
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        match parts:
+            case ["health"]:
+                self._send(HTTPStatus.OK, dict(versions=service.versions, jobs=service.queue.count()))
+            case ["jobs"]:
+                status = dict(item.partition("=")[::2] for item in query.split("&") if item).get("status")
+                if status is not None and status not in JOB_STATUSES:
+                    return self._send_error(HTTPStatus.BAD_REQUEST, f"Unknown status {status!r}")
+                self._send(HTTPStatus.OK, service.queue.list(status))
+            case ["jobs", job_id] if job_id.isdigit():
+                job = service.get_job(int(job_id))
+                if job is None:
+                    return self._send_error(HTTPStatus.NOT_FOUND, f"Unknown job {job_id}")
+                self._send(HTTPStatus.OK, job)
+            case ["jobs", job_id, "files", *file_parts] if job_id.isdigit() and file_parts:
+                content = service.read_file(int(job_id), "/".join(file_parts))
+                if content is None:
+                    return self._send_error(HTTPStatus.NOT_FOUND, f"Unknown file {"/".join(file_parts)!r} of job {job_id}")
+                self._send(HTTPStatus.OK, content, "text/plain; charset=utf-8")
+            case _:
+                self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path {path!r}")
+
+    def do_POST(self) -> None:
+        service = self.server.service
+        if self.path.rstrip("/") != "/jobs":
+            return self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path {self.path!r}")
+        size = int(self.headers.get("Content-Length") or 0)
+        if size > MAX_REQUEST_SIZE:
+            return self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request is larger than {MAX_REQUEST_SIZE} bytes")
+        try:
+            request = json.loads(self.rfile.read(size) or b"{}")
+            package_name = request["package"]
+            priority = int(request.get("priority", 0))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return self._send_error(HTTPStatus.BAD_REQUEST, "Expected a JSON object with a \"package\" and an optional integer \"priority\"")
+        if not isinstance(package_name, str) or not PACKAGE_NAME_PATTERN.fullmatch(package_name):
+            return self._send_error(HTTPStatus.BAD_REQUEST, f"Unsupported package name {package_name!r}")
+        self._send(HTTPStatus.ACCEPTED, service.queue.submit(package_name, priority))
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s %s", self.address_string(), format % args)
+
+class ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: Service):
+        super().__init__(address, ServiceHandler)
+        self.service = service
+
+def serve(
+    service_path: Path,
+    build_path: Path,
+    host: str = SERVICE_HOST,
+    port: int = SERVICE_PORT,
+    num_workers: int = 2,
+    generate_with_llm: bool = True,
+    generate_comparisons: bool = False,
+    llm_model_name: str = "gpt-4o-mini",
+    llm_temperature: int = 0,
+    verbose_setup: bool = True
+) -> None:
+    create_dir(service_path / LOGS_PATH)
+    with logger.with_sink(FileSink(make_path_name_unique(service_path / LOGS_PATH / "log.jsonl"), format_json)):
+        service = Service(service_path, build_path, num_workers, generate_with_llm, generate_comparisons, llm_model_name, llm_temperature, verbose_setup)
+        service.warm_up()
+        service.start()
+        with ServiceServer((host, port), service) as server:
+            printer(f"Serving on http://{host}:{server.server_address[1]} with {num_workers} worker(s), queued jobs: {service.queue.count()["queued"]}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                # Running jobs are finished, queued jobs are kept for the next start
+                printer(f"Stopping service (waiting for running jobs)")
+            finally:
+                service.stop()
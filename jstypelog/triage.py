@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+from pathlib import Path
+import shutil
+import time
+import traceback
+from typing import Optional
+
+from jstypelog.utils import *
+
+TRIAGE_VERDICTS = ["passed", "package_installation_failed", "commonjs_unsupported", "es5_unsupported"]
+# The exceptions that generate raises for packages that failed the triage, such that they are classified like before
+TRIAGE_ERRORS = {
+    "package_installation_failed": PackageInstallationError,
+    "commonjs_unsupported": CommonJSUnsupportedError,
+    "es5_unsupported": ES5UnsupportedError
+}
+
+def get_triage_inputs(package_name: str, check_es5: bool, versions: dict) -> str:
+    return hash_values(package_name, versions["node"], versions["npm"], check_es5)
+
+def get_recorded_verdict(generation_path: Path, triage_inputs: str) -> Optional[str]:
+    # The verdict that generate recorded in the artifact graph of the package (also of sealed packages), None if stale
+    with open_package(generation_path) as package:
+        content = package.read_text(ARTIFACTS_JSON_PATH)
+    node = json.loads(content).get("triage") if content else None
+    if node is None or node["inputs"] != triage_inputs:
+        return None
+    return node["error"] or "passed"
+
+def triage_package(
+    package_name: str,
+    generation_path: Path,
+    build_path: Path,
+    check_es5: bool,
+    verbose_setup: bool,
+    verbose_execution: bool
+) -> str:
+    # The cheap checks of generate_examples, before the repository is cloned. The template project is kept for the generation.
+    template_path = generation_path / TEMPLATE_PATH
+    playground_path = get_isolated_path(generation_path / PLAYGROUND_PATH, "triage")
+    try:
+        build_template_project(package_name, generation_path, verbose_setup)
+    except PackageInstallationError:
+        # A partial template project would be reused by the generation otherwise
+        shutil.rmtree(template_path, ignore_errors=True)
+        return "package_installation_failed"
+    try:
+        with printer(f"Checking CommonJS support:"):
+            create_dir(playground_path, template_path, overwrite=True)
+            create_file(playground_path / "entry.js", content=f"const package = require(\"{package_name}\");")
+            timeout = timeout_controller.get_timeout("execution")
+            start_time = time.perf_counter()
+            shell_output = shell(f"node entry.js", cwd=playground_path, check=False, timeout=timeout, verbose=verbose_execution)
+            timeout_controller.record("execution", time.perf_counter() - start_time, shell_output.timeout)
+            if shell_output.code:
+                printer(f"Fail")
+                return "commonjs_unsupported"
+            printer(f"Success")
+        if check_es5:
+            with printer(f"Checking ES5 support:"):
+                shell_output = shell(
+                    f"npx esbuild entry.js --outfile=bundle.js --bundle --target=es5 --platform=node --log-level=error",
+                    cwd=playground_path,
+                    check=False,
+                    timeout=INSTALLATION_TIMEOUT,
+                    verbose=verbose_execution
+                )
+                if shell_output.code:
+                    printer(f"Fail")
+                    return "es5_unsupported"
+                printer(f"Success")
+        return "passed"
+    finally:
+        shutil.rmtree(playground_path, ignore_errors=True)
+
+def triage_packages(
+    package_names: list[str],
+    evaluation_path: Path,
+    build_path: Path,
+    check_es5: bool,
+    verbose_setup: bool,
+    verbose_execution: bool,
+    concurrency: int = MAX_NUM_CONCURRENT_EXECUTIONS,
+    incremental: bool = False,
+    versions: Optional[dict] = None
+) -> dict[str, Optional[str]]:
+    # Runs the triage of many packages concurrently, packages that were already generated are left to generate.
+    # Incremental runs reuse the verdicts of packages that were triaged with the same inputs.
+    with logger.context(stage="triage"), printer(f"Triaging {len(package_names)} package(s):"):
+        build_npm_tools(build_path, verbose_setup)
+        versions = get_tool_versions(build_path) if versions is None else versions
+
+        def triage_helper(package_name: str) -> tuple[Optional[str], str]:
+            generation_path = evaluation_path / PACKAGES_PATH / escape_package_name(package_name)
+            verdict = None
+            with printer.with_buffer() as buffer, logger.context(package=package_name):
+                with printer(f"Triaging package \"{package_name}\":"):
+                    try:
+                        verdict = triage_package(package_name, generation_path, build_path, check_es5, verbose_setup, verbose_execution)
+                    except Exception:
+                        # Unexpected exceptions are left to generate, such that they are classified like before
+                        printer(traceback.format_exc(), end="")
+            return verdict, buffer.get_text()
+
+        verdicts: dict[str, Optional[str]] = {}
+        pending_names = []
+        for package_name in package_names:
+            generation_path = evaluation_path / PACKAGES_PATH / escape_package_name(package_name)
+            if not package_generated(generation_path):
+                pending_names.append(package_name)
+            elif incremental:
+                verdict = get_recorded_verdict(generation_path, get_triage_inputs(package_name, check_es5, versions))
+                if verdict is None:
+                    pending_names.append(package_name)
+                else:
+                    verdicts[package_name] = verdict
+        if verdicts:
+            printer(f"Reusing {len(verdicts)} recorded verdict(s)")
+        package_names = pending_names
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            futures = [submit_in_context(executor, triage_helper, package_name) for package_name in package_names]
+            # Print in submission order, such that the logs are deterministic
+            for package_name, future in zip(package_names, futures):
+                verdict, text = future.result()
+                printer.replay(text)
+                verdicts[package_name] = verdict
+        printer(f"Verdicts: {", ".join(f"{verdict} {list(verdicts.values()).count(verdict)}" for verdict in TRIAGE_VERDICTS)}")
+        return verdicts
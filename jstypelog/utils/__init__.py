@@ -1,5 +1,21 @@
+from jstypelog.utils.logger import *
+from jstypelog.utils.tracing import *
+from jstypelog.utils.resources import *
 from jstypelog.utils.printer import *
 from jstypelog.utils.shell import *
 from jstypelog.utils.helpers import *
 from jstypelog.utils.shared import *
-from jstypelog.utils.build import *
\ No newline at end of file
+from jstypelog.utils.scanner import *
+from jstypelog.utils.build import *
+from jstypelog.utils.context import *
+from jstypelog.utils.prefilter import *
+from jstypelog.utils.harness import *
+from jstypelog.utils.syntax import *
+from jstypelog.utils.dedup import *
+from jstypelog.utils.artifacts import *
+from jstypelog.utils.timeouts import *
+from jstypelog.utils.store import *
+
+from jstypelog.utils.archive import *
+from jstypelog.utils.scheduling import *
+from jstypelog.utils.coverage import *
\ No newline at end of file
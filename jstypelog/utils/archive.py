@@ -0,0 +1,167 @@
+from abc import ABC, abstractmethod
+import json
+import os
+from pathlib import Path, PurePosixPath
+import shutil
+import sqlite3
+import stat
+import threading
+from typing import Any, Optional
+import zlib
+
+from jstypelog.utils.shared import *
+
+ARCHIVE_SUFFIX = ".sqlite"
+ARCHIVE_COMPRESSION_LEVEL = 6
+# Intermediate files (template project, playground, repository) are not results and are never archived
+ARCHIVE_EXCLUDED_PATHS = [CACHE_PATH]
+
+def get_archive_path(generation_path: Path) -> Path:
+    return generation_path.with_name(generation_path.name + ARCHIVE_SUFFIX)
+
+def seal_package(generation_path: Path) -> Optional[Path]:
+    # Packs the results of a finished package into one compressed SQLite file with an index by path and removes the directory.
+    # Directories without data (e.g. only the template project of the triage) are no finished package and never replace an archive.
+    if not (generation_path / DATA_JSON_PATH).is_file():
+        return None
+    archive_path = get_archive_path(generation_path)
+    temporary_path = archive_path.with_name(f".{archive_path.name}.{os.getpid()}.{threading.get_ident()}")
+    temporary_path.unlink(missing_ok=True)
+    connection = sqlite3.connect(temporary_path)
+    try:
+        with connection:
+            connection.execute("CREATE TABLE files (path TEXT PRIMARY KEY, mode INTEGER NOT NULL, size INTEGER NOT NULL, content BLOB NOT NULL)")
+            for root, dir_names, file_names in os.walk(generation_path):
+                root_path = Path(root)
+                dir_names[:] = sorted(name for name in dir_names if (root_path / name).relative_to(generation_path) not in ARCHIVE_EXCLUDED_PATHS)
+                for name in sorted(file_names):
+                    file_path = root_path / name
+                    file_stat = os.lstat(file_path)
+                    if not stat.S_ISREG(file_stat.st_mode):
+                        continue
+                    content = file_path.read_bytes()
+                    connection.execute(
+                        "INSERT INTO files VALUES (?, ?, ?, ?)",
+                        (file_path.relative_to(generation_path).as_posix(), stat.S_IMODE(file_stat.st_mode), len(content), zlib.compress(content, ARCHIVE_COMPRESSION_LEVEL))
+                    )
+    finally:
+        connection.close()
+    os.replace(temporary_path, archive_path)
+    shutil.rmtree(generation_path)
+    return archive_path
+
+def unseal_package(generation_path: Path) -> bool:
+    # Restores the directory of a sealed package (e.g. for incremental runs) and removes the archive
+    archive_path = get_archive_path(generation_path)
+    if not archive_path.is_file():
+        return False
+    with ArchiveReader(archive_path) as reader:
+        for relative_path in reader.list_files():
+            file_path = generation_path / relative_path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_bytes(reader.read_bytes(relative_path) or b"")
+            os.chmod(file_path, reader.get_mode(relative_path))
+    archive_path.unlink()
+    return True
+
+class PackageReader(ABC):
+    # Read access to the results of a package, independent of whether the package is sealed or not
+    @abstractmethod
+    def read_bytes(self, relative_path: Path | str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    def list_files(self, relative_path: Path | str = "") -> list[str]:
+        # Relative paths of all files below the given directory, sorted
+        pass
+
+    def read_text(self, relative_path: Path | str) -> Optional[str]:
+        content = self.read_bytes(relative_path)
+        return None if content is None else content.decode()
+
+    def exists(self, relative_path: Path | str) -> bool:
+        return self.read_bytes(relative_path) is not None
+
+    def dir_empty(self, relative_path: Path | str) -> bool:
+        return not self.list_files(relative_path)
+
+    def get_children(self, relative_path: Path | str) -> list[str]:
+        # Relative paths of the direct children (files and directories) of the given directory
+        prefix = PurePosixPath(relative_path)
+        return sorted({(prefix / PurePosixPath(path).relative_to(prefix).parts[0]).as_posix() for path in self.list_files(relative_path)})
+
+    def load_data(self, key: str, raise_missing: bool = True, default: Any = None) -> Any:
+        if not hasattr(self, "_data"):
+            content = self.read_text(DATA_JSON_PATH)
+            self._data = {} if content is None else json.loads(content)
+        if raise_missing and key not in self._data:
+            raise KeyError(f"Key {key!r} not found at {self}")
+        return self._data.get(key, default)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "PackageReader":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.close()
+
+class DirectoryReader(PackageReader):
+    def __init__(self, generation_path: Path):
+        self._generation_path = generation_path
+
+    def read_bytes(self, relative_path: Path | str) -> Optional[bytes]:
+        file_path = self._generation_path / relative_path
+        return file_path.read_bytes() if file_path.is_file() else None
+
+    def list_files(self, relative_path: Path | str = "") -> list[str]:
+        dir_path = self._generation_path / relative_path
+        if not dir_path.is_dir():
+            return []
+        return sorted(path.relative_to(self._generation_path).as_posix() for path in dir_path.rglob("*") if path.is_file())
+
+    def __str__(self) -> str:
+        return str(self._generation_path)
+
+class ArchiveReader(PackageReader):
+    def __init__(self, archive_path: Path):
+        self._archive_path = archive_path
+        # Read-only, such that concurrent readers never lock or modify the archive
+        self._connection = sqlite3.connect(f"{archive_path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+
+    def read_bytes(self, relative_path: Path | str) -> Optional[bytes]:
+        row = self._connection.execute("SELECT content FROM files WHERE path = ?", (PurePosixPath(relative_path).as_posix(),)).fetchone()
+        return None if row is None else zlib.decompress(row[0])
+
+    def list_files(self, relative_path: Path | str = "") -> list[str]:
+        prefix = PurePosixPath(relative_path).as_posix()
+        if prefix == ".":
+            rows = self._connection.execute("SELECT path FROM files ORDER BY path")
+        else:
+            # Range over the primary key index instead of a LIKE, such that paths with wildcards are no problem
+            rows = self._connection.execute("SELECT path FROM files WHERE path > ? AND path < ? ORDER BY path", (prefix + "/", prefix + "0"))
+        return [row[0] for row in rows]
+
+    def get_mode(self, relative_path: Path | str) -> int:
+        row = self._connection.execute("SELECT mode FROM files WHERE path = ?", (PurePosixPath(relative_path).as_posix(),)).fetchone()
+        return 0o644 if row is None else row[0]
+
+    def get_sizes(self) -> tuple[int, int]:
+        # Uncompressed and compressed size of all files
+        size, compressed_size = self._connection.execute("SELECT COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(content)), 0) FROM files").fetchone()
+        return size, compressed_size
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __str__(self) -> str:
+        return str(self._archive_path)
+
+def open_package(generation_path: Path) -> PackageReader:
+    # The archive is preferred, because a directory next to it can only be a partial unsealing
+    archive_path = get_archive_path(generation_path)
+    return ArchiveReader(archive_path) if archive_path.is_file() else DirectoryReader(generation_path)
+
+def package_generated(generation_path: Path) -> bool:
+    return get_archive_path(generation_path).is_file() or (generation_path / DATA_JSON_PATH).is_file()
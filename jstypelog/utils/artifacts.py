@@ -0,0 +1,46 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+from jstypelog.utils.helpers import create_file
+
+def hash_values(*values: Any) -> str:
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+def hash_paths(*paths: Path) -> str:
+    # Content hash of files and directory trees, including the relative file names
+    digest = hashlib.sha256()
+    for path in paths:
+        files = sorted(file for file in path.rglob("*") if file.is_file()) if path.is_dir() else [path]
+        for file in files:
+            digest.update(str(file.relative_to(path) if path.is_dir() else file.name).encode())
+            digest.update(file.read_bytes() if file.is_file() else b"<missing>")
+    return digest.hexdigest()
+
+class ArtifactGraph:
+    # Records the input hash of every artifact node, such that only stale nodes have to be rebuilt (like make)
+    def __init__(self, file_path: Path):
+        self._file_path = file_path
+        self._nodes: dict[str, dict[str, Any]] = {}
+        if file_path.is_file():
+            self._nodes = json.loads(file_path.read_text())
+
+    def _save(self) -> None:
+        create_file(self._file_path, content=json.dumps(self._nodes, indent=2, ensure_ascii=False))
+
+    def is_fresh(self, name: str, inputs_hash: str) -> bool:
+        node = self._nodes.get(name)
+        return node is not None and node["inputs"] == inputs_hash
+
+    def get_error(self, name: str) -> Optional[str]:
+        node = self._nodes.get(name)
+        return None if node is None else node.get("error")
+
+    def record(self, name: str, inputs_hash: str, error: Optional[str] = None) -> None:
+        self._nodes[name] = dict(inputs=inputs_hash, error=error)
+        self._save()
+
+    def invalidate(self, name: str) -> None:
+        if self._nodes.pop(name, None) is not None:
+            self._save()
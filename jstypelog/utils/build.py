@@ -1,11 +1,41 @@
 import json
+import os
 from pathlib import Path
+import threading
+import time
 from typing import Optional
 
-from jstypelog.utils.helpers import create_dir, create_file, dir_empty, get_children, file_exists
+from jstypelog.utils.helpers import create_dir, create_file, dir_empty, file_exists
 from jstypelog.utils.shell import ShellError, shell
 from jstypelog.utils.printer import printer
+from jstypelog.utils.scanner import scan_repository
 from jstypelog.utils.shared import *
+from jstypelog.utils.store import get_package_store
+from jstypelog.utils.timeouts import timeout_controller
+
+# Images that are known to be up to date in this process
+_ready_images: set[str] = set()
+_images_lock = threading.Lock()
+
+def get_image_cache_path(build_path: Path) -> Path:
+    # A shared artifact directory (e.g. a network file system) can be given for all workers
+    return Path(os.environ[IMAGE_CACHE_VARIABLE]) if os.environ.get(IMAGE_CACHE_VARIABLE) else build_path / IMAGES_PATH
+
+def get_tool_versions(build_path: Path) -> dict:
+    # Versions of the external tools, the git commits are None for repositories that are not cloned yet
+    def get_commit(repository_path: Path) -> Optional[str]:
+        if dir_empty(repository_path):
+            return None
+        return shell("git rev-parse HEAD", cwd=repository_path, check=False).value.strip() or None
+    return dict(
+        node = shell("node --version", check=False).value.strip(),
+        npm = shell("npm --version", check=False).value.strip(),
+        git = shell("git --version", check=False).value.strip(),
+        docker = shell("docker --version", check=False).value.strip(),
+        definitely_typed = get_commit(build_path / DEFINITELY_TYPED_PATH),
+        run_time_analyzer = get_commit(build_path / RUN_TIME_ANALYZER_PATH),
+        declaration_generator = get_commit(build_path / DECLARATION_GENERATOR_PATH)
+    )
 
 def build_definitely_typed(build_path: Path, verbose_setup: bool) -> None:
     with printer.with_verbose(verbose_setup):
@@ -22,46 +52,69 @@ def build_definitely_typed(build_path: Path, verbose_setup: bool) -> None:
             )
             printer(f"Success")
 
+def build_docker_image(image_name: str, repository_path: Path, build_path: Path, verbose_setup: bool, check: bool = True) -> None:
+    # Images are tagged with the commit of their repository and shared as tarballs, such that new workers load instead of build them
+    with printer.with_verbose(verbose_setup), _images_lock:
+        with printer(f"Building {image_name} docker image:"):
+            if image_name in _ready_images:
+                printer(f"Success (already build)")
+                return None
+            commit = shell("git rev-parse HEAD", cwd=repository_path, check=False).value.strip()
+            tagged_name = f"{image_name}:{commit[:12]}"
+            archive_path = get_image_cache_path(build_path) / f"{image_name}-{commit}.tar"
+            if commit and shell(f"docker image inspect {tagged_name}", check=False).code == 0:
+                shell(f"docker tag {tagged_name} {image_name}", verbose=verbose_setup)
+                printer(f"Success (already build)")
+            elif commit and archive_path.is_file() and shell(f"docker load -i {archive_path}", check=False, timeout=INSTALLATION_TIMEOUT, verbose=verbose_setup).code == 0:
+                shell(f"docker tag {tagged_name} {image_name}", verbose=verbose_setup)
+                printer(f"Success (loaded from {archive_path})")
+            else:
+                shell(f"{repository_path}/build/build.sh", check=check, timeout=INSTALLATION_TIMEOUT, verbose=verbose_setup)
+                if commit and shell(f"docker image inspect {image_name}", check=False).code == 0:
+                    shell(f"docker tag {image_name} {tagged_name}", verbose=verbose_setup)
+                    # Written under a temporary name first, such that other workers never load a partial tarball
+                    create_dir(archive_path.parent)
+                    temporary_path = archive_path.with_name(f".{archive_path.name}.{os.getpid()}")
+                    if shell(f"docker save -o {temporary_path} {tagged_name}", check=False, timeout=INSTALLATION_TIMEOUT, verbose=verbose_setup).code == 0:
+                        os.replace(temporary_path, archive_path)
+                    else:
+                        temporary_path.unlink(missing_ok=True)
+                printer(f"Success" if check else f"Success (ignoring test errors)")
+            _ready_images.add(image_name)
+
 # currently not in development, so does not need a reproduction mode
 def build_run_time_information_gathering(build_path: Path, verbose_setup: bool) -> None:
     with printer.with_verbose(verbose_setup):
         with printer(f"Cloning run-time-information-gathering repository:"):
             output_path = build_path / RUN_TIME_ANALYZER_PATH
-            if not dir_empty(output_path):
-                printer(f"Success (already build)")
-                return None
-            create_dir(output_path, overwrite=True)
-            shell(
-                f"git clone --depth 1 https://github.com/Proglang-TypeScript/run-time-information-gathering.git {output_path}",
-                timeout=INSTALLATION_TIMEOUT,
-                verbose=verbose_setup
-            )
-            printer(f"Success")
-        # We tie building the docker image to whether the repository needs to be cloned (simple build control)
-        with printer(f"Building run-time-information-gathering docker image:"):
-            shell(f"{output_path}/build/build.sh", check=False, timeout=INSTALLATION_TIMEOUT, verbose=verbose_setup)
-            # printer(f"Success")
-            printer(f"Success (ignoring test errors)")
+            if dir_empty(output_path):
+                create_dir(output_path, overwrite=True)
+                shell(
+                    f"git clone --depth 1 https://github.com/Proglang-TypeScript/run-time-information-gathering.git {output_path}",
+                    timeout=INSTALLATION_TIMEOUT,
+                    verbose=verbose_setup
+                )
+                printer(f"Success")
+            else:
+                printer(f"Success (already cloned)")
+        build_docker_image(RUN_TIME_ANALYZER_IMAGE, output_path, build_path, verbose_setup, check=False)
 
 # currently not in development, so does not need a reproduction mode
 def build_ts_declaration_file_generator(build_path: Path, verbose_setup: bool) -> None:
     with printer.with_verbose(verbose_setup):
         with printer(f"Cloning ts-declaration-file-generator repository:"):
             output_path = build_path / DECLARATION_GENERATOR_PATH
-            if not dir_empty(output_path):
-                printer(f"Success (already build)")
-                return None
-            create_dir(output_path, overwrite=True)
-            shell(
-                f"git clone --depth 1 https://github.com/Proglang-TypeScript/ts-declaration-file-generator.git {output_path}",
-                timeout=INSTALLATION_TIMEOUT,
-                verbose=verbose_setup
-            )
-            printer(f"Success")
-        # We tie building the docker image to whether the repository needs to be cloned (simple build control)
-        with printer(f"Building ts-declaration-file-generator docker image:"):
-            shell(f"{output_path}/build/build.sh", timeout=INSTALLATION_TIMEOUT, verbose=verbose_setup)
-            printer(f"Success")
+            if dir_empty(output_path):
+                create_dir(output_path, overwrite=True)
+                shell(
+                    f"git clone --depth 1 https://github.com/Proglang-TypeScript/ts-declaration-file-generator.git {output_path}",
+                    timeout=INSTALLATION_TIMEOUT,
+                    verbose=verbose_setup
+                )
+                printer(f"Success")
+            else:
+                printer(f"Success (already cloned)")
+        build_docker_image(DECLARATION_GENERATOR_IMAGE, output_path, build_path, verbose_setup)
 
 def build_npm_tools(build_path: Path, verbose_setup: bool) -> None:
     with printer.with_verbose(verbose_setup):
@@ -93,8 +146,20 @@ def build_template_project(package_name: str, generation_path: Path, verbose_set
             create_dir(output_path, overwrite=True)
             with printer(f"Installing packages:"):
                 data_path = generation_path / DATA_PATH
+                package_store = get_package_store()
                 try:
-                    shell(f"npm install tsx typescript @types/node {package_name}", cwd=output_path, timeout=INSTALLATION_TIMEOUT, verbose=verbose_setup)
+                    if package_store is not None:
+                        # Only resolves the dependency tree, such that the packages that are already in the store can be linked
+                        shell(f"npm install --package-lock-only --ignore-scripts tsx typescript @types/node {package_name}", cwd=output_path, timeout=INSTALLATION_TIMEOUT, verbose=verbose_setup)
+                        num_linked, num_packages = package_store.link(output_path)
+                        printer(f"Linked {num_linked} of {num_packages} package(s) from the store")
+                    start_time = time.perf_counter()
+                    shell_output = shell(f"npm install tsx typescript @types/node {package_name}", cwd=output_path, check=False, timeout=timeout_controller.get_timeout("installation"), verbose=verbose_setup)
+                    timeout_controller.record("installation", time.perf_counter() - start_time, shell_output.timeout)
+                    if shell_output.code:
+                        raise ShellError(f"Non-Zero exit: {shell_output.code}")
+                    if package_store is not None:
+                        printer(f"Added {package_store.ingest(output_path)} package(s) to the store")
                     create_file(data_path / "package.json", output_path / "package.json")
                     create_file(data_path / "package-lock.json", output_path / "package-lock.json")
                     printer(f"Success")
@@ -131,98 +196,23 @@ def clone_repository(package_name: str, generation_path: Path, verbose_setup: bo
                 raise PackageDataMissingError(f"Repository clone is empty")
             printer(f"Success")
 
-def get_package_json(generation_path: Path, verbose_setup: bool) -> Optional[str]:
-    with printer.with_verbose(verbose_setup):
-        package_json_path = generation_path / REPOSITORY_PATH / "package.json"
-        output_path = generation_path / PACKAGE_JSON_PATH
-        if package_json_path.is_file():
-            try:
-                package_json = package_json_path.read_text()
-                create_file(output_path, content=package_json)
-                printer(f"Package file found")
-                return package_json
-            except UnicodeDecodeError:
-                pass
-        printer(f"No package file found")
-
-def get_readme(generation_path: Path, verbose_setup: bool) -> Optional[str]:
-    with printer.with_verbose(verbose_setup):
-        repository_path = generation_path / REPOSITORY_PATH
-        output_path = generation_path / README_PATH
-        for readme_path in get_children(repository_path):
-            if readme_path.is_file() and "readme" in readme_path.name.lower():
-                try:
-                    readme = readme_path.read_text()
-                    create_file(output_path, content=readme)
-                    printer(f"Readme file found")
-                    return readme_path.read_text()
-                except UnicodeDecodeError:
-                    pass
-        printer(f"No readme file found")
-
-def get_main(generation_path: Path, verbose_setup: bool) -> Optional[str]:
-    with printer.with_verbose(verbose_setup):
-        repository_path = generation_path / REPOSITORY_PATH
-        package_json_path = repository_path / "package.json"
-        output_path = generation_path / MAIN_PATH
-        if package_json_path.is_file():
-            # Check if package.json contains a main file reference
-            try:
-                package_json = json.loads(package_json_path.read_text())
-                main_path = repository_path / package_json["main"]
-                if main_path.is_file():
-                    try:
-                        main = main_path.read_text()
-                        create_file(output_path, content=main)
-                        printer(f"Main file found")
-                        return main
-                    except UnicodeDecodeError:
-                        pass
-            except (json.JSONDecodeError, KeyError):
-                pass
-            # Fallback: search for common main file names
-            main_names = ["index.js", "index.json", "index.node"]
-            for name in main_names:
-                main_path = repository_path / name
-                if main_path.is_file():
-                    try:
-                        main = main_path.read_text()
-                        create_file(output_path, content=main)
-                        printer(f"Main file found")
-                        return main
-                    except UnicodeDecodeError:
-                        pass
-            printer(f"No main file found")
-
-def get_tests(generation_path: Path, verbose_setup: bool) -> list[tuple[str, str]]:
+def get_package_data(generation_path: Path, verbose_setup: bool, max_num_tests: int) -> tuple[Optional[str], Optional[str], Optional[str], list[tuple[Path, str]]]:
+    # Package file, readme, main file and the best ranked test files of the repository, found in one walk
     with printer.with_verbose(verbose_setup):
-        tests = {}
-        repository_path = generation_path / REPOSITORY_PATH
+        scan = scan_repository(generation_path / REPOSITORY_PATH, max_num_tests)
+        if scan.package_json is not None:
+            create_file(generation_path / PACKAGE_JSON_PATH, content=scan.package_json)
+        printer(f"Package file found" if scan.package_json is not None else f"No package file found")
+        if scan.readme is not None:
+            create_file(generation_path / README_PATH, content=scan.readme)
+        printer(f"Readme file found" if scan.readme is not None else f"No readme file found")
+        if scan.main is not None:
+            create_file(generation_path / MAIN_PATH, content=scan.main)
+        if scan.package_json is not None:
+            printer(f"Main file found" if scan.main is not None else f"No main file found")
         output_path = generation_path / TESTS_PATH
         create_dir(output_path)
-        # Check well-known test directories
-        test_dirs = ["test", "tests", "__tests__"]
-        for d in test_dirs:
-            test_path = repository_path / d
-            if test_path.is_dir():
-                for f in test_path.rglob("*.js"):
-                    if f.is_file():
-                        try:
-                            tests[f.relative_to(repository_path)] = f.read_text()
-                        except UnicodeDecodeError:
-                            pass
-        # Check repo for suffixes
-        test_suffixes = [".test.js", ".spec.js"]
-        for suffix in test_suffixes:
-            for f in repository_path.rglob(f"*{suffix}"):
-                if f.suffix ==".js":
-                    if f.is_file():
-                        try:
-                            tests[f.relative_to(repository_path)] = f.read_text()
-                        except UnicodeDecodeError:
-                            pass
-        tests = [(path, content) for path, content in sorted(tests.items()) if content]
-        for i, (path, content) in enumerate(tests):
+        for i, (path, content) in enumerate(scan.tests):
             (output_path / f"{i}.js").write_text(f"// File: {path}\n\n{content}")
-        printer(f"{len(tests)} test file(s) found")
-        return tests
\ No newline at end of file
+        printer(f"{len(scan.tests)} test file(s) found{"" if scan.complete else f" (stopped after {scan.num_entries} entries)"}")
+        return scan.package_json, scan.readme, scan.main, scan.tests
\ No newline at end of file
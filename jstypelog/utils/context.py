@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+import hashlib
+import re
+
+# Rough approximation of BPE tokenizers: words are split into sub-word chunks of up to 4 characters
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{1,4}|\d{1,3}|\s+|[^\w\s]", re.UNICODE)
+
+@dataclass
+class ContextSource:
+    name: str
+    content: str
+    priority: int = 1
+
+def count_tokens(text: str) -> int:
+    return sum(1 for match in TOKEN_PATTERN.finditer(text) if not match.group().isspace())
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    num_tokens = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.group().isspace():
+            continue
+        num_tokens += 1
+        if num_tokens > max_tokens:
+            return text[:match.start()].rstrip()
+    return text
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+
+def deduplicate_blocks(text: str) -> str:
+    # Drop repeated paragraphs (e.g. badges or install instructions that appear multiple times)
+    seen = set()
+    blocks = []
+    for block in re.split(r"\n\s*\n", text):
+        key = _hash_text(block)
+        if block.strip() and key in seen:
+            continue
+        seen.add(key)
+        blocks.append(block)
+    return "\n\n".join(blocks)
+
+def deduplicate_sources(sources: list[ContextSource]) -> list[ContextSource]:
+    # Keep the highest priority copy of identical sources (e.g. a test file that is also the main file)
+    seen = set()
+    kept = set()
+    for index, source in sorted(enumerate(sources), key=lambda item: -item[1].priority):
+        key = _hash_text(source.content)
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.add(index)
+    return [
+        ContextSource(source.name, deduplicate_blocks(source.content), source.priority)
+        for index, source in enumerate(sources) if index in kept
+    ]
+
+def allocate_token_budget(sources: list[ContextSource], budget: int) -> dict[str, int]:
+    # Split the budget proportionally to the priorities, and redistribute what small sources do not need
+    needed = {source.name: count_tokens(source.content) for source in sources}
+    priorities = {source.name: max(source.priority, 1) for source in sources}
+    allocation = {name: 0 for name in needed}
+    while needed and budget > 0:
+        total_priority = sum(priorities[name] for name in needed)
+        shares = {name: budget * priorities[name] // total_priority for name in needed}
+        satisfied = [name for name in needed if needed[name] <= shares[name]]
+        if not satisfied:
+            allocation.update(shares)
+            break
+        for name in satisfied:
+            allocation[name] = needed.pop(name)
+            budget -= allocation[name]
+    return allocation
+
+def build_context(sources: list[ContextSource], budget: int) -> dict[str, str]:
+    sources = [source for source in sources if source.content]
+    sources = deduplicate_sources(sources)
+    allocation = allocate_token_budget(sources, budget)
+    context = {}
+    for source in sources:
+        content = truncate_tokens(source.content, allocation[source.name])
+        if content:
+            context[source.name] = content
+    return context
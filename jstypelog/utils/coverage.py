@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+from pathlib import Path
+from queue import Queue
+import shutil
+from typing import Optional
+
+from jstypelog.utils.helpers import create_dir, get_isolated_path, submit_in_context
+from jstypelog.utils.printer import printer
+from jstypelog.utils.shared import EXAMPLIFICATION_SCRIPTS_PATH
+from jstypelog.utils.shell import shell
+
+COVERAGE_SCRIPT_PATH = EXAMPLIFICATION_SCRIPTS_PATH / "coverage.js"
+COVERAGE_OUTPUT_NAME = "coverage.json"
+
+def record_api_coverage(
+    package_name: str,
+    example_paths: list[Path],
+    template_path: Path,
+    playground_path: Path,
+    timeout: float,
+    concurrency: int,
+    verbose_execution: bool
+) -> list[Optional[frozenset[str]]]:
+    # The exports of the package that every example touches, None if the example does not run with the require proxy
+    slots: Queue[Path] = Queue()
+    slot_paths = [get_isolated_path(playground_path, f"coverage_{slot_index}") for slot_index in range(max(concurrency, 1))]
+    for slot_path in slot_paths:
+        # Unlike the validation, the slots are copied once, examples are already known to run
+        create_dir(slot_path, template_path, overwrite=True)
+        slots.put(slot_path)
+
+    def record_helper(example_path: Path) -> tuple[Optional[frozenset[str]], str]:
+        # Runs in a worker thread, so the output is buffered and printed by the caller
+        with printer.with_buffer() as buffer:
+            coverage = record_in_slot(example_path)
+        return coverage, buffer.get_text()
+
+    def record_in_slot(example_path: Path) -> Optional[frozenset[str]]:
+        slot_path = slots.get()
+        try:
+            output_path = slot_path / COVERAGE_OUTPUT_NAME
+            output_path.unlink(missing_ok=True)
+            (slot_path / "index.js").write_text(example_path.read_text())
+            shell_output = shell(
+                f"node {COVERAGE_SCRIPT_PATH.resolve()} {package_name} {COVERAGE_OUTPUT_NAME} index.js",
+                cwd=slot_path,
+                check=False,
+                timeout=timeout,
+                verbose=verbose_execution
+            )
+            if shell_output.code or shell_output.timeout:
+                return None
+            return frozenset(json.loads(output_path.read_text()))
+        except (OSError, ValueError):
+            return None
+        finally:
+            slots.put(slot_path)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            futures = [submit_in_context(executor, record_helper, example_path) for example_path in example_paths]
+            coverages = []
+            # Print in submission order, such that the logs are deterministic
+            for future in futures:
+                coverage, text = future.result()
+                printer.replay(text)
+                coverages.append(coverage)
+            return coverages
+    finally:
+        # Every slot is a full copy of the template project
+        for slot_path in slot_paths:
+            shutil.rmtree(slot_path, ignore_errors=True)
+
+def select_covering_examples(coverages: list[Optional[frozenset[str]]], sizes: list[int]) -> list[int]:
+    # Greedy weighted set cover (an optimal cover is NP-hard): the example with the most uncovered exports per byte is taken next.
+    # Examples without coverage or with an empty one are always kept (e.g. util.inspect bypasses the proxy), nothing recorded
+    # does not mean redundant. The selected indices keep the given order.
+    selected = {index for index, coverage in enumerate(coverages) if not coverage}
+    uncovered = set().union(*(coverage for coverage in coverages if coverage is not None))
+    for index in selected:
+        uncovered -= coverages[index] or frozenset()
+    while uncovered:
+        best_index = max(
+            (index for index, coverage in enumerate(coverages) if coverage is not None and index not in selected),
+            key=lambda index: (len(uncovered & (coverages[index] or frozenset())) / max(sizes[index], 1), -index)
+        )
+        selected.add(best_index)
+        uncovered -= coverages[best_index] or frozenset()
+    return sorted(selected)
@@ -0,0 +1,119 @@
+import hashlib
+import json
+from pathlib import Path
+import re
+import threading
+from typing import Any, Optional
+
+from jstypelog.utils.helpers import create_dir
+
+TOKEN_PATTERN = re.compile(
+    r"(?P<comment>//[^\n]*|/\*.*?\*/)"
+    r"|(?P<string>\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)"
+    r"|(?P<identifier>[A-Za-z_$][\w$]*)"
+    r"|(?P<number>\d[\w.]*)"
+    r"|(?P<space>\s+)"
+    r"|(?P<other>.)",
+    re.DOTALL
+)
+# Identifiers that keep their name when normalizing identifier-insensitively
+RESERVED_IDENTIFIERS = {
+    "await", "break", "case", "catch", "class", "const", "continue", "debugger", "default", "delete", "do", "else",
+    "export", "extends", "false", "finally", "for", "function", "if", "import", "in", "instanceof", "let", "new",
+    "null", "of", "return", "static", "super", "switch", "this", "throw", "true", "try", "typeof", "undefined", "var",
+    "void", "while", "with", "yield", "async", "get", "set",
+    "require", "module", "exports", "console", "process", "Promise", "Object", "Array", "JSON", "Math", "Date",
+    "Error", "Buffer", "setTimeout", "setInterval", "clearTimeout", "clearInterval"
+}
+
+# Tokens after which a "{" opens an object literal or a destructuring pattern instead of a block
+OBJECT_BRACE_PREFIXES = {"=", "(", ",", ":", "[", "?", "|", "&", "!", "return", "const", "let", "var"}
+
+def _get_key_positions(tokens: list[str], kinds: list[Optional[str]]) -> tuple[set[int], set[str]]:
+    # Keys of object literals and destructuring patterns (identifiers after "{" or "," in such braces, or before ":"),
+    # and the names of shorthand keys (e.g. "parse" in "const {parse} = require(...)"), which are API names as well
+    positions: set[int] = set()
+    shorthand_names: set[str] = set()
+    braces: list[bool] = []
+    for index, token in enumerate(tokens):
+        if token == "{":
+            braces.append(index > 0 and tokens[index - 1] in OBJECT_BRACE_PREFIXES)
+        elif token == "}":
+            if braces:
+                braces.pop()
+        elif kinds[index] == "identifier" and braces and braces[-1] and tokens[index - 1] in ("{", ","):
+            positions.add(index)
+            if index + 1 < len(tokens) and tokens[index + 1] != ":":
+                shorthand_names.add(token)
+    return positions, shorthand_names
+
+def normalize_example(example: str, identifiers: bool = False) -> str:
+    # Removes comments, whitespace and quote style differences, and optionally renames local identifiers in order of appearance.
+    # Semicolons are kept, because statements without them can mean something else (automatic semicolon insertion).
+    tokens: list[str] = []
+    kinds: list[Optional[str]] = []
+    for match in TOKEN_PATTERN.finditer(example):
+        kind, token = match.lastgroup, match.group()
+        if kind in ("comment", "space"):
+            continue
+        if kind == "string" and token[0] in "'\"" and "\"" not in token[1:-1] and "'" not in token[1:-1]:
+            token = f"\"{token[1:-1]}\""
+        tokens.append(token)
+        kinds.append(kind)
+    if identifiers:
+        # Member names, keys and shorthand keys are part of the API of the package and keep their name
+        key_positions, kept_names = _get_key_positions(tokens, kinds)
+        renamed: dict[str, str] = {}
+        for index, (kind, token) in enumerate(zip(kinds, tokens)):
+            if (
+                kind != "identifier"
+                or token in RESERVED_IDENTIFIERS
+                or token in kept_names
+                or index in key_positions
+                or (index > 0 and tokens[index - 1] == ".")
+            ):
+                continue
+            tokens[index] = renamed.setdefault(token, f"${len(renamed)}")
+    return " ".join(tokens)
+
+def hash_example(example: str, identifiers: bool = False) -> str:
+    return hashlib.sha256(normalize_example(example, identifiers).encode()).hexdigest()
+
+class ExampleCache:
+    # Results of earlier executions and analyses keyed by normalized example hashes, persisted across stages.
+    # Entries are appended as JSON lines, later lines override earlier ones with the same kind and key.
+    def __init__(self, file_path: Path, identifiers: bool = False):
+        self._file_path = file_path
+        self._identifiers = identifiers
+        self._lock = threading.Lock()
+        self._data: dict[str, dict[str, Any]] = {}
+        if file_path.is_file():
+            for line in file_path.read_text().splitlines():
+                try:
+                    entry = json.loads(line)
+                    self._data.setdefault(entry["kind"], {})[entry["key"]] = entry["value"]
+                except (ValueError, KeyError, TypeError):
+                    # E.g. a line that was cut off by a crash
+                    continue
+
+    def get_key(self, example: str) -> str:
+        return hash_example(example, self._identifiers)
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._data.get(kind, {}).get(key)
+
+    def set(self, kind: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._data.setdefault(kind, {})[key] = value
+            create_dir(self._file_path.parent)
+            with open(self._file_path, "a") as file:
+                file.write(json.dumps(dict(kind=kind, key=key, value=value), ensure_ascii=False) + "\n")
+
+    def discard(self, kind: str) -> None:
+        # Rewrites the file without the entries of the kind, e.g. after the tools of a stage changed
+        with self._lock:
+            if self._data.pop(kind, None) is None:
+                return None
+            lines = [json.dumps(dict(kind=other_kind, key=key, value=value), ensure_ascii=False) for other_kind, entries in self._data.items() for key, value in entries.items()]
+            self._file_path.write_text("".join(f"{line}\n" for line in lines))
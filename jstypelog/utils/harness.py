@@ -0,0 +1,120 @@
+import json
+import os
+from pathlib import Path
+import select
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from typing import Any, Optional, Self
+
+from jstypelog.utils.helpers import create_dir
+from jstypelog.utils.printer import printer
+from jstypelog.utils.shared import EXAMPLIFICATION_SCRIPTS_PATH
+from jstypelog.utils.shell import SHELL_CAPTURE_HEAD, SHELL_CAPTURE_TAIL, ShellOutput, join_truncated
+
+HARNESS_STARTUP_TIMEOUT = 60
+HARNESS_RESPONSE_GRACE = 5
+HARNESS_READ_SIZE = 64 * 1024
+
+class NodeHarness:
+    # Keeps a Node process running, and runs examples in it without spawning a new process. The harness restores its state
+    # (module cache, globals, patched built-ins) after every example, such that every example loads the package anew.
+    # Falls back to the caller (returns None) whenever the harness itself is not usable.
+    def __init__(self, package_name: str, template_path: Path, playground_path: Path, verbose: bool = False):
+        self._package_name = package_name
+        self._template_path = template_path
+        # Examples can write files, so the harness runs in its own copy of the template project (like the playgrounds)
+        self._playground_path = playground_path
+        self._verbose = verbose
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._results_fd: Optional[int] = None
+        self._buffer = b""
+        self._next_id = 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.close()
+
+    def _read_result(self, timeout: float) -> Optional[dict]:
+        # Reads from the raw file descriptor with an own line buffer, select does not see data that a buffered reader already holds
+        assert self._results_fd is not None
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self._buffer:
+            ready, _, _ = select.select([self._results_fd], [], [], max(deadline - time.monotonic(), 0))
+            if not ready:
+                return None
+            data = os.read(self._results_fd, HARNESS_READ_SIZE)
+            if not data:
+                return None
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def _start(self) -> bool:
+        with printer.with_verbose(self._verbose):
+            with printer(f"Starting Node harness for \"{self._package_name}\":"):
+                create_dir(self._playground_path, self._template_path, overwrite=True)
+                read_fd, write_fd = os.pipe()
+                self._proc = subprocess.Popen(
+                    ["node", str((EXAMPLIFICATION_SCRIPTS_PATH / "harness.js").resolve()), self._package_name, str(write_fd)],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    cwd=self._playground_path,
+                    pass_fds=(write_fd,),
+                    start_new_session=True
+                )
+                os.close(write_fd)
+                self._results_fd = read_fd
+                self._buffer = b""
+                result = self._read_result(HARNESS_STARTUP_TIMEOUT)
+                if result is None or not result.get("ready", False):
+                    printer(f"Fail")
+                    self.close()
+                    return False
+                printer(f"Success")
+                return True
+
+    def run(self, example: str, timeout: float) -> Optional[ShellOutput]:
+        with self._lock:
+            if self._proc is None and not self._start():
+                return None
+            assert self._proc is not None and self._proc.stdin is not None
+            job_id = self._next_id
+            self._next_id += 1
+            try:
+                self._proc.stdin.write(json.dumps(dict(id=job_id, example=example, timeout=timeout, headLimit=SHELL_CAPTURE_HEAD, tailLimit=SHELL_CAPTURE_TAIL)) + "\n")
+                self._proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                self.close()
+                return None
+            result = self._read_result(timeout + HARNESS_RESPONSE_GRACE)
+            if result is None:
+                # The example either blocked the event loop (timeout) or crashed the harness (fall back)
+                blocked = self._proc.poll() is None
+                self.close()
+                return ShellOutput("", 124, True) if blocked else None
+            if result["timeout"]:
+                # Handles of a timed out example might still be alive, so start fresh next time
+                self.close()
+            value = join_truncated(result["head"], result["tail"], result["length"] - len(result["head"]) - len(result["tail"]))
+            return ShellOutput(value, result["code"], result["timeout"], length=result["length"])
+
+    def close(self) -> None:
+        if self._proc is not None:
+            try:
+                os.killpg(self._proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self._proc.wait()
+            self._proc = None
+        if self._results_fd is not None:
+            os.close(self._results_fd)
+            self._results_fd = None
+        shutil.rmtree(self._playground_path, ignore_errors=True)
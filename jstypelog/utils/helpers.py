@@ -1,7 +1,11 @@
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+import contextvars
 import json
 from pathlib import Path
 import shutil
-from typing import Any, Optional
+import time
+from typing import Any, Callable, Iterator, Optional
 
 def create_dir(dst_path: Path, src_path: Optional[Path] = None, overwrite: bool = False) -> None:
     if overwrite:
@@ -35,12 +39,30 @@ def get_children(dir_path: Path) -> list[Path]:
         return []
     return sorted(dir_path.iterdir(), key=lambda path: path.name)
 
+def pad_text(text: str, padding: str = "  ") -> str:
+    return "\n".join(padding + line for line in text.split("\n"))
+
 def dir_empty(dir_path: Path) -> bool:
     return not (dir_path.is_dir() and any(dir_path.iterdir()))
 
 def file_exists(file_path: Path) -> bool:
     return file_path.is_file()
 
+def get_isolated_path(path: Path, name: str) -> Path:
+    return path.with_name(f"{path.name}_{name}")
+
+def submit_in_context(executor: Executor, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+    # Workers inherit the context of the caller (e.g. the printer state)
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+@contextmanager
+def measure_time(timings: dict[str, float], name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + time.perf_counter() - start
+
 def make_path_name_unique(path: Path) -> Path:
     if "." in path.name:
         stem, suffix = path.name.split(".", 1)
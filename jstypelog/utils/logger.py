@@ -0,0 +1,156 @@
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import json
+import os
+from pathlib import Path
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional, Self
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+LOG_BATCH_SIZE = 1024
+
+@dataclass
+class LogRecord:
+    # Text is the rendered (indented) printer output, message the plain message for structured sinks.
+    # Either can be None, e.g. buffered printer output is replayed as text without a message
+    level: int
+    message: Optional[str]
+    context: dict[str, Any]
+    text: Optional[str] = None
+    time: float = field(default_factory=time.time)
+    thread: str = field(default_factory=lambda: threading.current_thread().name)
+
+def format_text(record: LogRecord) -> Optional[str]:
+    return record.text
+
+def format_json(record: LogRecord) -> Optional[str]:
+    if record.message is None:
+        return None
+    data = dict(time=record.time, level=LEVEL_NAMES.get(record.level, record.level), thread=record.thread, **record.context, message=record.message)
+    return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+
+class FileSink:
+    # Writes records in batches from a background thread, every batch is a single append,
+    # such that logging does not block the caller and several processes can share a file
+    def __init__(
+        self,
+        file_path: Path,
+        formatter: Callable[[LogRecord], Optional[str]] = format_text,
+        level: int = INFO,
+        append: bool = False
+    ):
+        self.level = level
+        self._formatter = formatter
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | (0 if append else os.O_TRUNC), 0o644)
+        self._queue: queue.Queue[Optional[LogRecord]] = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, record: LogRecord) -> None:
+        if record.level >= self.level:
+            self._queue.put(record)
+
+    def _run(self) -> None:
+        closed = False
+        while not closed:
+            records = [self._queue.get()]
+            while len(records) < LOG_BATCH_SIZE:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            texts = []
+            for record in records:
+                if record is None:
+                    closed = True
+                    continue
+                text = self._formatter(record)
+                if text:
+                    texts.append(text)
+            data = "".join(texts).encode()
+            while data:
+                data = data[os.write(self._fd, data):]
+            for _ in records:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        os.close(self._fd)
+
+class WithSink:
+    def __init__(self, logger: "Logger", sink: FileSink):
+        self._logger = logger
+        self._sink = sink
+
+    def __enter__(self) -> Self:
+        self._token = self._logger._sinks.set(self._logger._sinks.get() + (self._sink,))
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self._logger._sinks.reset(self._token)
+        self._sink.close()
+
+class WithContext:
+    def __init__(self, logger: "Logger", values: dict[str, Any]):
+        self._logger = logger
+        self._values = values
+
+    def __enter__(self) -> Self:
+        self._token = self._logger._context.set({**self._logger._context.get(), **self._values})
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self._logger._context.reset(self._token)
+
+class Logger:
+    def __init__(self):
+        # Sinks and context (e.g. package and stage) are context local, such that parallel packages log to their own files
+        self._sinks: ContextVar[tuple[FileSink, ...]] = ContextVar("logger_sinks", default=())
+        self._context: ContextVar[dict[str, Any]] = ContextVar("logger_context", default={})
+
+    def with_sink(self, sink: FileSink) -> WithSink:
+        return WithSink(self, sink)
+
+    def context(self, **values: Any) -> WithContext:
+        return WithContext(self, values)
+
+    def get_context(self) -> dict[str, Any]:
+        return self._context.get()
+
+    def is_enabled(self, level: int) -> bool:
+        return any(level >= sink.level for sink in self._sinks.get())
+
+    def emit(self, record: LogRecord) -> None:
+        for sink in self._sinks.get():
+            sink.write(record)
+
+    def log(self, level: int, message: str, *args: Any) -> None:
+        # Formatting is skipped if no sink is interested in the level
+        if not self.is_enabled(level):
+            return
+        self.emit(LogRecord(level, message % args if args else message, self.get_context()))
+
+    def debug(self, message: str, *args: Any) -> None:
+        self.log(DEBUG, message, *args)
+
+    def info(self, message: str, *args: Any) -> None:
+        self.log(INFO, message, *args)
+
+    def warning(self, message: str, *args: Any) -> None:
+        self.log(WARNING, message, *args)
+
+    def error(self, message: str, *args: Any) -> None:
+        self.log(ERROR, message, *args)
+
+logger = Logger()
@@ -0,0 +1,75 @@
+import json
+import re
+from typing import Optional
+
+PREFILTER_MODES = ["off", "shadow", "enforce"]
+FRAMEWORK_PACKAGES = [
+    "react",
+    "react-dom",
+    "react-native",
+    "vue",
+    "@angular/core",
+    "preact",
+    "svelte",
+    "solid-js",
+    "ember-source",
+    "lit"
+]
+NODE_BUILTIN_MODULES = ["fs", "path", "os", "child_process", "events", "stream", "util", "http", "https", "net", "crypto", "zlib", "buffer"]
+DOM_GLOBAL_PATTERN = re.compile(r"\b(window|document|navigator|localStorage|sessionStorage|HTMLElement)\s*[.\[]")
+DOM_GUARD_PATTERN = re.compile(r"\btypeof\s+(window|document|navigator)\b")
+NODE_REQUIRE_PATTERN = re.compile(r"\brequire\s*\(\s*[\"'`](?:node:)?(" + "|".join(NODE_BUILTIN_MODULES) + r")[\"'`]\s*\)")
+EXPORTS_PATTERN = re.compile(r"\bmodule\.exports\b|\bexports\.\w+\s*=")
+
+def prefilter_package(package_json: Optional[str], main: Optional[str]) -> tuple[str, str]:
+    # Returns a verdict ("rejected", "accepted" or "undecided") and a reason,
+    # rejection mirrors the usability conditions of the LLM evaluation prompt
+    try:
+        package_data = json.loads(package_json) if package_json else {}
+    except json.JSONDecodeError:
+        package_data = {}
+    if not isinstance(package_data, dict):
+        package_data = {}
+    if package_data.get("browser") and not package_data.get("main"):
+        return "rejected", "package.json has a browser field but no main field"
+    peer_dependencies = package_data.get("peerDependencies") or {}
+    frameworks = [name for name in FRAMEWORK_PACKAGES if name in peer_dependencies]
+    if frameworks:
+        return "rejected", f"package.json has peer dependencies on {", ".join(frameworks)}"
+    if main and DOM_GLOBAL_PATTERN.search(main) and not DOM_GUARD_PATTERN.search(main):
+        return "rejected", "main file uses DOM globals without a guard"
+    if main and EXPORTS_PATTERN.search(main):
+        engines = package_data.get("engines") or {}
+        if "node" in engines:
+            return "accepted", "package.json specifies a Node engine and the main file uses CommonJS exports"
+        if NODE_REQUIRE_PATTERN.search(main):
+            return "accepted", "main file requires Node built-in modules and uses CommonJS exports"
+    return "undecided", "no obvious metadata signal"
+
+def compute_prefilter_agreement(verdicts: list[tuple[str, Optional[str]]]) -> dict:
+    # Compares (prefilter verdict, LLM verdict) pairs for packages that received both verdicts
+    agreement: dict = dict(
+        compared = 0,
+        undecided = 0,
+        agree = 0,
+        disagree = 0,
+        rejected_by_both = 0,
+        accepted_by_both = 0,
+        rejected_only_by_prefilter = 0,
+        accepted_only_by_prefilter = 0
+    )
+    for prefilter_verdict, llm_verdict in verdicts:
+        if llm_verdict is None:
+            continue
+        if prefilter_verdict == "undecided":
+            agreement["undecided"] += 1
+            continue
+        agreement["compared"] += 1
+        if prefilter_verdict == llm_verdict:
+            agreement["agree"] += 1
+            agreement[f"{prefilter_verdict}_by_both"] += 1
+        else:
+            agreement["disagree"] += 1
+            agreement[f"{prefilter_verdict}_only_by_prefilter"] += 1
+    agreement["agreement_rate"] = agreement["agree"] / agreement["compared"] if agreement["compared"] > 0 else None
+    return agreement
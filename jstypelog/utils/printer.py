@@ -1,11 +1,27 @@
-from io import TextIOWrapper
-from typing import Any, Self
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+import threading
+from typing import Any, Optional, Self
+
+from jstypelog.utils.logger import DEBUG, INFO, FileSink, LogRecord, WithSink, format_text, logger
+from jstypelog.utils.tracing import WithSpan, normalize_span_name, tracer
+
+@dataclass
+class PrinterState:
+    level: int = 0
+    new_line: bool = True
+    verbose: bool = True
+    buffer: Optional[list[str]] = None
+    # Sections (messages ending with a colon that are followed by an indentation) are traced as spans
+    section: Optional[str] = None
+    spans: list[Optional[WithSpan]] = field(default_factory=list)
 
 class WithVerbose:
     def __init__(self, printer: "Printer", verbose: bool):
         self._printer = printer
         self._verbose = verbose
-    
+
     def __enter__(self) -> Self:
         self._old_verbose = self._printer.get_verbose()
         self._printer.set_verbose(self._verbose)
@@ -14,80 +30,125 @@ class WithVerbose:
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
         self._printer.set_verbose(self._old_verbose)
 
-class WithFile:
-    def __init__(self, printer: "Printer", file: TextIOWrapper):
+class WithState:
+    def __init__(self, printer: "Printer", state: PrinterState):
         self._printer = printer
-        self._file = file
-    
+        self._state = state
+
     def __enter__(self) -> Self:
-        self._printer.add_file(self._file)
+        self._token = self._printer._state.set(self._state)
         return self
 
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
-        self._printer.remove_file(self._file)
+        self._printer._state.reset(self._token)
+
+class WithBuffer(WithState):
+    # Collects the output of e.g. a worker thread, such that it can be printed in one piece afterwards
+    def __init__(self, printer: "Printer"):
+        super().__init__(printer, PrinterState(verbose=printer.get_verbose(), buffer=[]))
+
+    def get_text(self) -> str:
+        assert self._state.buffer is not None
+        return "".join(self._state.buffer)
 
 class Printer:
+    # Adapter that renders the indented text output, every printed line is also a record of the structured logger
     def __init__(self):
-        self._level = 0
-        self._new_line = True
+        # The indentation state is context local, such that threads and tasks do not interfere with each other
+        self._state: ContextVar[PrinterState] = ContextVar("printer_state")
+        self._lock = threading.Lock()
         self.set_padding()
         self.set_verbose()
-        self.set_files([])
-    
+
+    def get_state(self) -> PrinterState:
+        try:
+            return self._state.get()
+        except LookupError:
+            state = PrinterState()
+            self._state.set(state)
+            return state
+
     def set_verbose(self, verbose: bool = True) -> None:
-        self._verbose = verbose
+        self.get_state().verbose = verbose
 
     def get_verbose(self) -> bool:
-        return self._verbose
+        return self.get_state().verbose
 
     def set_padding(self, padding: str = "  ") -> Self:
         self._padding = padding
         return self
-    
+
     def get_padding(self) -> str:
         return self._padding
 
-    def set_files(self, file: list[TextIOWrapper]) -> None:
-        self._files = file
-
-    def get_file(self) -> list[TextIOWrapper]:
-        return self._files
-
-    def add_file(self, file: TextIOWrapper) -> None:
-        if file not in self._files:
-            self._files.append(file)
-    
-    def remove_file(self, file: TextIOWrapper) -> None:
-        self._files.remove(file)
+    def set_section(self, name: str) -> None:
+        # Names the span of the next indentation, e.g. after a message that would not be a good span name
+        self.get_state().section = name
 
     def __enter__(self) -> Self:
-        self._level += 1
+        state = self.get_state()
+        state.level += 1
+        span = None
+        if state.section is not None and tracer.is_enabled():
+            span = tracer.span(normalize_span_name(state.section)).__enter__()
+        state.spans.append(span)
+        state.section = None
         return self
 
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
-        self._level -= 1
+        state = self.get_state()
+        state.level -= 1
+        span = state.spans.pop()
+        if span is not None:
+            span.__exit__(exc_type, exc_val, exc_tb)
 
     def with_verbose(self, verbose: bool) -> "WithVerbose":
         return WithVerbose(self, verbose)
-    
-    def with_file(self, file: TextIOWrapper) -> "WithFile":
-        return WithFile(self, file)
+
+    def with_file(self, file_path: Path) -> WithSink:
+        # The file only receives the output of the current context (e.g. one package), it is written in the background
+        return logger.with_sink(FileSink(file_path, format_text, level=INFO))
+
+    def with_state(self, state: Optional[PrinterState] = None) -> "WithState":
+        # Continue printing with a copy of the current state, e.g. in a reader thread
+        return WithState(self, replace(self.get_state(), spans=[]) if state is None else state)
+
+    def with_buffer(self) -> "WithBuffer":
+        return WithBuffer(self)
 
     def __call__(self, text: str = "", end: str = "\n", flush: bool = True) -> Self:
-        if not self._verbose:
+        return self._print(text, end, flush, text.rstrip("\n"))
+
+    def replay(self, text: str, flush: bool = True) -> Self:
+        # Prints the text of a buffer, its messages were already logged when they were buffered
+        return self._print(text, "", flush, None)
+
+    def _print(self, text: str, end: str, flush: bool, message: Optional[str]) -> Self:
+        state = self.get_state()
+        state.section = text if text.endswith(":") else None
+        if not state.verbose:
+            # Output that is not printed is still available to structured sinks on debug level
+            if message is not None and logger.is_enabled(DEBUG):
+                logger.emit(LogRecord(DEBUG, message, logger.get_context()))
             return self
         text += end
-        if self._new_line:
-            self._new_line = False
-            text = self._padding * self._level + text
+        if state.new_line:
+            state.new_line = False
+            text = self._padding * state.level + text
         if text.endswith("\n"):
-            self._new_line = True
-            text = text[:-1].replace("\n", "\n" + self._padding * self._level) + "\n"
+            state.new_line = True
+            text = text[:-1].replace("\n", "\n" + self._padding * state.level) + "\n"
         else:
-            text = text.replace("\n", "\n" + self._padding * self._level)
-        print(text, end="", flush=flush)
-        for file in self._files:
-            print(text, end="", flush=flush, file=file)
+            text = text.replace("\n", "\n" + self._padding * state.level)
+        if state.buffer is not None:
+            state.buffer.append(text)
+            if message is not None and logger.is_enabled(INFO):
+                logger.emit(LogRecord(INFO, message, logger.get_context()))
+            return self
+        with self._lock:
+            print(text, end="", flush=flush)
+            if logger.is_enabled(INFO):
+                logger.emit(LogRecord(INFO, message, logger.get_context(), text=text))
         return self
 
 printer = Printer()
\ No newline at end of file
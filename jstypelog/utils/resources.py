@@ -0,0 +1,181 @@
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, fields
+import os
+from pathlib import Path
+import re
+import subprocess
+import sys
+import threading
+from typing import Any, Optional, Self
+import uuid
+
+from jstypelog.utils.logger import logger
+
+CONTAINER_NAME_VARIABLE = "JSTYPELOG_CONTAINER_NAME"
+CONTAINER_SAMPLE_INTERVAL = 1.0
+CGROUP_PATH = Path("/sys/fs/cgroup")
+BLOCK_SIZE = 512
+SIZE_UNITS = {"b": 1, "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3, "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3}
+
+@dataclass
+class ResourceUsage:
+    # Times in seconds and sizes in bytes, None if unknown (e.g. CPU time of processes that are not waited for with wait4)
+    wall_time: float
+    user_time: Optional[float] = None
+    system_time: Optional[float] = None
+    max_rss: Optional[int] = None
+    read_bytes: Optional[int] = None
+    written_bytes: Optional[int] = None
+    container_cpu_time: Optional[float] = None
+    container_max_memory: Optional[int] = None
+    container_read_bytes: Optional[int] = None
+    container_written_bytes: Optional[int] = None
+
+def get_resource_usage(wall_time: float, rusage: Any) -> ResourceUsage:
+    # The rusage of wait4 includes all descendants that were waited for, but not Docker containers (they are children of the daemon)
+    return ResourceUsage(
+        wall_time=wall_time,
+        user_time=rusage.ru_utime,
+        system_time=rusage.ru_stime,
+        max_rss=rusage.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+        read_bytes=rusage.ru_inblock * BLOCK_SIZE,
+        written_bytes=rusage.ru_oublock * BLOCK_SIZE
+    )
+
+def get_container_name() -> str:
+    return f"jstypelog_{uuid.uuid4().hex[:20]}"
+
+def parse_size(text: str) -> Optional[int]:
+    match = re.fullmatch(r"\s*([\d.]+)\s*([a-zA-Z]*)\s*", text)
+    if match is None or match.group(2).lower() not in SIZE_UNITS:
+        return None
+    return round(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+class ContainerMonitor:
+    # Samples the cgroup (or if not accessible docker stats) of a container that is started by a script with the given name
+    def __init__(self, name: str):
+        self._name = name
+        self._stop = threading.Event()
+        self._cgroup_path: Optional[Path] = None
+        self.cpu_time: Optional[float] = None
+        self.max_memory: Optional[int] = None
+        self.read_bytes: Optional[int] = None
+        self.written_bytes: Optional[int] = None
+
+    def __enter__(self) -> Self:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        # The first sample is taken immediately, such that short containers are measured as well
+        container_id = None
+        while True:
+            try:
+                if container_id is None:
+                    container_id = self._get_container_id()
+                    if container_id is not None:
+                        self._cgroup_path = self._get_cgroup_path(container_id)
+                if container_id is not None:
+                    if self._cgroup_path is not None and self._cgroup_path.is_dir():
+                        self._sample_cgroup(self._cgroup_path)
+                    else:
+                        self._sample_stats()
+            except (OSError, ValueError, subprocess.SubprocessError):
+                pass
+            if self._stop.wait(CONTAINER_SAMPLE_INTERVAL):
+                break
+
+    def _get_container_id(self) -> Optional[str]:
+        result = subprocess.run(["docker", "inspect", "--format", "{{.Id}}", self._name], capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None if result.returncode == 0 else None
+
+    def _get_cgroup_path(self, container_id: str) -> Optional[Path]:
+        for path in [CGROUP_PATH / "system.slice" / f"docker-{container_id}.scope", CGROUP_PATH / "docker" / container_id]:
+            if path.is_dir():
+                return path
+        return None
+
+    def _sample_cgroup(self, path: Path) -> None:
+        cpu_stat = dict(line.split() for line in (path / "cpu.stat").read_text().splitlines())
+        self.cpu_time = int(cpu_stat["usage_usec"]) / 1e6
+        memory_path = path / "memory.peak" if (path / "memory.peak").is_file() else path / "memory.current"
+        self.max_memory = max(self.max_memory or 0, int(memory_path.read_text()))
+        io_stat = (path / "io.stat").read_text() if (path / "io.stat").is_file() else ""
+        self.read_bytes = sum(map(int, re.findall(r"\brbytes=(\d+)", io_stat)))
+        self.written_bytes = sum(map(int, re.findall(r"\bwbytes=(\d+)", io_stat)))
+
+    def _sample_stats(self) -> None:
+        result = subprocess.run(
+            ["docker", "stats", "--no-stream", "--format", "{{.MemUsage}}|{{.BlockIO}}", self._name],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        if result.returncode or "|" not in result.stdout:
+            return None
+        memory, block_io = result.stdout.strip().split("|", 1)
+        memory_usage = parse_size(memory.split("/")[0])
+        if memory_usage is not None:
+            self.max_memory = max(self.max_memory or 0, memory_usage)
+        read_bytes, _, written_bytes = block_io.partition("/")
+        self.read_bytes = parse_size(read_bytes) or self.read_bytes
+        self.written_bytes = parse_size(written_bytes) or self.written_bytes
+
+    def update(self, usage: ResourceUsage) -> None:
+        usage.container_cpu_time = self.cpu_time
+        usage.container_max_memory = self.max_memory
+        usage.container_read_bytes = self.read_bytes
+        usage.container_written_bytes = self.written_bytes
+
+class WithRecording:
+    def __init__(self, recorder: "ResourceRecorder"):
+        self._recorder = recorder
+        self._records: list[dict[str, Any]] = []
+
+    def __enter__(self) -> list[dict[str, Any]]:
+        self._token = self._recorder._records.set(self._recorder._records.get() + (self._records,))
+        return self._records
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self._recorder._records.reset(self._token)
+
+class ResourceRecorder:
+    def __init__(self):
+        # Active recordings are context local like the logger sinks, records are added to all of them
+        self._records: ContextVar[tuple[list[dict[str, Any]], ...]] = ContextVar("resource_records", default=())
+        self._lock = threading.Lock()
+
+    def with_recording(self) -> WithRecording:
+        return WithRecording(self)
+
+    def record(self, name: str, usage: ResourceUsage) -> None:
+        records = self._records.get()
+        if not records:
+            return None
+        record = dict(name=name, stage=logger.get_context().get("stage"), **asdict(usage))
+        with self._lock:
+            for record_list in records:
+                record_list.append(record)
+
+def summarize_resources(records: list[dict[str, Any]], key: str) -> dict[str, dict[str, Any]]:
+    # Sums times and byte counts and takes the maximum of memory peaks, grouped by e.g. stage or command name
+    summary: dict[str, dict[str, Any]] = {}
+    for record in records:
+        group = summary.setdefault(str(record[key]), dict(count=0))
+        group["count"] += 1
+        for usage_field in fields(ResourceUsage):
+            value = record[usage_field.name]
+            if value is None:
+                continue
+            if usage_field.name in ("max_rss", "container_max_memory"):
+                group[usage_field.name] = max(group.get(usage_field.name, 0), value)
+            else:
+                group[usage_field.name] = round(group.get(usage_field.name, 0) + value, 3)
+    return summary
+
+resource_recorder = ResourceRecorder()
@@ -0,0 +1,119 @@
+from collections import deque
+from dataclasses import dataclass, field
+import heapq
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+# Vendored, generated and VCS directories never contain the tests of the package itself
+SCAN_IGNORED_DIRS = {"node_modules", ".git", ".hg", ".svn", "dist", "build", "coverage", ".nyc_output", "vendor", "bower_components"}
+SCAN_TEST_DIRS = ["test", "tests", "__tests__"]
+SCAN_TEST_SUFFIXES = [".test.js", ".spec.js"]
+SCAN_MAX_ENTRIES = 50000
+SCAN_MAX_TEST_SIZE = 256 * 1024
+SCAN_MAX_FILE_SIZE = 1024 * 1024
+MAIN_NAMES = ["index.js", "index.json", "index.node"]
+
+def read_text_capped(path: Path, limit: int) -> Optional[str]:
+    # None if the file is not UTF-8, a character that is cut by the limit is dropped
+    try:
+        with open(path, "rb") as file:
+            data = file.read(limit + 1)
+    except OSError:
+        return None
+    truncated = len(data) > limit
+    data = data[:limit]
+    for cut in range(4 if truncated else 1):
+        try:
+            return data[:len(data) - cut].decode()
+        except UnicodeDecodeError:
+            pass
+    return None
+
+@dataclass(order=True)
+class TestCandidate:
+    # Shallow files are preferred, then files in the test directories of the repository root, then the path
+    depth: int
+    category: int
+    relative_path: str
+    path: Path = field(compare=False)
+
+@dataclass
+class RepositoryScan:
+    readme: Optional[str] = None
+    package_json: Optional[str] = None
+    main: Optional[str] = None
+    tests: list[tuple[Path, str]] = field(default_factory=list)
+    num_entries: int = 0
+    complete: bool = True
+
+def _get_test_category(relative_parts: tuple[str, ...]) -> Optional[int]:
+    if relative_parts[0] in SCAN_TEST_DIRS and relative_parts[-1].endswith(".js"):
+        return 0
+    if any(relative_parts[-1].endswith(suffix) for suffix in SCAN_TEST_SUFFIXES):
+        return 1
+    return None
+
+def _find_tests(repository_path: Path, max_tests: int, max_entries: int) -> tuple[list[TestCandidate], int, bool]:
+    # Breadth-first walk, such that the walk can stop at the first level below enough ranked candidates
+    best: list[TestCandidate] = []
+    queue: deque[tuple[Path, tuple[str, ...]]] = deque([(repository_path, ())])
+    num_entries = 0
+    while queue:
+        dir_path, dir_parts = queue.popleft()
+        if len(best) >= max_tests and len(dir_parts) + 1 > best[-1].depth:
+            return best, num_entries, True
+        try:
+            with os.scandir(dir_path) as entries:
+                sorted_entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        for entry in sorted_entries:
+            num_entries += 1
+            if num_entries > max_entries:
+                return best, num_entries, False
+            parts = dir_parts + (entry.name,)
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SCAN_IGNORED_DIRS:
+                    queue.append((Path(entry.path), parts))
+                continue
+            if not entry.is_file(follow_symlinks=False) or entry.name.endswith(".min.js"):
+                continue
+            category = _get_test_category(parts)
+            if category is None or entry.stat(follow_symlinks=False).st_size > SCAN_MAX_TEST_SIZE:
+                continue
+            candidate = TestCandidate(len(parts), category, "/".join(parts), Path(entry.path))
+            if len(best) < max_tests or candidate < best[-1]:
+                best = heapq.nsmallest(max_tests, best + [candidate])
+    return best, num_entries, True
+
+def scan_repository(repository_path: Path, max_tests: int, max_entries: int = SCAN_MAX_ENTRIES) -> RepositoryScan:
+    # README, package.json and main are read from known locations, tests are ranked in one walk and only the best ones are read
+    scan = RepositoryScan()
+    if not repository_path.is_dir():
+        return scan
+    for name in sorted(os.listdir(repository_path)):
+        if "readme" in name.lower() and (repository_path / name).is_file():
+            scan.readme = read_text_capped(repository_path / name, SCAN_MAX_FILE_SIZE)
+            if scan.readme is not None:
+                break
+    if (repository_path / "package.json").is_file():
+        scan.package_json = read_text_capped(repository_path / "package.json", SCAN_MAX_FILE_SIZE)
+        # The main file of package.json, otherwise common main file names
+        main_paths = [repository_path / name for name in MAIN_NAMES]
+        try:
+            main_paths.insert(0, repository_path / json.loads(scan.package_json or "")["main"])
+        except (json.JSONDecodeError, KeyError, TypeError):
+            pass
+        for main_path in main_paths:
+            if main_path.is_file():
+                scan.main = read_text_capped(main_path, SCAN_MAX_FILE_SIZE)
+                if scan.main is not None:
+                    break
+    candidates, scan.num_entries, scan.complete = _find_tests(repository_path, max_tests, max_entries) if max_tests > 0 else ([], 0, True)
+    for candidate in candidates:
+        content = read_text_capped(candidate.path, SCAN_MAX_TEST_SIZE)
+        if content:
+            scan.tests.append((Path(candidate.relative_path), content))
+    return scan
@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+import json
+import os
+from pathlib import Path
+import statistics
+import threading
+from typing import Optional
+
+from jstypelog.utils.helpers import create_dir, escape_package_name
+from jstypelog.utils.shared import DEFINITELY_TYPED_PATH, TEMPLATE_PATH
+from jstypelog.utils.store import get_lock_entries
+from jstypelog.utils.timeouts import get_package_size
+
+# Prior of the cost model (in seconds), it is rescaled with the recorded durations of earlier runs
+COST_BASE = 60.0
+COST_PER_DEPENDENCY = 0.5
+COST_PER_PACKAGE_MIB = 20.0
+COST_PER_DECLARATION_KIB = 2.0
+COST_MIN_SAMPLES = 5
+
+@dataclass
+class PackageFeatures:
+    # Cheap features that are known before the generation, the template project only exists after the triage
+    num_dependencies: int = 0
+    package_size: int = 0
+    declaration_size: int = 0
+    past_duration: Optional[float] = None
+
+def get_package_features(package_name: str, generation_path: Path, build_path: Path, durations: dict[str, float]) -> PackageFeatures:
+    features = PackageFeatures(past_duration=durations.get(package_name))
+    template_path = generation_path / TEMPLATE_PATH
+    try:
+        features.num_dependencies = len(get_lock_entries(json.loads((template_path / "package-lock.json").read_text())))
+    except (OSError, ValueError):
+        pass
+    # The installed code of the package itself, its repository is not cloned yet
+    features.package_size = get_package_size(template_path / "node_modules" / package_name)
+    # The size of the ground truth declarations approximates the size of the API that examples have to cover
+    features.declaration_size = get_package_size(build_path / DEFINITELY_TYPED_PATH / "types" / escape_package_name(package_name))
+    return features
+
+def predict_cost(features: PackageFeatures) -> float:
+    return (
+        COST_BASE
+        + COST_PER_DEPENDENCY * features.num_dependencies
+        + COST_PER_PACKAGE_MIB * features.package_size / 1024 ** 2
+        + COST_PER_DECLARATION_KIB * features.declaration_size / 1024
+    )
+
+def estimate_costs(features: dict[str, PackageFeatures]) -> dict[str, float]:
+    # Recorded durations are used as they are, the prior is rescaled to the machine with the median ratio of recorded to predicted costs
+    ratios = [package.past_duration / predict_cost(package) for package in features.values() if package.past_duration is not None]
+    scale = statistics.median(ratios) if len(ratios) >= COST_MIN_SAMPLES else 1.0
+    return {
+        package_name: package.past_duration if package.past_duration is not None else scale * predict_cost(package)
+        for package_name, package in features.items()
+    }
+
+def schedule_longest_first(package_names: list[str], costs: dict[str, float]) -> list[str]:
+    # Longest processing time first, ties keep the given (seeded) order
+    order = {package_name: index for index, package_name in enumerate(package_names)}
+    return sorted(package_names, key=lambda package_name: (-costs.get(package_name, 0.0), order[package_name]))
+
+class DurationStore:
+    # Wall time of the latest generation of every package, shared by all evaluations of a build
+    def __init__(self, file_path: Path):
+        self._file_path = file_path
+        self._lock = threading.Lock()
+        self._added: dict[str, float] = {}
+
+    def _load(self) -> dict[str, float]:
+        try:
+            return json.loads(self._file_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def load(self) -> dict[str, float]:
+        with self._lock:
+            return {**self._load(), **self._added}
+
+    def add(self, package_name: str, duration: float) -> None:
+        with self._lock:
+            self._added[package_name] = round(duration, 3)
+
+    def save(self) -> None:
+        # Merges with the durations that other processes (e.g. other shards) saved in the meantime
+        with self._lock:
+            if not self._added:
+                return None
+            durations = {**self._load(), **self._added}
+            create_dir(self._file_path.parent)
+            temporary_path = self._file_path.with_name(f"{self._file_path.name}.{os.getpid()}.{threading.get_ident()}")
+            temporary_path.write_text(json.dumps(durations, indent=2))
+            os.replace(temporary_path, self._file_path)
+            self._added.clear()
@@ -2,14 +2,23 @@ from pathlib import Path
 
 INSTALLATION_TIMEOUT = 600
 EXECUTION_TIMEOUT = 60
+MAX_NUM_CONCURRENT_EXECUTIONS = 4
+MAX_NUM_CONCURRENT_DECLARATIONS = 4
 
 ASSETS_PATH = Path(__file__).parent.parent.parent / "assets"
 DECLARATION_SCRIPTS_PATH = ASSETS_PATH / "declaration"
 COMPARISON_SCRIPTS_PATH = ASSETS_PATH / "comparison"
+EXAMPLIFICATION_SCRIPTS_PATH = ASSETS_PATH / "examplification"
 EVALUATION_PATH = Path("evaluation")
 PACKAGES_PATH = Path("packages")
 DATA_PATH = Path("data")
 DATA_JSON_PATH = DATA_PATH / "data.json"
+ARTIFACTS_JSON_PATH = DATA_PATH / "artifacts.json"
+TIMEOUTS_JSON_PATH = Path("timeouts.json")
+DURATIONS_JSON_PATH = Path("durations.json")
+PACKAGE_STORE_PATH = Path("package-store")
+IMAGES_PATH = Path("images")
+IMAGE_CACHE_VARIABLE = "JSTYPELOG_IMAGE_CACHE"
 LOGS_PATH = Path("logs")
 EXAMPLES_PATH = Path("examples")
 DECLARATIONS_PATH = Path("declarations")
@@ -17,6 +26,7 @@ COMPARISONS_PATH = Path("comparisons")
 CACHE_PATH = Path("cache")
 TEMPLATE_PATH = CACHE_PATH / "template"
 PLAYGROUND_PATH = CACHE_PATH / "playground"
+DEDUPLICATION_PATH = CACHE_PATH / "deduplication.jsonl"
 EXTRACTION_PATH = Path("extraction")
 GENERATION_PATH = Path("generation")
 COMBINED_EXTRACTION_PATH = Path(f"combined_extraction")
@@ -27,6 +37,8 @@ COMBINED_MODE_PATHS = [COMBINED_EXTRACTION_PATH, COMBINED_GENERATION_PATH, COMBI
 ALL_MODE_PATHS = BASIC_MODE_PATHS + COMBINED_MODE_PATHS
 RUN_TIME_ANALYZER_PATH = Path("run-time-information-analyzer")
 DECLARATION_GENERATOR_PATH = Path("ts-declaration-file-generator")
+RUN_TIME_ANALYZER_IMAGE = "master-mind-wp3"
+DECLARATION_GENERATOR_IMAGE = "tsd-generator"
 DEFINITELY_TYPED_PATH = Path("DefinitelyTyped")
 NPM_TOOLS_PATH = Path("npm-tools")
 TRANSPILE_PATH = NPM_TOOLS_PATH / "transpile.js"
@@ -49,4 +61,7 @@ class ES5UnsupportedError(Exception):
     pass
 
 class LLMRejectedError(Exception):
+    pass
+
+class PrefilterRejectedError(Exception):
     pass
\ No newline at end of file
@@ -1,13 +1,31 @@
-
+import codecs
+import contextvars
+from contextvars import ContextVar
+from collections import deque
+from contextlib import nullcontext
 from dataclasses import dataclass
+import io
 import os
 from pathlib import Path
 import signal
 import subprocess
+import tempfile
 import threading
-from typing import Optional
+import time
+from typing import Any, Callable, Optional, Self
+import weakref
 
 from jstypelog.utils.printer import printer
+from jstypelog.utils.resources import CONTAINER_NAME_VARIABLE, ContainerMonitor, ResourceUsage, get_resource_usage, resource_recorder
+from jstypelog.utils.tracing import get_command_name
+
+TIMEOUT_EXIT_CODE = 124 # like GNU timeout
+TIMEOUT_KILLED_EXIT_CODE = 137 # like GNU timeout with --kill-after
+CONTAINER_REMOVE_TIMEOUT = 30
+SHELL_CAPTURE_HEAD = 64 * 1024
+SHELL_CAPTURE_TAIL = 256 * 1024
+SHELL_CAPTURE_SPILL = 1024 * 1024
+SHELL_READ_SIZE = 64 * 1024
 
 class ShellError(Exception):
     pass
@@ -15,11 +33,161 @@ class ShellError(Exception):
 class ShellTimeoutError(ShellError):
     pass
 
+def join_truncated(head: str, tail: str, omitted: int) -> str:
+    if omitted <= 0:
+        return head + tail
+    return f"{head}\n[... {omitted} characters omitted ...]\n{tail}"
+
+def truncate_text(text: str, limit: int) -> str:
+    # Keeps the start and the (more often relevant) end of long text, e.g. for error messages
+    if len(text) <= limit:
+        return text
+    head_length = limit // 4
+    tail_length = limit - head_length
+    return join_truncated(text[:head_length], text[-tail_length:], len(text) - limit)
+
 @dataclass
 class ShellOutput:
+    # If the output was too long, value only holds its head and tail and the whole output is spilled to a temporary file
     value: str
     code: int
     timeout: bool
+    length: Optional[int] = None
+    spill_path: Optional[Path] = None
+    resources: Optional[ResourceUsage] = None
+
+    def __post_init__(self) -> None:
+        if self.length is None:
+            self.length = len(self.value)
+        if self.spill_path is not None:
+            weakref.finalize(self, self.spill_path.unlink, missing_ok=True)
+
+    @property
+    def truncated(self) -> bool:
+        return self.length != len(self.value)
+
+    def read(self) -> str:
+        # The whole output, only available if it was spilled (otherwise the value is returned)
+        if self.spill_path is not None and self.spill_path.is_file():
+            return self.spill_path.read_text()
+        return self.value
+
+    def get_view(self, limit: int) -> str:
+        return truncate_text(self.value, limit)
+
+class OutputBuffer:
+    # Keeps the output in memory until it exceeds the spill limit, afterwards only its head and tail are kept in memory
+    def __init__(self, head_limit: int = SHELL_CAPTURE_HEAD, tail_limit: int = SHELL_CAPTURE_TAIL, spill_limit: int = SHELL_CAPTURE_SPILL):
+        self._head_limit = head_limit
+        self._tail_limit = tail_limit
+        self._spill_limit = spill_limit
+        self._chunks: list[str] = []
+        self._length = 0
+        self._head = ""
+        self._tail: deque[str] = deque()
+        self._tail_length = 0
+        self._spill_file: Optional[tempfile._TemporaryFileWrapper] = None
+
+    def append(self, text: str) -> None:
+        self._length += len(text)
+        if self._spill_file is None:
+            self._chunks.append(text)
+            if self._length > self._spill_limit:
+                self._spill()
+            return
+        self._spill_file.write(text)
+        self._append_tail(text)
+
+    def _spill(self) -> None:
+        text = "".join(self._chunks)
+        self._chunks = []
+        self._spill_file = tempfile.NamedTemporaryFile("w", prefix="jstypelog_shell_", suffix=".txt", delete=False)
+        self._spill_file.write(text)
+        self._head = text[:self._head_limit]
+        self._append_tail(text[self._head_limit:])
+
+    def _append_tail(self, text: str) -> None:
+        self._tail.append(text)
+        self._tail_length += len(text)
+        while self._tail_length - len(self._tail[0]) >= self._tail_limit:
+            self._tail_length -= len(self._tail.popleft())
+
+    def get_output(self, code: int, timeout: bool) -> ShellOutput:
+        if self._spill_file is None:
+            return ShellOutput("".join(self._chunks), code, timeout)
+        self._spill_file.close()
+        tail = "".join(self._tail)[-self._tail_limit:]
+        value = join_truncated(self._head, tail, self._length - len(self._head) - len(tail))
+        return ShellOutput(value, code, timeout, length=self._length, spill_path=Path(self._spill_file.name))
+
+def _print_command(command: str, timeout: Optional[float], cwd: Optional[str | Path], env: Optional[dict[str, str]]) -> None:
+    message = f"Shell"
+    if timeout is not None:
+        message += f" (timeout: {timeout}s)"
+    if cwd is not None:
+        message += f" (cwd: {cwd})"
+    if env is not None:
+        message += f" (env: {env})"
+    printer(message + ":")
+    printer.set_section(f"shell: {get_command_name(command)}")
+
+def _kill_group(pid: int, sig: signal.Signals) -> None:
+    try:
+        os.killpg(pid, sig)
+    except ProcessLookupError:
+        pass
+
+def _check_output(output: ShellOutput, check: bool, timeout: Optional[float]) -> ShellOutput:
+    if check and output.timeout:
+        raise ShellTimeoutError(f"Timeout after {timeout}s")
+    if check and output.code != 0:
+        raise ShellError(f"Non-Zero exit: {output.code}")
+    return output
+
+# Replaces running commands, e.g. with deterministic fakes for benchmarks: (command, cwd, env, timeout) -> output
+ShellBackend = Callable[[str, Optional[str | Path], Optional[dict[str, str]], Optional[float]], ShellOutput]
+
+class WithShellBackend:
+    def __init__(self, backend: ShellBackend):
+        self._backend = backend
+
+    def __enter__(self) -> Self:
+        self._token = _shell_backend.set(self._backend)
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        _shell_backend.reset(self._token)
+
+_shell_backend: ContextVar[Optional[ShellBackend]] = ContextVar("shell_backend", default=None)
+
+def with_shell_backend(backend: ShellBackend) -> WithShellBackend:
+    return WithShellBackend(backend)
+
+def _remove_container(container_name: str) -> None:
+    # Killing the script does not stop its container, which would also block the next container with the same name
+    try:
+        subprocess.run(["docker", "rm", "-f", container_name], capture_output=True, timeout=CONTAINER_REMOVE_TIMEOUT)
+    except (OSError, subprocess.SubprocessError):
+        pass
+
+def _get_env(env: Optional[dict[str, str]], container_name: Optional[str]) -> Optional[dict[str, str]]:
+    # Scripts that start Docker containers name them after this variable, such that they can be monitored
+    if container_name is None:
+        return env
+    return {**(os.environ if env is None else env), CONTAINER_NAME_VARIABLE: container_name}
+
+def _record_resources(command: str, output: ShellOutput, monitor: Optional[ContainerMonitor]) -> None:
+    assert output.resources is not None
+    if monitor is not None:
+        monitor.update(output.resources)
+    resource_recorder.record(get_command_name(command), output.resources)
+
+def _finish_backend(command: str, output: ShellOutput, start_time: float, check: bool, timeout: Optional[float]) -> ShellOutput:
+    if output.value:
+        printer(output.value, end="" if output.value.endswith("\n") else "\n")
+    output.resources = ResourceUsage(wall_time=time.perf_counter() - start_time)
+    _record_resources(command, output, None)
+    return _check_output(output, check, timeout)
 
 def shell(
     command: str,
@@ -27,19 +195,20 @@ def shell(
     timeout: Optional[float] = None,
     check: bool = True,
     cwd: Optional[str | Path] = None,
-    env: Optional[dict[str, str]] = None
+    env: Optional[dict[str, str]] = None,
+    container_name: Optional[str] = None
 ) -> ShellOutput:
     with printer.with_verbose(verbose):
-        message = f"Shell"
-        if timeout is not None:
-            message += f" (timeout: {timeout}s)"
-        if cwd is not None:
-            message += f" (cwd: {cwd})"
-        if env is not None:
-            message += f" (env: {env})"
-        printer(message + ":")
-        with printer:
+        _print_command(command, timeout, cwd, env)
+        backend = _shell_backend.get()
+        if backend is not None:
+            with printer:
+                printer(command)
+                start_time = time.perf_counter()
+                return _finish_backend(command, backend(command, cwd, env, timeout), start_time, check, timeout)
+        with printer, (ContainerMonitor(container_name) if container_name is not None else nullcontext()) as monitor:
             printer(command)
+            start_time = time.perf_counter()
             proc = subprocess.Popen(
                 command,
                 stdin=subprocess.PIPE,
@@ -49,41 +218,113 @@ def shell(
                 bufsize=1, # line-buffered text mode
                 universal_newlines=True,
                 cwd=cwd,
-                env=env,
+                env=_get_env(env, container_name),
                 shell=True,
                 start_new_session=True,
             )
-            captured: list[str] = []
+            captured = OutputBuffer()
+            state = printer.get_state()
             def _reader():
                 assert proc.stdout is not None
-                for line in proc.stdout:
-                    printer(line, end="")
-                    captured.append(line)
-            t = threading.Thread(target=_reader, daemon=True)
+                with printer.with_state(state):
+                    for line in proc.stdout:
+                        printer(line, end="")
+                        captured.append(line)
+            # The reader continues in the context of the caller, e.g. to write to its log files
+            t = threading.Thread(target=contextvars.copy_context().run, args=(_reader,), daemon=True)
             t.start()
+            # The process is reaped with wait4 (instead of proc.wait) to get its resource usage
+            waited: list = []
+            def _waiter():
+                _, status, rusage = os.wait4(proc.pid, 0)
+                waited.extend([os.waitstatus_to_exitcode(status), rusage])
+            w = threading.Thread(target=_waiter, daemon=True)
+            w.start()
+            w.join(timeout)
             timeout_error = False
-            try:
-                rc = proc.wait(timeout=timeout)
-            except subprocess.TimeoutExpired:
+            if w.is_alive():
                 timeout_error = True
-                try:
-                    os.killpg(proc.pid, signal.SIGTERM)
-                except ProcessLookupError:
-                    pass
-                try:
-                    proc.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    try:
-                        os.killpg(proc.pid, signal.SIGKILL)
-                    except ProcessLookupError:
-                        pass
-                    proc.wait()
-                rc = 124 # like GNU timeout
+                _kill_group(proc.pid, signal.SIGTERM)
+                w.join(5)
+                if w.is_alive():
+                    _kill_group(proc.pid, signal.SIGKILL)
+                    w.join()
+                if container_name is not None:
+                    _remove_container(container_name)
+            rc, rusage = waited
+            proc.returncode = rc
+            if timeout_error:
+                rc = TIMEOUT_EXIT_CODE
             # Ensure we've drained stdout and the thread exited
             t.join()
-            output = ShellOutput("".join(captured), rc, timeout_error)
-            if check and output.timeout:
-                raise ShellTimeoutError(f"Timeout after {timeout}s")
-            if check and output.code != 0:
-                raise ShellError(f"Non-Zero exit: {output.code}")
-            return output
\ No newline at end of file
+            output = captured.get_output(rc, timeout_error)
+            output.resources = get_resource_usage(time.perf_counter() - start_time, rusage)
+            _record_resources(command, output, monitor)
+            return _check_output(output, check, timeout)
+
+async def shell_async(
+    command: str,
+    verbose: bool = False,
+    timeout: Optional[float] = None,
+    check: bool = True,
+    cwd: Optional[str | Path] = None,
+    env: Optional[dict[str, str]] = None,
+    container_name: Optional[str] = None
+) -> ShellOutput:
+    # Same semantics as shell, but many subprocesses can be driven from one event loop without a thread per call.
+    # The event loop reaps the processes, so only the wall time (and container usage) is recorded.
+    # Tasks share the printer state object of their parent, so every call continues with its own copy
+    import asyncio
+    with printer.with_state(), printer.with_verbose(verbose):
+        _print_command(command, timeout, cwd, env)
+        backend = _shell_backend.get()
+        if backend is not None:
+            with printer:
+                printer(command)
+                start_time = time.perf_counter()
+                output = await asyncio.to_thread(backend, command, cwd, env, timeout)
+                return _finish_backend(command, output, start_time, check, timeout)
+        with printer, (ContainerMonitor(container_name) if container_name is not None else nullcontext()) as monitor:
+            printer(command)
+            start_time = time.perf_counter()
+            proc = await asyncio.create_subprocess_shell(
+                command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                cwd=cwd,
+                env=_get_env(env, container_name),
+                start_new_session=True
+            )
+            captured = OutputBuffer()
+            async def _reader():
+                assert proc.stdout is not None
+                decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True)
+                while chunk := await proc.stdout.read(SHELL_READ_SIZE):
+                    text = decoder.decode(chunk)
+                    printer(text, end="")
+                    captured.append(text)
+                text = decoder.decode(b"", final=True)
+                if text:
+                    printer(text, end="")
+                    captured.append(text)
+            reader = asyncio.create_task(_reader())
+            timeout_error = False
+            try:
+                rc = await asyncio.wait_for(proc.wait(), timeout)
+            except asyncio.TimeoutError:
+                timeout_error = True
+                _kill_group(proc.pid, signal.SIGTERM)
+                try:
+                    await asyncio.wait_for(proc.wait(), 5)
+                except asyncio.TimeoutError:
+                    _kill_group(proc.pid, signal.SIGKILL)
+                    await proc.wait()
+                if container_name is not None:
+                    await asyncio.to_thread(_remove_container, container_name)
+                rc = TIMEOUT_EXIT_CODE
+            await reader
+            output = captured.get_output(rc, timeout_error)
+            output.resources = ResourceUsage(wall_time=time.perf_counter() - start_time)
+            _record_resources(command, output, monitor)
+            return _check_output(output, check, timeout)
@@ -0,0 +1,218 @@
+from contextvars import ContextVar
+import errno
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+import stat
+import threading
+from typing import Any, Optional
+
+from jstypelog.utils.logger import logger
+
+STORE_FILES_PATH = Path("files")
+STORE_INDEX_PATH = Path("index")
+STORE_READ_SIZE = 1024 * 1024
+
+def get_lock_entries(lock: dict) -> dict[str, str]:
+    # Installed packages of a package-lock.json (v2 or v3) and a key for their content, the root project and links are skipped
+    entries = {}
+    for path, entry in lock.get("packages", {}).items():
+        if not path.startswith("node_modules/") or entry.get("link", False):
+            continue
+        identity = entry.get("integrity") or entry.get("resolved")
+        if identity is not None:
+            entries[path] = hashlib.sha256(identity.encode()).hexdigest()
+    return entries
+
+def get_file_key(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(STORE_READ_SIZE):
+            digest.update(chunk)
+    # Executable files are stored separately, because all links of a file share its mode
+    return digest.hexdigest() + ("-exec" if os.lstat(file_path).st_mode & 0o111 else "")
+
+def replace_with_link(src_path: Path, dst_path: Path) -> None:
+    temporary_path = dst_path.with_name(f".{dst_path.name}.{os.getpid()}.{threading.get_ident()}")
+    os.link(src_path, temporary_path)
+    os.replace(temporary_path, dst_path)
+
+class PackageStore:
+    # Content-addressable store of installed npm packages (like pnpm), shared by the template projects of all packages.
+    # Files are hardlinked read-only into the projects, such that identical dependency trees only take disk space once.
+    def __init__(self, store_path: Path):
+        self._files_path = store_path / STORE_FILES_PATH
+        self._index_path = store_path / STORE_INDEX_PATH
+        self._disabled = False
+
+    def _get_file_path(self, file_key: str) -> Path:
+        return self._files_path / file_key[:2] / file_key[2:]
+
+    def _read_index(self, key: str) -> Optional[dict[str, dict[str, str]]]:
+        try:
+            return json.loads((self._index_path / f"{key}.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_index(self, key: str, index: dict[str, dict[str, str]]) -> None:
+        index_path = self._index_path / f"{key}.json"
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.{threading.get_ident()}")
+        temporary_path.write_text(json.dumps(index))
+        os.replace(temporary_path, index_path)
+
+    def _add_file(self, file_path: Path) -> str:
+        file_key = get_file_key(file_path)
+        store_file_path = self._get_file_path(file_key)
+        try:
+            if store_file_path.is_file():
+                replace_with_link(store_file_path, file_path)
+            else:
+                store_file_path.parent.mkdir(parents=True, exist_ok=True)
+                os.chmod(file_path, 0o555 if file_key.endswith("-exec") else 0o444)
+                replace_with_link(file_path, store_file_path)
+        except OSError as e:
+            # Too many links of a popular file, the project keeps its own copy
+            if e.errno != errno.EMLINK:
+                raise
+        return file_key
+
+    def _link_package(self, package_path: Path, index: dict[str, dict[str, str]]) -> None:
+        for relative_path, file_key in index["files"].items():
+            file_path = package_path / relative_path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(self._get_file_path(file_key), file_path)
+            except OSError as e:
+                if e.errno != errno.EMLINK:
+                    raise
+                shutil.copy2(self._get_file_path(file_key), file_path)
+        for relative_path, target in index["symlinks"].items():
+            (package_path / relative_path).parent.mkdir(parents=True, exist_ok=True)
+            os.symlink(target, package_path / relative_path)
+
+    def _handle_error(self, e: OSError) -> None:
+        # E.g. the store and the projects are on different file systems, the packages are then installed as usual
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.ENOTSUP):
+            raise e
+        logger.warning("Disabling the package store: %s", e)
+        self._disabled = True
+
+    def link(self, project_path: Path) -> tuple[int, int]:
+        # Links the packages of the lockfile that are in the store into node_modules, npm install only has to add the others
+        lock = json.loads((project_path / "package-lock.json").read_text())
+        entries = get_lock_entries(lock)
+        if self._disabled:
+            return 0, len(entries)
+        linked = {}
+        try:
+            for path, key in entries.items():
+                index = self._read_index(key)
+                if index is None:
+                    continue
+                package_path = project_path / path
+                try:
+                    self._link_package(package_path, index)
+                except FileNotFoundError:
+                    # Collected by a garbage collection in the meantime
+                    shutil.rmtree(package_path, ignore_errors=True)
+                    continue
+                linked[path] = lock["packages"][path]
+        except OSError as e:
+            self._handle_error(e)
+            shutil.rmtree(project_path / "node_modules", ignore_errors=True)
+            return 0, len(entries)
+        # npm does not link the executables of packages it did not install itself
+        for path, entry in linked.items():
+            bins = entry.get("bin", {})
+            parent_path = path.rsplit("/node_modules/", 1)[0] + "/node_modules" if "/node_modules/" in path else "node_modules"
+            bin_path = project_path / parent_path / ".bin"
+            for name, target in (bins.items() if isinstance(bins, dict) else []):
+                link_path = bin_path / name
+                bin_path.mkdir(parents=True, exist_ok=True)
+                if not link_path.is_symlink():
+                    os.symlink(os.path.relpath(project_path / path / target, bin_path), link_path)
+        # The hidden lockfile tells npm that the linked packages are already installed, it is written last such that npm trusts it
+        if linked:
+            hidden_lock = dict(name=lock.get("name"), lockfileVersion=lock.get("lockfileVersion", 3), requires=True, packages=linked)
+            (project_path / "node_modules" / ".package-lock.json").write_text(json.dumps(hidden_lock, indent=2))
+        return len(linked), len(entries)
+
+    def ingest(self, project_path: Path) -> int:
+        # Moves the newly installed packages into the store and replaces them with links
+        if self._disabled or not (project_path / "package-lock.json").is_file():
+            return 0
+        entries = get_lock_entries(json.loads((project_path / "package-lock.json").read_text()))
+        num_ingested = 0
+        try:
+            for path, key in entries.items():
+                package_path = project_path / path
+                if not package_path.is_dir() or self._read_index(key) is not None:
+                    continue
+                index: dict[str, dict[str, str]] = dict(files={}, symlinks={})
+                for root, dir_names, file_names in os.walk(package_path):
+                    root_path = Path(root)
+                    if root_path == package_path:
+                        # Nested dependencies are entries of their own
+                        dir_names[:] = [name for name in dir_names if name != "node_modules"]
+                    for name in dir_names + file_names:
+                        file_path = root_path / name
+                        relative_path = str(file_path.relative_to(package_path))
+                        mode = os.lstat(file_path).st_mode
+                        if stat.S_ISLNK(mode):
+                            index["symlinks"][relative_path] = os.readlink(file_path)
+                        elif stat.S_ISREG(mode):
+                            index["files"][relative_path] = self._add_file(file_path)
+                self._write_index(key, index)
+                num_ingested += 1
+        except OSError as e:
+            self._handle_error(e)
+        return num_ingested
+
+class WithPackageStore:
+    def __init__(self, store: Optional[PackageStore]):
+        self._store = store
+
+    def __enter__(self) -> Optional[PackageStore]:
+        self._token = _package_store.set(self._store)
+        return self._store
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        _package_store.reset(self._token)
+
+_package_store: ContextVar[Optional[PackageStore]] = ContextVar("package_store", default=None)
+
+def with_package_store(store_path: Optional[Path]) -> WithPackageStore:
+    return WithPackageStore(None if store_path is None else PackageStore(store_path))
+
+def get_package_store() -> Optional[PackageStore]:
+    return _package_store.get()
+
+def collect_package_store(store_path: Path) -> dict[str, int]:
+    # Files that are only linked by the store itself are not used by any project anymore (e.g. after remove_cache)
+    summary = dict(removed_files=0, removed_bytes=0, removed_packages=0, kept_files=0)
+    files_path = store_path / STORE_FILES_PATH
+    for file_path in (files_path.rglob("*") if files_path.is_dir() else []):
+        file_stat = os.lstat(file_path)
+        if not stat.S_ISREG(file_stat.st_mode):
+            continue
+        if file_stat.st_nlink > 1:
+            summary["kept_files"] += 1
+            continue
+        file_path.unlink()
+        summary["removed_files"] += 1
+        summary["removed_bytes"] += file_stat.st_size
+    # Packages that lost a file can not be linked anymore
+    index_path = store_path / STORE_INDEX_PATH
+    for package_index_path in (index_path.glob("*.json") if index_path.is_dir() else []):
+        try:
+            index = json.loads(package_index_path.read_text())
+            complete = all((files_path / file_key[:2] / file_key[2:]).is_file() for file_key in index["files"].values())
+        except ValueError:
+            complete = False
+        if not complete:
+            package_index_path.unlink()
+            summary["removed_packages"] += 1
+    return summary
@@ -0,0 +1,36 @@
+import json
+from pathlib import Path
+from typing import Optional
+
+from jstypelog.utils.helpers import create_dir, create_file
+from jstypelog.utils.shared import EXAMPLIFICATION_SCRIPTS_PATH, EXECUTION_TIMEOUT
+from jstypelog.utils.shell import shell
+
+JAVASCRIPT_LANGUAGE_TAGS = ["", "js", "javascript", "node", "nodejs", "cjs"]
+
+def get_language_tag(info_string: str) -> str:
+    # The info string of a fenced block can contain more than the language, e.g. "js title=example.js"
+    parts = info_string.strip().lower().split()
+    return parts[0] if parts else ""
+
+def is_javascript_tag(language_tag: str) -> bool:
+    return language_tag in JAVASCRIPT_LANGUAGE_TAGS
+
+def check_javascript_syntax(snippets: list[str], work_path: Path, verbose: bool) -> Optional[list[Optional[str]]]:
+    # Returns a syntax error (or None) for each snippet, checked in a single Node process.
+    # Returns None if the check itself failed, such that callers can skip the triage.
+    if not snippets:
+        return []
+    create_dir(work_path, overwrite=True)
+    snippets_path = work_path / "snippets.json"
+    results_path = work_path / "results.json"
+    create_file(snippets_path, content=json.dumps(snippets))
+    shell_output = shell(
+        f"node {(EXAMPLIFICATION_SCRIPTS_PATH / "check_syntax.js").resolve()} {snippets_path.resolve()} {results_path.resolve()}",
+        check=False,
+        timeout=EXECUTION_TIMEOUT,
+        verbose=verbose
+    )
+    if shell_output.code or not results_path.is_file():
+        return None
+    return json.loads(results_path.read_text())
@@ -0,0 +1,143 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+import json
+import math
+import os
+from pathlib import Path
+import threading
+from typing import Any, Optional
+
+from jstypelog.utils.helpers import create_dir
+from jstypelog.utils.logger import logger
+from jstypelog.utils.shared import EXECUTION_TIMEOUT, INSTALLATION_TIMEOUT
+from jstypelog.utils.tracing import get_percentile
+
+TIMEOUT_PERCENTILE = 99
+TIMEOUT_MARGIN = 1.5
+TIMEOUT_MIN_SAMPLES = 30
+TIMEOUT_MAX_SAMPLES = 1000
+# If more runs of a stage time out than this (e.g. because the machine got slower), the default timeout is used again
+TIMEOUT_MAX_RATE = 0.2
+
+@dataclass
+class TimeoutPolicy:
+    # In seconds, the default is used until enough durations are recorded
+    default: float
+    minimum: float
+    maximum: float
+
+TIMEOUT_POLICIES = {
+    "installation": TimeoutPolicy(INSTALLATION_TIMEOUT, 60, 1800),
+    "execution": TimeoutPolicy(EXECUTION_TIMEOUT, 5, 120),
+    "transpilation": TimeoutPolicy(EXECUTION_TIMEOUT, 5, 120),
+    "run_time_analysis": TimeoutPolicy(EXECUTION_TIMEOUT * 2, 20, 600),
+    "declaration_generation": TimeoutPolicy(EXECUTION_TIMEOUT, 10, 300),
+    "comparison": TimeoutPolicy(EXECUTION_TIMEOUT, 10, 300)
+}
+
+def get_package_size(path: Path) -> int:
+    size = 0
+    for root, _, file_names in os.walk(path):
+        for file_name in file_names:
+            try:
+                size += os.lstat(os.path.join(root, file_name)).st_size
+            except OSError:
+                pass
+    return size
+
+def get_size_bucket(size: int) -> str:
+    # Powers of 4 KiB, e.g. packages with 100KiB and 200KiB share the bucket "256KiB"
+    return f"{4 ** math.ceil(math.log(max(size / 1024, 1), 4))}KiB"
+
+class TimeoutStore:
+    # Durations of completed runs and the outcomes of the latest runs per stage and per stage and size bucket
+    def __init__(self, file_path: Path):
+        self._file_path = file_path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._added: dict[str, dict[str, list]] = {}
+
+    def _load(self) -> dict[str, dict[str, list]]:
+        try:
+            return json.loads(self._file_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def get_entry(self, key: str) -> dict[str, list]:
+        with self._lock:
+            entry = self._entries.get(key, dict(durations=[], timeouts=[]))
+            return dict(durations=list(entry["durations"]), timeouts=list(entry["timeouts"]))
+
+    def add(self, key: str, duration: float, timed_out: bool) -> None:
+        with self._lock:
+            for entries in (self._entries, self._added):
+                entry = entries.setdefault(key, dict(durations=[], timeouts=[]))
+                if not timed_out:
+                    entry["durations"] = (entry["durations"] + [round(duration, 3)])[-TIMEOUT_MAX_SAMPLES:]
+                entry["timeouts"] = (entry["timeouts"] + [int(timed_out)])[-TIMEOUT_MIN_SAMPLES:]
+
+    def save(self) -> None:
+        # Merges with the runs that other processes saved in the meantime and replaces the file atomically
+        with self._lock:
+            if not self._added:
+                return None
+            entries = self._load()
+            for key, added in self._added.items():
+                entry = entries.setdefault(key, dict(durations=[], timeouts=[]))
+                entry["durations"] = (entry["durations"] + added["durations"])[-TIMEOUT_MAX_SAMPLES:]
+                entry["timeouts"] = (entry["timeouts"] + added["timeouts"])[-TIMEOUT_MIN_SAMPLES:]
+            create_dir(self._file_path.parent)
+            temporary_path = self._file_path.with_name(f"{self._file_path.name}.{os.getpid()}.{threading.get_ident()}")
+            temporary_path.write_text(json.dumps(entries))
+            os.replace(temporary_path, self._file_path)
+            self._entries = entries
+            self._added = {}
+
+class WithTimeoutStore:
+    def __init__(self, controller: "TimeoutController", store: Optional[TimeoutStore]):
+        self._controller = controller
+        self._store = store
+
+    def __enter__(self) -> Optional[TimeoutStore]:
+        self._token = self._controller._store.set(self._store)
+        return self._store
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self._controller._store.reset(self._token)
+        if self._store is not None:
+            self._store.save()
+
+class TimeoutController:
+    def __init__(self):
+        # Without a store (e.g. fixed timeouts) the default timeouts are used and nothing is recorded
+        self._store: ContextVar[Optional[TimeoutStore]] = ContextVar("timeout_store", default=None)
+
+    def with_store(self, file_path: Optional[Path]) -> WithTimeoutStore:
+        return WithTimeoutStore(self, None if file_path is None else TimeoutStore(file_path))
+
+    def get_timeout(self, stage: str, bucket: Optional[str] = None) -> float:
+        # A high percentile of the completed runs with a safety margin, the size bucket is preferred if it has enough runs
+        policy = TIMEOUT_POLICIES[stage]
+        store = self._store.get()
+        if store is None:
+            return policy.default
+        for key in ([f"{stage}/{bucket}"] if bucket is not None else []) + [stage]:
+            entry = store.get_entry(key)
+            if len(entry["durations"]) < TIMEOUT_MIN_SAMPLES:
+                continue
+            if sum(entry["timeouts"]) > TIMEOUT_MAX_RATE * len(entry["timeouts"]):
+                logger.debug("Timeout of %s falls back to %ss (%d of the latest runs timed out)", key, policy.default, sum(entry["timeouts"]))
+                return policy.default
+            timeout = get_percentile(sorted(entry["durations"]), TIMEOUT_PERCENTILE) * TIMEOUT_MARGIN
+            return round(min(max(timeout, policy.minimum), policy.maximum), 1)
+        return policy.default
+
+    def record(self, stage: str, duration: float, timed_out: bool, bucket: Optional[str] = None) -> None:
+        store = self._store.get()
+        if store is None:
+            return None
+        store.add(stage, duration, timed_out)
+        if bucket is not None:
+            store.add(f"{stage}/{bucket}", duration, timed_out)
+
+timeout_controller = TimeoutController()
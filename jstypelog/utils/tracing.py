@@ -0,0 +1,145 @@
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import json
+import math
+import os
+from pathlib import Path
+import re
+import threading
+import time
+from typing import Any, Optional, Self
+
+from jstypelog.utils.helpers import create_file
+from jstypelog.utils.logger import logger
+
+def normalize_span_name(text: str) -> str:
+    # Removes the package and example specific parts of section messages, such that spans can be aggregated per stage
+    name = text.strip().splitlines()[0] if text.strip() else ""
+    name = re.sub(r"\s*\([^)]*\)", "", name)
+    name = re.sub(r"\"[^\"]*\"", "<name>", name)
+    name = re.sub(r"[\w./-]*\.(?:d\.ts|js|ts|json)\b", "<file>", name)
+    name = re.sub(r"\d+", "<n>", name)
+    return name.rstrip(":").strip()
+
+def get_command_name(command: str) -> str:
+    # E.g. "npm install tsx typescript" -> "npm install", "node /path/transpile.js index.js" -> "node"
+    tokens = command.split()
+    if not tokens:
+        return "shell"
+    name = os.path.basename(tokens[0])
+    if len(tokens) > 1 and re.fullmatch(r"[a-z][a-z-]*", tokens[1]):
+        name += f" {tokens[1]}"
+    return name
+
+def get_percentile(sorted_values: list[float], percentile: float) -> float:
+    # Nearest-rank percentile
+    return sorted_values[max(math.ceil(percentile / 100 * len(sorted_values)) - 1, 0)]
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    attributes: dict[str, Any]
+    end: Optional[float] = None
+    pid: int = field(default_factory=os.getpid)
+    tid: int = field(default_factory=threading.get_native_id)
+
+class Trace:
+    def __init__(self, file_path: Optional[Path] = None):
+        self._file_path = file_path
+        self._lock = threading.Lock()
+        self._spans: list[Span] = []
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def get_spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def get_statistics(self) -> dict[str, dict[str, float]]:
+        # Duration percentiles (in seconds) per span name
+        durations: dict[str, list[float]] = {}
+        for span in self.get_spans():
+            if span.end is not None:
+                durations.setdefault(span.name, []).append(span.end - span.start)
+        statistics = {}
+        for name, values in sorted(durations.items()):
+            values.sort()
+            statistics[name] = dict(
+                count = len(values),
+                total = round(sum(values), 3),
+                p50 = round(get_percentile(values, 50), 3),
+                p95 = round(get_percentile(values, 95), 3),
+                p99 = round(get_percentile(values, 99), 3)
+            )
+        return statistics
+
+    def save(self) -> None:
+        # Chrome trace event format, can be opened with chrome://tracing or Perfetto
+        if self._file_path is None:
+            return None
+        events = [
+            dict(
+                name=span.name,
+                cat=span.attributes.get("stage", "jstypelog"),
+                ph="X",
+                ts=round(span.start * 1e6),
+                dur=round((span.end - span.start) * 1e6),
+                pid=span.pid,
+                tid=span.tid,
+                args=span.attributes
+            )
+            for span in self.get_spans() if span.end is not None
+        ]
+        create_file(self._file_path, content=json.dumps(dict(traceEvents=events, displayTimeUnit="ms"), ensure_ascii=False, default=str))
+
+class WithTrace:
+    def __init__(self, tracer: "Tracer", trace: Trace):
+        self._tracer = tracer
+        self._trace = trace
+
+    def __enter__(self) -> Trace:
+        self._token = self._tracer._traces.set(self._tracer._traces.get() + (self._trace,))
+        return self._trace
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self._tracer._traces.reset(self._token)
+        self._trace.save()
+
+class WithSpan:
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self) -> Self:
+        self._traces = self._tracer._traces.get()
+        if self._traces:
+            self._span = Span(self._name, time.time(), self._attributes)
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        if self._traces:
+            self._span.end = time.time()
+            if exc_type is not None:
+                self._span.attributes["error"] = exc_type.__name__
+            for trace in self._traces:
+                trace.add(self._span)
+
+class Tracer:
+    def __init__(self):
+        # Active traces are context local like the logger sinks, spans are recorded in all of them
+        self._traces: ContextVar[tuple[Trace, ...]] = ContextVar("tracer_traces", default=())
+
+    def with_trace(self, file_path: Optional[Path] = None) -> WithTrace:
+        return WithTrace(self, Trace(file_path))
+
+    def is_enabled(self) -> bool:
+        return bool(self._traces.get())
+
+    def span(self, name: str, **attributes: Any) -> WithSpan:
+        return WithSpan(self, name, {**logger.get_context(), **attributes})
+
+tracer = Tracer()
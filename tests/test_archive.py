@@ -0,0 +1,85 @@
+import json
+import os
+from pathlib import Path
+import stat
+import tempfile
+import unittest
+
+from jstypelog.utils.archive import ArchiveReader, DirectoryReader, PackageReader, get_archive_path, open_package, package_generated, seal_package, unseal_package
+from jstypelog.utils.shared import CACHE_PATH, DATA_JSON_PATH
+
+FILES = {
+    str(DATA_JSON_PATH): json.dumps(dict(name="abs")),
+    "examples/a.js": "a",
+    "examples/sub/b.js": "b",
+    "examples-x/c.js": "c",
+    "examples.js": "d",
+    "examples_x/e.js": "e",
+    "ex%mples/f.js": "f"
+}
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.generation_path = Path(self._directory.name) / "abs"
+        for relative_path, content in FILES.items():
+            (self.generation_path / relative_path).parent.mkdir(parents=True, exist_ok=True)
+            (self.generation_path / relative_path).write_text(content)
+        os.chmod(self.generation_path / "examples/a.js", 0o755)
+        (self.generation_path / CACHE_PATH).mkdir()
+        (self.generation_path / CACHE_PATH / "template.js").write_text("cache")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_list_files_by_prefix_range(self):
+        self.assertEqual(seal_package(self.generation_path), get_archive_path(self.generation_path))
+        with ArchiveReader(get_archive_path(self.generation_path)) as reader:
+            # Siblings that share the prefix (e.g. "examples-x", "examples.js") are not below the directory
+            self.assertEqual(reader.list_files("examples"), ["examples/a.js", "examples/sub/b.js"])
+            self.assertEqual(reader.list_files("examples/sub"), ["examples/sub/b.js"])
+            self.assertEqual(reader.list_files("ex%mples"), ["ex%mples/f.js"])
+            self.assertEqual(reader.list_files("ex_mples"), [])
+            self.assertEqual(reader.list_files("missing"), [])
+            self.assertEqual(reader.list_files(), sorted(FILES))
+
+    def test_readers_agree(self):
+        with DirectoryReader(self.generation_path) as reader:
+            expected = {path: reader.list_files(path) for path in ["data", "examples", "examples/sub", "ex%mples", "missing"]}
+            expected_children = reader.get_children("examples")
+        seal_package(self.generation_path)
+        with open_package(self.generation_path) as reader:
+            self.assertIsInstance(reader, ArchiveReader)
+            self.assertEqual({path: reader.list_files(path) for path in expected}, expected)
+            self.assertEqual(reader.get_children("examples"), expected_children)
+            self.assertEqual(expected_children, ["examples/a.js", "examples/sub"])
+            self.assertEqual(reader.load_data("name"), "abs")
+            self.assertIsNone(reader.read_bytes("examples/missing.js"))
+
+    def test_cache_is_not_sealed(self):
+        seal_package(self.generation_path)
+        self.assertFalse(self.generation_path.exists())
+        with ArchiveReader(get_archive_path(self.generation_path)) as reader:
+            self.assertFalse(reader.exists(CACHE_PATH / "template.js"))
+            self.assertTrue(reader.dir_empty(CACHE_PATH))
+
+    def test_unseal_restores_contents_and_modes(self):
+        seal_package(self.generation_path)
+        self.assertTrue(unseal_package(self.generation_path))
+        self.assertFalse(get_archive_path(self.generation_path).exists())
+        for relative_path, content in FILES.items():
+            self.assertEqual((self.generation_path / relative_path).read_text(), content)
+        self.assertEqual(stat.S_IMODE(os.lstat(self.generation_path / "examples/a.js").st_mode), 0o755)
+        self.assertFalse(unseal_package(self.generation_path))
+
+    def test_directories_without_data_are_not_sealed(self):
+        (self.generation_path / DATA_JSON_PATH).unlink()
+        self.assertFalse(package_generated(self.generation_path))
+        self.assertIsNone(seal_package(self.generation_path))
+        self.assertFalse(get_archive_path(self.generation_path).exists())
+        self.assertTrue(self.generation_path.is_dir())
+
+class PackageReaderTest(unittest.TestCase):
+    def test_is_abstract(self):
+        with self.assertRaises(TypeError):
+            PackageReader()
@@ -0,0 +1,51 @@
+import unittest
+
+from jstypelog.utils.context import ContextSource, allocate_token_budget, build_context, count_tokens, deduplicate_blocks, truncate_tokens
+
+class TokenTest(unittest.TestCase):
+    def test_tokens_are_counted_without_whitespace(self):
+        self.assertEqual(count_tokens(""), 0)
+        self.assertEqual(count_tokens("  \n "), 0)
+        # "pars" "e" "(" "123" "4" ")"
+        self.assertEqual(count_tokens("parse(1234)"), 6)
+
+    def test_truncation_keeps_whole_tokens(self):
+        self.assertEqual(truncate_tokens("a b c d", 2), "a b")
+        self.assertEqual(truncate_tokens("a b c d", 4), "a b c d")
+        self.assertEqual(truncate_tokens("a b c d", 0), "")
+
+class AllocateTokenBudgetTest(unittest.TestCase):
+    def test_budget_is_split_by_priority(self):
+        sources = [ContextSource("readme", "a " * 100, priority=3), ContextSource("main", "b " * 100, priority=1)]
+        self.assertEqual(allocate_token_budget(sources, 40), dict(readme=30, main=10))
+
+    def test_unused_budget_is_redistributed(self):
+        sources = [ContextSource("readme", "a " * 100, priority=1), ContextSource("package_json", "b " * 5, priority=1)]
+        self.assertEqual(allocate_token_budget(sources, 40), dict(readme=35, package_json=5))
+
+    def test_everything_fits(self):
+        sources = [ContextSource("readme", "a " * 10), ContextSource("main", "b " * 5)]
+        self.assertEqual(allocate_token_budget(sources, 100), dict(readme=10, main=5))
+
+    def test_allocation_never_exceeds_the_budget(self):
+        sources = [ContextSource(f"test:{index}", "x " * (index * 7 + 3), priority=index % 3) for index in range(10)]
+        for budget in [0, 1, 17, 100, 1000]:
+            allocation = allocate_token_budget(sources, budget)
+            self.assertLessEqual(sum(allocation.values()), budget)
+            self.assertEqual(set(allocation), {source.name for source in sources})
+
+class BuildContextTest(unittest.TestCase):
+    def test_duplicates_and_empty_sources_are_dropped(self):
+        context = build_context(
+            [
+                ContextSource("readme", "Install it.\n\nUse it.\n\nInstall it.", priority=4),
+                ContextSource("main", "module.exports = 1;", priority=3),
+                ContextSource("test:index.js", "module.exports = 1;", priority=1),
+                ContextSource("package_json", "", priority=1)
+            ],
+            1000
+        )
+        self.assertEqual(context, dict(readme="Install it.\n\nUse it.", main="module.exports = 1;"))
+
+    def test_repeated_blocks_are_removed_once(self):
+        self.assertEqual(deduplicate_blocks("a\n\nb\n\n a \n\nc"), "a\n\nb\n\nc")
@@ -0,0 +1,23 @@
+import unittest
+
+from jstypelog.utils.coverage import select_covering_examples
+
+class SelectCoveringExamplesTest(unittest.TestCase):
+    def test_redundant_examples_are_dropped(self):
+        coverages = [frozenset({"parse"}), frozenset({"parse", "stringify"}), frozenset({"stringify"})]
+        self.assertEqual(select_covering_examples(coverages, [10, 15, 10]), [1])
+
+    def test_cheaper_examples_are_preferred(self):
+        coverages = [frozenset({"parse", "stringify"}), frozenset({"parse"}), frozenset({"stringify"})]
+        self.assertEqual(select_covering_examples(coverages, [100, 10, 10]), [1, 2])
+
+    def test_examples_without_coverage_are_kept(self):
+        coverages = [None, frozenset({"parse"}), frozenset({"parse"})]
+        self.assertEqual(select_covering_examples(coverages, [10, 10, 20]), [0, 1])
+
+    def test_examples_with_empty_coverage_are_kept(self):
+        self.assertEqual(select_covering_examples([frozenset(), frozenset()], [10, 20]), [0, 1])
+        self.assertEqual(select_covering_examples([frozenset(), frozenset({"parse"})], [10, 20]), [0, 1])
+
+    def test_no_examples(self):
+        self.assertEqual(select_covering_examples([], []), [])
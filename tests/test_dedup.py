@@ -0,0 +1,79 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from jstypelog.utils.dedup import ExampleCache, hash_example, normalize_example
+
+class NormalizeExampleTest(unittest.TestCase):
+    def test_formatting_is_ignored(self):
+        self.assertEqual(
+            hash_example("const x = require('pkg'); // parse it\nx.parse( '1' );"),
+            hash_example('const x = require("pkg");\n/* comment */ x.parse("1");')
+        )
+
+    def test_semicolons_are_kept(self):
+        # Without the semicolon, "(f || g)" is a call of "b"
+        self.assertNotEqual(
+            hash_example("let a = b\n(f || g)()"),
+            hash_example("let a = b;\n(f || g)()")
+        )
+
+    def test_local_identifiers_are_renamed(self):
+        self.assertEqual(
+            hash_example("const a = require('pkg'); a.parse(a);", identifiers=True),
+            hash_example("const b = require('pkg'); b.parse(b);", identifiers=True)
+        )
+        self.assertNotEqual(
+            hash_example("const a = require('pkg'); a.parse(a);"),
+            hash_example("const b = require('pkg'); b.parse(b);")
+        )
+
+    def test_member_names_are_kept(self):
+        self.assertNotEqual(
+            hash_example("const a = require('pkg'); a.parse();", identifiers=True),
+            hash_example("const a = require('pkg'); a.stringify();", identifiers=True)
+        )
+
+    def test_destructured_names_are_kept(self):
+        self.assertNotEqual(
+            hash_example('const {parse}=require("x");parse()', identifiers=True),
+            hash_example('const {stringify}=require("x");stringify()', identifiers=True)
+        )
+        self.assertEqual(
+            hash_example('const {parse: p}=require("x");p()', identifiers=True),
+            hash_example('const {parse: q}=require("x");q()', identifiers=True)
+        )
+
+    def test_property_keys_are_kept(self):
+        self.assertNotEqual(
+            normalize_example("f({ strict: a })", identifiers=True),
+            normalize_example("f({ loose: a })", identifiers=True)
+        )
+        self.assertEqual(normalize_example("if (x) { y() }", identifiers=True), "if ( $0 ) { $1 ( ) }")
+
+class ExampleCacheTest(unittest.TestCase):
+    def test_entries_are_persisted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = Path(directory) / "cache" / "deduplication.jsonl"
+            cache = ExampleCache(file_path)
+            key = cache.get_key("require('pkg')")
+            cache.set("execution", key, dict(code=0))
+            cache.set("execution", key, dict(code=1))
+            self.assertEqual(cache.get("execution", key), dict(code=1))
+            # A line that was cut off is skipped
+            with open(file_path, "a") as file:
+                file.write('{"kind": "execution", "key"')
+            cache = ExampleCache(file_path)
+            self.assertEqual(cache.get("execution", key), dict(code=1))
+            self.assertIsNone(cache.get("declaration", key))
+
+    def test_entries_of_a_kind_are_discarded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = Path(directory) / "deduplication.jsonl"
+            cache = ExampleCache(file_path)
+            cache.set("execution", "a", 1)
+            cache.set("declaration", "a", 2)
+            cache.discard("execution")
+            cache = ExampleCache(file_path)
+            self.assertIsNone(cache.get("execution", "a"))
+            self.assertEqual(cache.get("declaration", "a"), 2)
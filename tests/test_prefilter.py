@@ -0,0 +1,52 @@
+import json
+import unittest
+
+from jstypelog.utils.prefilter import compute_prefilter_agreement, prefilter_package
+
+class PrefilterPackageTest(unittest.TestCase):
+    def test_browser_only_packages_are_rejected(self):
+        verdict, _ = prefilter_package(json.dumps(dict(browser="dist/browser.js")), None)
+        self.assertEqual(verdict, "rejected")
+        verdict, _ = prefilter_package(json.dumps(dict(browser="dist/browser.js", main="index.js")), None)
+        self.assertEqual(verdict, "undecided")
+
+    def test_framework_peer_dependencies_are_rejected(self):
+        verdict, reason = prefilter_package(json.dumps(dict(peerDependencies={"react": "^18", "lodash": "^4"})), None)
+        self.assertEqual(verdict, "rejected")
+        self.assertIn("react", reason)
+        self.assertNotIn("lodash", reason)
+
+    def test_guarded_dom_globals_are_not_rejected(self):
+        self.assertEqual(prefilter_package(None, "window.addEventListener('load', f);")[0], "rejected")
+        self.assertEqual(prefilter_package(None, "if (typeof window !== 'undefined') window.x = 1;")[0], "undecided")
+        # Mentions in identifiers or strings without member access are no DOM usage
+        self.assertEqual(prefilter_package(None, "var windowSize = 1; module.exports = windowSize;")[0], "undecided")
+
+    def test_node_packages_are_accepted(self):
+        main = "const fs = require('node:fs');\nmodule.exports = fs.readFileSync;"
+        self.assertEqual(prefilter_package(None, main)[0], "accepted")
+        self.assertEqual(prefilter_package(json.dumps(dict(engines=dict(node=">=14"))), "exports.parse = parse;")[0], "accepted")
+        # Node built-ins without CommonJS exports are not enough
+        self.assertEqual(prefilter_package(None, "import fs from 'fs'; require('fs');")[0], "undecided")
+
+    def test_invalid_package_json_is_ignored(self):
+        self.assertEqual(prefilter_package("{", None)[0], "undecided")
+        self.assertEqual(prefilter_package("[1, 2]", None)[0], "undecided")
+
+class PrefilterAgreementTest(unittest.TestCase):
+    def test_agreement_counts_decided_verdicts_only(self):
+        agreement = compute_prefilter_agreement([
+            ("rejected", "rejected"),
+            ("accepted", "rejected"),
+            ("accepted", "accepted"),
+            ("undecided", "accepted"),
+            ("rejected", None)
+        ])
+        self.assertEqual(agreement["compared"], 3)
+        self.assertEqual(agreement["undecided"], 1)
+        self.assertEqual(agreement["agree"], 2)
+        self.assertEqual(agreement["accepted_only_by_prefilter"], 1)
+        self.assertAlmostEqual(agreement["agreement_rate"], 2 / 3)
+
+    def test_agreement_rate_without_comparisons(self):
+        self.assertIsNone(compute_prefilter_agreement([("undecided", "accepted")])["agreement_rate"])
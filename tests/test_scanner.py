@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from jstypelog.utils.scanner import read_text_capped, scan_repository
+
+def create_files(root: Path, files: dict[str, str | bytes]) -> None:
+    for relative_path, content in files.items():
+        path = root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content)
+
+class ReadTextCappedTest(unittest.TestCase):
+    def test_cut_characters_are_dropped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "file.txt"
+            path.write_text("aä")
+            self.assertEqual(read_text_capped(path, 3), "aä")
+            # The limit cuts the two bytes of "ä"
+            self.assertEqual(read_text_capped(path, 2), "a")
+
+    def test_binary_and_missing_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "file.bin"
+            path.write_bytes(b"\xff\xfe\x00")
+            self.assertIsNone(read_text_capped(path, 100))
+            self.assertIsNone(read_text_capped(Path(directory) / "missing", 100))
+
+class ScanRepositoryTest(unittest.TestCase):
+    def test_package_files_are_read(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            create_files(root, {
+                "README.md": "# Package",
+                "package.json": json.dumps(dict(main="lib/main.js")),
+                "lib/main.js": "module.exports = 1;",
+                "index.js": "module.exports = 2;"
+            })
+            scan = scan_repository(root, max_tests=3)
+            self.assertEqual(scan.readme, "# Package")
+            self.assertEqual(scan.main, "module.exports = 1;")
+            self.assertEqual(scan.tests, [])
+            self.assertTrue(scan.complete)
+
+    def test_main_falls_back_to_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            create_files(root, {"package.json": json.dumps(dict(main="missing.js")), "index.js": "module.exports = 2;"})
+            self.assertEqual(scan_repository(root, max_tests=0).main, "module.exports = 2;")
+
+    def test_tests_are_ranked_by_depth_and_location(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            create_files(root, {
+                "a.spec.js": "1",
+                "test/b.js": "2",
+                "test/a.js": "3",
+                "src/deep/c.test.js": "4",
+                "node_modules/dep/test/index.js": "5",
+                "test/fixture.min.js": "6",
+                "test/readme.md": "7"
+            })
+            scan = scan_repository(root, max_tests=3)
+            self.assertEqual([str(path) for path, _ in scan.tests], ["a.spec.js", "test/a.js", "test/b.js"])
+            scan = scan_repository(root, max_tests=10)
+            self.assertEqual([str(path) for path, _ in scan.tests], ["a.spec.js", "test/a.js", "test/b.js", "src/deep/c.test.js"])
+
+    def test_walk_is_capped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            create_files(root, {f"dir/{index}.test.js": "x" for index in range(10)})
+            scan = scan_repository(root, max_tests=20, max_entries=5)
+            self.assertFalse(scan.complete)
+            self.assertLessEqual(len(scan.tests), 4)
+
+    def test_missing_repository(self):
+        scan = scan_repository(Path("/nonexistent/repository"), max_tests=3)
+        self.assertIsNone(scan.readme)
+        self.assertEqual(scan.tests, [])
@@ -0,0 +1,46 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from jstypelog.utils.scheduling import COST_BASE, COST_MIN_SAMPLES, DurationStore, PackageFeatures, estimate_costs, predict_cost, schedule_longest_first
+
+class ScheduleLongestFirstTest(unittest.TestCase):
+    def test_expensive_packages_come_first(self):
+        costs = dict(a=1.0, b=5.0, c=3.0)
+        self.assertEqual(schedule_longest_first(["a", "b", "c"], costs), ["b", "c", "a"])
+
+    def test_ties_keep_the_given_order(self):
+        costs = dict(a=2.0, b=2.0, c=2.0, d=4.0)
+        self.assertEqual(schedule_longest_first(["c", "a", "d", "b"], costs), ["d", "c", "a", "b"])
+
+    def test_unknown_costs_come_last(self):
+        self.assertEqual(schedule_longest_first(["a", "b"], dict(b=1.0)), ["b", "a"])
+
+class EstimateCostsTest(unittest.TestCase):
+    def test_prior_without_recorded_durations(self):
+        features = dict(a=PackageFeatures(), b=PackageFeatures(num_dependencies=10))
+        self.assertEqual(estimate_costs(features), dict(a=COST_BASE, b=predict_cost(features["b"])))
+
+    def test_recorded_durations_are_used_as_they_are(self):
+        self.assertEqual(estimate_costs(dict(a=PackageFeatures(past_duration=7.0)))["a"], 7.0)
+
+    def test_prior_is_rescaled_with_enough_samples(self):
+        # Every recorded package took twice as long as predicted
+        features = {f"p{index}": PackageFeatures(past_duration=2 * COST_BASE) for index in range(COST_MIN_SAMPLES)}
+        features["new"] = PackageFeatures()
+        self.assertEqual(estimate_costs(features)["new"], 2 * COST_BASE)
+        # Fewer samples do not rescale the prior
+        del features["p0"]
+        self.assertEqual(estimate_costs(features)["new"], COST_BASE)
+
+class DurationStoreTest(unittest.TestCase):
+    def test_saves_merge_with_other_stores(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = Path(directory) / "durations.json"
+            first, second = DurationStore(file_path), DurationStore(file_path)
+            first.add("a", 1.23456)
+            second.add("b", 2.0)
+            first.save()
+            second.save()
+            self.assertEqual(DurationStore(file_path).load(), dict(a=1.235, b=2.0))
+            self.assertEqual(list(Path(directory).iterdir()), [file_path])
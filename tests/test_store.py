@@ -0,0 +1,90 @@
+import json
+import os
+from pathlib import Path
+import shutil
+import stat
+import tempfile
+import unittest
+
+from jstypelog.utils.store import PackageStore, collect_package_store, get_lock_entries
+
+LOCK = dict(name="project", lockfileVersion=3, packages={
+    "": dict(name="project"),
+    "node_modules/a": dict(version="1.0.0", integrity="sha512-a", bin=dict(a="bin/cli.js")),
+    "node_modules/b": dict(version="1.0.0", resolved="https://registry.npmjs.org/b/-/b-1.0.0.tgz"),
+    "node_modules/local": dict(resolved="../local", link=True)
+})
+
+def create_project(project_path):
+    (project_path / "node_modules" / "a" / "bin").mkdir(parents=True)
+    (project_path / "node_modules" / "b").mkdir(parents=True)
+    (project_path / "package-lock.json").write_text(json.dumps(LOCK))
+    (project_path / "node_modules" / "a" / "index.js").write_text("module.exports = 1;\n")
+    (project_path / "node_modules" / "a" / "bin" / "cli.js").write_text("#!/usr/bin/env node\n")
+    os.chmod(project_path / "node_modules" / "a" / "bin" / "cli.js", 0o755)
+    os.symlink("index.js", project_path / "node_modules" / "a" / "main.js")
+    # Same content as a file of another package
+    (project_path / "node_modules" / "b" / "index.js").write_text("module.exports = 1;\n")
+
+class GetLockEntriesTest(unittest.TestCase):
+    def test_root_links_and_unknown_contents_are_skipped(self):
+        lock = dict(packages=dict(LOCK["packages"], **{"node_modules/c": dict(version="1.0.0")}))
+        self.assertEqual(sorted(get_lock_entries(lock)), ["node_modules/a", "node_modules/b"])
+
+    def test_keys_depend_on_the_content(self):
+        first = get_lock_entries(LOCK)
+        second = get_lock_entries(dict(packages={"node_modules/x/node_modules/a": LOCK["packages"]["node_modules/a"]}))
+        self.assertEqual(first["node_modules/a"], second["node_modules/x/node_modules/a"])
+        self.assertNotEqual(first["node_modules/a"], first["node_modules/b"])
+
+class PackageStoreTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = Path(self._directory.name)
+        self.store = PackageStore(self.path / "store")
+        create_project(self.path / "first")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_ingested_files_are_read_only_links(self):
+        self.assertEqual(self.store.ingest(self.path / "first"), 2)
+        index_stat = os.lstat(self.path / "first" / "node_modules" / "a" / "index.js")
+        bin_stat = os.lstat(self.path / "first" / "node_modules" / "a" / "bin" / "cli.js")
+        self.assertEqual(stat.S_IMODE(index_stat.st_mode), 0o444)
+        self.assertEqual(stat.S_IMODE(bin_stat.st_mode), 0o555)
+        # Linked by the store and by both packages that have the same content
+        self.assertEqual(index_stat.st_nlink, 3)
+        self.assertEqual(bin_stat.st_nlink, 2)
+        self.assertTrue((self.path / "first" / "node_modules" / "a" / "main.js").is_symlink())
+        # Packages that are already in the store are not ingested again
+        self.assertEqual(self.store.ingest(self.path / "first"), 0)
+
+    def test_linked_packages_share_the_files(self):
+        self.store.ingest(self.path / "first")
+        second_path = self.path / "second"
+        second_path.mkdir()
+        (second_path / "package-lock.json").write_text(json.dumps(LOCK))
+        self.assertEqual(self.store.link(second_path), (2, 2))
+        first_stat = os.lstat(self.path / "first" / "node_modules" / "a" / "index.js")
+        second_stat = os.lstat(second_path / "node_modules" / "a" / "index.js")
+        self.assertEqual(first_stat.st_ino, second_stat.st_ino)
+        self.assertEqual(os.readlink(second_path / "node_modules" / "a" / "main.js"), "index.js")
+        self.assertEqual(os.readlink(second_path / "node_modules" / ".bin" / "a"), "../a/bin/cli.js")
+        hidden_lock = json.loads((second_path / "node_modules" / ".package-lock.json").read_text())
+        self.assertEqual(sorted(hidden_lock["packages"]), ["node_modules/a", "node_modules/b"])
+
+    def test_unknown_packages_are_not_linked(self):
+        project_path = self.path / "second"
+        project_path.mkdir()
+        (project_path / "package-lock.json").write_text(json.dumps(LOCK))
+        self.assertEqual(self.store.link(project_path), (0, 2))
+        self.assertFalse((project_path / "node_modules").exists())
+
+    def test_collect_removes_unused_files(self):
+        self.store.ingest(self.path / "first")
+        self.assertEqual(collect_package_store(self.path / "store")["removed_files"], 0)
+        shutil.rmtree(self.path / "first" / "node_modules" / "a")
+        summary = collect_package_store(self.path / "store")
+        # The content shared with b is kept, the executable and the index of a are removed
+        self.assertEqual(summary, dict(removed_files=1, removed_bytes=20, removed_packages=1, kept_files=1))
@@ -0,0 +1,87 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from jstypelog.utils.timeouts import TIMEOUT_MIN_SAMPLES, TIMEOUT_POLICIES, TimeoutController, TimeoutStore, get_size_bucket
+
+class TimeoutControllerTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.file_path = Path(self._directory.name) / "timeouts.json"
+        self.controller = TimeoutController()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def record(self, duration, count=TIMEOUT_MIN_SAMPLES, timed_out=False, bucket=None):
+        for _ in range(count):
+            self.controller.record("execution", duration, timed_out, bucket)
+
+    def test_default_without_store(self):
+        self.record(10.0)
+        self.assertEqual(self.controller.get_timeout("execution"), TIMEOUT_POLICIES["execution"].default)
+
+    def test_default_with_too_few_samples(self):
+        with self.controller.with_store(self.file_path):
+            self.record(10.0, count=TIMEOUT_MIN_SAMPLES - 1)
+            self.assertEqual(self.controller.get_timeout("execution"), TIMEOUT_POLICIES["execution"].default)
+
+    def test_percentile_with_margin(self):
+        with self.controller.with_store(self.file_path):
+            self.record(10.0, count=TIMEOUT_MIN_SAMPLES - 1)
+            self.record(12.0, count=1)
+            # The p99 of 30 runs is the slowest one
+            self.assertEqual(self.controller.get_timeout("execution"), 18.0)
+
+    def test_bounds_of_the_policy(self):
+        policy = TIMEOUT_POLICIES["execution"]
+        with self.controller.with_store(self.file_path):
+            self.record(policy.minimum / 10)
+            self.assertEqual(self.controller.get_timeout("execution"), policy.minimum)
+        with self.controller.with_store(Path(self._directory.name) / "slow.json"):
+            self.record(policy.maximum)
+            self.assertEqual(self.controller.get_timeout("execution"), policy.maximum)
+
+    def test_size_bucket_is_preferred(self):
+        with self.controller.with_store(self.file_path):
+            self.record(10.0, bucket="4KiB")
+            self.record(20.0, bucket="1024KiB")
+            self.assertEqual(self.controller.get_timeout("execution", "1024KiB"), 30.0)
+            # Buckets without enough runs fall back to the runs of all sizes
+            self.assertEqual(self.controller.get_timeout("execution", "16KiB"), 30.0)
+            self.assertEqual(self.controller.get_timeout("execution"), 30.0)
+
+    def test_default_after_too_many_timeouts(self):
+        with self.controller.with_store(self.file_path):
+            self.record(10.0)
+            self.record(0.0, count=6, timed_out=True)
+            self.assertEqual(self.controller.get_timeout("execution"), 15.0)
+            self.record(0.0, count=1, timed_out=True)
+            self.assertEqual(self.controller.get_timeout("execution"), TIMEOUT_POLICIES["execution"].default)
+
+    def test_durations_are_saved(self):
+        with self.controller.with_store(self.file_path):
+            self.record(10.0)
+        with self.controller.with_store(self.file_path):
+            self.assertEqual(self.controller.get_timeout("execution"), 15.0)
+
+class TimeoutStoreTest(unittest.TestCase):
+    def test_saves_merge_with_other_stores(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = Path(directory) / "timeouts.json"
+            first, second = TimeoutStore(file_path), TimeoutStore(file_path)
+            first.add("execution", 1.23456, False)
+            second.add("execution", 2.0, False)
+            second.add("execution", 60.0, True)
+            first.save()
+            second.save()
+            self.assertEqual(TimeoutStore(file_path).get_entry("execution"), dict(durations=[1.235, 2.0], timeouts=[0, 0, 1]))
+            self.assertEqual(list(Path(directory).iterdir()), [file_path])
+
+class GetSizeBucketTest(unittest.TestCase):
+    def test_powers_of_four(self):
+        self.assertEqual(get_size_bucket(0), "1KiB")
+        self.assertEqual(get_size_bucket(100 * 1024), "256KiB")
+        self.assertEqual(get_size_bucket(200 * 1024), "256KiB")
+        self.assertEqual(get_size_bucket(256 * 1024), "256KiB")
+        self.assertEqual(get_size_bucket(257 * 1024), "1024KiB")